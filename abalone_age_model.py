@@ -38,216 +38,263 @@ Shell weight / continuous / grams / after being dried
 
 Rings / integer / -- / +1.5 gives the age in years
 
-# import libraries
+# Usage
+
+The load/clean/feature/model stages are plain functions so they can be imported
+without side effects; `python abalone_age_model.py` runs the whole analysis via
+`main()`. TensorFlow, seaborn and matplotlib are only imported by the stages that
+need them.
 """
 
-# Commented out IPython magic to ensure Python compatibility.
+
+import argparse
+import os
+import time
+import warnings
+
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-# %matplotlib inline
-import seaborn as sns
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.model_selection import GridSearchCV, train_test_split
+from sklearn.preprocessing import StandardScaler
 
-df = pd.read_csv('abalone.csv')
+from pca_stage import PCAStage, pca_methods
+from predictor import AgePredictor
+from profiling import PeakRSS, profiler
+from results_store import ResultsStore
 
-df.head()
+DATA_PATH = 'abalone.csv'
 
-df.describe()
+random_seed = 42
+n_components = 5
 
-df['age'] = df['Rings']+1.5
-df = df.drop('Rings', axis = 1)
+col_except_rings = ['Length', 'Diameter', 'Height', 'Whole weight', 'Shucked weight', 'Viscera weight', 'Shell weight']
+sex_categories = ['F', 'I', 'M']
+dataset_names = ['original', 'cleaned', 'pca']
 
-"""# EDA"""
 
-# Check for missing values
-df.isnull().sum()
+def _pyplot():
+    # matplotlib/seaborn are only needed for the EDA plots, import them on demand
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    return plt, sns
 
-df.describe()
 
-"""The minimum height value is 0.00 this is most likely an error made.(noise) Probe the data frame further to identify the noise."""
+def _show(fig, path=None):
+    # Interactive by default; with a path the figure is written there and closed (headless report)
+    plt, _ = _pyplot()
+    if path is None:
+        plt.show()
+    else:
+        fig.savefig(path, bbox_inches='tight')
+        plt.close(fig)
 
-# Condition to identify the noise
-condition = df['Height'] == 0
 
-# Use the condition to filter the DataFrame and extract the rows
-rows_with_height_zero = df[condition]
+def _keras():
+    # TensorFlow takes seconds to import, only pay for it when an ANN stage runs
+    from tensorflow.keras import Input
+    from tensorflow.keras.layers import Dense, Dropout
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.callbacks import EarlyStopping
+    return Sequential, Dense, Dropout, Input, EarlyStopping
 
-# Display the filtered rows
-print(rows_with_height_zero)
-print("\nRows where height is zero:", rows_with_height_zero.value_counts().sum())
 
-df.info()
+"""# Load data"""
 
-"""Pairplot"""
+def load_data(path=DATA_PATH, compact=False, chunksize=1_000_000, cache_path=None):
+    """Read the abalone CSV and derive the target: age = Rings + 1.5.
 
-pp = sns.pairplot(df, hue='Sex', markers=["o", "s", "D"], corner=True)
+    With `compact` (or a `cache_path`) the file goes through `ingest.load_abalone`: chunked
+    parsing into float32/categorical columns and an optional Parquet cache.
+    """
+    if compact or cache_path:
+        from ingest import load_abalone
+        return load_abalone(path, chunksize=chunksize, cache_path=cache_path)
 
-# Iterate over the axes object safely
-for ax in pp.axes.flatten():
-    if ax is not None:
-        # Set label sizes
-        ax.set_xlabel(ax.get_xlabel(), fontsize=16)
-        ax.set_ylabel(ax.get_ylabel(), fontsize=16)
+    df = pd.read_csv(path)
+    df['age'] = df['Rings']+1.5
+    df = df.drop('Rings', axis = 1)
+    return df
 
-        # Set tick label sizes
-        ax.tick_params(axis='both', which='major', labelsize=11)
 
-# Remove any existing automatic legends created by seaborn
-pp._legend.remove()
+"""# EDA"""
 
-# Add a custom single legend
-handles = pp._legend_data.values()
-labels = pp._legend_data.keys()
-legend = pp.figure.legend(handles=handles, labels=labels, title='Sex', loc='right', fontsize=16, title_fontsize=17)
+def describe_data(df):
+    print(df.head())
+    print(df.describe())
 
-plt.show()
+    # Check for missing values
+    print(df.isnull().sum())
 
-"""Plot the distribution for individual features.
-Although this can be seen in the pairplot, this is done to show the plots clearer in the presentation.
-"""
+    # The minimum height value is 0.00 this is most likely an error made.(noise)
+    # Probe the data frame further to identify the noise.
+    condition = df['Height'] == 0
+    rows_with_height_zero = df[condition]
+    print(rows_with_height_zero)
+    print("\nRows where height is zero:", rows_with_height_zero.value_counts().sum())
 
-# Set up matplotlib figure with subplots
-fig, axes = plt.subplots(nrows=4, ncols=2, figsize=(14, 10))
+    df.info()
 
-# Plot density plots for 'Length'
-sns.kdeplot(data=df, x='Length', hue='Sex', fill=True, common_norm=False, ax=axes[0, 0])
-axes[0, 0].set_title('Density Plot for Length')
+    # Calculate the proportion of ages from 9.5 to 12.5
+    majorityAge = ((df["age"]>=9.5) & (df["age"]<=12.5))
+    ageProportion = majorityAge.sum()/df["age"].count()
+    print("Porportion of ages from 9.5 to 12.5:", ageProportion.round(2))
 
-# Plot density plots for 'Diameter'
-sns.kdeplot(data=df, x='Diameter', hue='Sex', fill=True, common_norm=False, ax=axes[0, 1])
-axes[0, 1].set_title('Density Plot for Diameter')
 
-# Plot density plots for 'Height'
-sns.kdeplot(data=df, x='Height', hue='Sex', fill=True, common_norm=False, ax=axes[1, 0])
-axes[1, 0].set_title('Density Plot for Height')
+def describe_stats(stats):
+    """`describe_data` from a `stream_stats.StreamingStats`, gathered in one pass over the file."""
+    print(stats.describe())
+    print(stats.nulls)
+    print("\nRows where height is zero:", stats.zeros['Height'])
+    print("Porportion of ages from 9.5 to 12.5:", round(stats.in_range('age', 9.5, 12.5), 2))
+    print(stats.corr())
 
-# Plot density plots for 'Whole weight'
-sns.kdeplot(data=df, x='Whole weight', hue='Sex', fill=True, common_norm=False, ax=axes[1, 1])
-axes[1, 1].set_title('Density Plot for Whole Weight')
 
-# Plot density plots for 'Shucked weight'
-sns.kdeplot(data=df, x='Shucked weight', hue='Sex', fill=True, common_norm=False, ax=axes[2, 0])
-axes[2, 0].set_title('Density Plot for Shucked Weight')
+def plot_pairplot(df, path=None):
+    plt, sns = _pyplot()
+    pp = sns.pairplot(df, hue='Sex', markers=["o", "s", "D"], corner=True)
 
-# Plot density plots for 'Viscera weight'
-sns.kdeplot(data=df, x='Viscera weight', hue='Sex', fill=True, common_norm=False, ax=axes[2, 1])
-axes[2, 1].set_title('Density Plot for Viscera Weight')
+    # Iterate over the axes object safely
+    for ax in pp.axes.flatten():
+        if ax is not None:
+            # Set label sizes
+            ax.set_xlabel(ax.get_xlabel(), fontsize=16)
+            ax.set_ylabel(ax.get_ylabel(), fontsize=16)
 
-# Plot density plots for 'Shell weight'
-sns.kdeplot(data=df, x='Shell weight', hue='Sex', fill=True, common_norm=False, ax=axes[3, 0])
-axes[3, 0].set_title('Density Plot for Shell Weight')
+            # Set tick label sizes
+            ax.tick_params(axis='both', which='major', labelsize=11)
 
-# Plot density plots for 'Age'
-sns.kdeplot(data=df, x='age', hue='Sex', fill=True, common_norm=False, ax=axes[3, 1])
-axes[3, 1].set_title('Density Plot for Age')
+    # Remove any existing automatic legends created by seaborn
+    pp._legend.remove()
 
-# Adjust layout for better viewing
-plt.tight_layout()
-plt.show()
+    # Add a custom single legend
+    handles = pp._legend_data.values()
+    labels = pp._legend_data.keys()
+    pp.figure.legend(handles=handles, labels=labels, title='Sex', loc='right', fontsize=16, title_fontsize=17)
 
-"""Plot the distribution of our target feature (Age)"""
+    _show(pp.figure, path)
 
-plt.figure(figsize=(12, 6))
-sns.countplot(x='age', data=df, palette='Dark2')
-plt.xticks(rotation=45)  # Rotate labels to make them more readable
-plt.title('Distribution of Age')
-plt.show()
 
-"""The distribution looks to be right-skewed with the mode at age 10.5
+def plot_feature_densities(df, path=None):
+    """Plot the distribution for individual features.
 
-Plot a boxplot for age. This shows the majority age range (9.5 to 12.5)
-"""
+    Although this can be seen in the pairplot, this is done to show the plots clearer in the presentation.
+    """
+    plt, sns = _pyplot()
+    fig, axes = plt.subplots(nrows=4, ncols=2, figsize=(14, 10))
 
-plt.style.use('ggplot')  # Use ggplot style
-plt.figure(figsize=(6, 12))
-sns.boxplot(y='age', data=df)
-plt.title('Age Boxplot')
-plt.ylabel('Age')
-plt.show()
+    titles = ['Length', 'Diameter', 'Height', 'Whole Weight', 'Shucked Weight', 'Viscera Weight', 'Shell Weight', 'Age']
+    for ax, feature, title in zip(axes.flatten(), col_except_rings + ['age'], titles):
+        sns.kdeplot(data=df, x=feature, hue='Sex', fill=True, common_norm=False, ax=ax)
+        ax.set_title('Density Plot for %s' % title)
 
-"""Calculate the proportion of ages from 9.5 to 12.5"""
+    # Adjust layout for better viewing
+    plt.tight_layout()
+    _show(fig, path)
 
-majorityAge = ((df["age"]>=9.5) & (df["age"]<=12.5))
-ageProportion = majorityAge.sum()/df["age"].count()
-print("Porportion of ages from 9.5 to 12.5:", ageProportion.round(2))
 
-"""Separate the features into numerical and categorical. Then, plot the correlation matrix."""
+def plot_age_distribution(df, path=None, box_path=None):
+    """Count plot of age (written to `path`) and an age boxplot (written to `box_path`)."""
+    plt, sns = _pyplot()
 
-numerical_val = df.select_dtypes(include=['int64', 'float64']).columns
-categorical_val = df.select_dtypes(include=['object']).columns
-col_except_rings = ['Length', 'Diameter', 'Height', 'Whole weight', 'Shucked weight', 'Viscera weight', 'Shell weight']
+    # The distribution looks to be right-skewed with the mode at age 10.5
+    fig = plt.figure(figsize=(12, 6))
+    sns.countplot(x='age', data=df, palette='Dark2')
+    plt.xticks(rotation=45)  # Rotate labels to make them more readable
+    plt.title('Distribution of Age')
+    _show(fig, path)
 
-numerical_val
+    # Boxplot for age. This shows the majority age range (9.5 to 12.5)
+    plt.style.use('ggplot')  # Use ggplot style
+    fig = plt.figure(figsize=(6, 12))
+    sns.boxplot(y='age', data=df)
+    plt.title('Age Boxplot')
+    plt.ylabel('Age')
+    _show(fig, box_path)
 
-categorical_val
 
-corr = df[numerical_val].corr()
+def plot_correlation(df, path=None):
+    """Plot the correlation matrix of the numerical features.
 
-# Mask for the upper triangle
-mask = np.triu(np.ones_like(corr, dtype=bool))
+    Key insights:
+    - Physical measurements have strong positive correlations with each other (0.77 to 0.99)
+    - Moderate positive correlations between most phyiscal measurements and Age (0.50 to 0.63)
+    - Weak positive correlation between Shucked weight and Age (0.42)
+    """
+    numerical_val = df.select_dtypes(include='number').columns
+    plot_correlation_matrix(df[numerical_val].corr(), path)
 
-plt.figure(figsize=(20,7))
 
-# Heatmap of correlation matrix
-sns.heatmap(corr, mask=mask, annot=True, cmap='coolwarm', fmt=".2f", linewidths=.5, cbar_kws={"shrink": .8})
+def plot_correlation_matrix(corr, path=None):
+    plt, sns = _pyplot()
 
-plt.show()
+    # Mask for the upper triangle
+    mask = np.triu(np.ones_like(corr, dtype=bool))
 
-"""**Key insights:**
+    fig = plt.figure(figsize=(20,7))
 
-- Physical measurements have strong positive correlations with each other (0.77 to 0.99)
+    # Heatmap of correlation matrix
+    sns.heatmap(corr, mask=mask, annot=True, cmap='coolwarm', fmt=".2f", linewidths=.5, cbar_kws={"shrink": .8})
 
-- Moderate positive correlations between **most** phyiscal measurements (Length, Diameter, Height, Whole weight, Viscera weight, Shell weight) and Age (0.50 to 0.63)
+    _show(fig, path)
 
-- Weak positive correlation between Shucked weight and Age (0.42)
 
-# Data Preprocessing
+def plot_feature_distributions(df, title, path=None):
+    """Histogram + boxplot for each numerical feature, used before and after cleaning outliers."""
+    plt, sns = _pyplot()
+    numerical_val = df.select_dtypes(include='number').columns
 
-## Handling Outliers
+    # Define the number of columns for subplots
+    num_cols = 2
+    num_rows = 7
 
-Using boxplot to see the outliers in numerical features
-"""
+    # Create subplots
+    fig, axes = plt.subplots(num_rows, num_cols, figsize=(14, 10))
+
+    # Flatten the axes array to iterate over the features
+    axes = axes.flatten()
+
+    # Iterate over each feature
+    for i, feature in enumerate(numerical_val):
+        if i < len(numerical_val) - 1:
+            # Plot histogram with KDE on the left side
+            sns.histplot(df[feature], kde=True, ax=axes[i*num_cols])
+            axes[i*num_cols].set_title(f'{feature} Distribution')
+            axes[i*num_cols].set_xlabel('')
+            axes[i*num_cols].set_ylabel('')
+
+            # Plot boxplot on the right side
+            sns.boxplot(x=df[feature], ax=axes[i*num_cols+1])
+            axes[i*num_cols+1].set_title(f'{feature} Boxplot')
+            axes[i*num_cols+1].set_xlabel('')
+            axes[i*num_cols+1].set_ylabel('')
 
-# Define the number of columns for subplots
-num_cols = 2
+    # Add a title for the entire subplot grid
+    fig.suptitle(title, fontsize=16)
 
-num_rows = 7
-# Create subplots
-fig, axes = plt.subplots(num_rows, num_cols, figsize=(14, 10))
+    # Adjust layout
+    plt.tight_layout()
+    _show(fig, path)
 
-# Flatten the axes array to iterate over the features
-axes = axes.flatten()
 
-# Iterate over each feature
-for i, feature in enumerate(numerical_val):
-    if i < len(numerical_val) - 1:
-        # Plot histogram with KDE on the left side
-        sns.histplot(df[feature], kde=True, ax=axes[i*num_cols])
-        axes[i*num_cols].set_title(f'{feature} Distribution')
-        axes[i*num_cols].set_xlabel('')
-        axes[i*num_cols].set_ylabel('')
+def run_eda(df):
+    describe_data(df)
+    plot_pairplot(df)
+    plot_feature_densities(df)
+    plot_age_distribution(df)
+    plot_correlation(df)
 
-        # Plot boxplot on the right side
-        sns.boxplot(x=df[feature], ax=axes[i*num_cols+1])
-        axes[i*num_cols+1].set_title(f'{feature} Boxplot')
-        axes[i*num_cols+1].set_xlabel('')
-        axes[i*num_cols+1].set_ylabel('')
 
-# Add a title for the entire subplot grid
-fig.suptitle('Distribution of Features Before Cleaning Outliers', fontsize=16)
+"""# Data Preprocessing
 
-# Adjust layout
-plt.tight_layout()
-plt.show()
+## Handling Outliers
 
-"""There are multiple ways to handle outliers:
+There are multiple ways to handle outliers:
 1.   Winsorizing - Replace outliers with IQR upper and lowerbound values
 2.   Averaging - Replace outliers with mean, median or mode values
 3.   Removing - remove all outlier datas
 
 After experimenting with all methods, removing provide the best results for all models.
-
-
 """
 
 def detect_outliers_iqr(data):
@@ -259,52 +306,58 @@ def detect_outliers_iqr(data):
     outliers = (data < lower_bound) | (data > upper_bound)
     return outliers
 
-cleaned_df_train = df.copy()  # Make a copy of the original DataFrame
-
-for col in col_except_rings:
-    # Detect outliers using the IQR method for the current column
-    outliers_mask = detect_outliers_iqr(cleaned_df_train[col])
-
-    # Remove outliers from the cleaned DataFrame
-    cleaned_df_train = cleaned_df_train[~outliers_mask]
-
-cleaned_df_train.reset_index(drop=True, inplace=True)
-
-"""Distribution after cleaning of data"""
-
-# Define the number of columns for subplots
-num_cols = 2
-
-num_rows = 7
-# Create subplots
-fig, axes = plt.subplots(num_rows, num_cols, figsize=(14, 10))
 
-# Flatten the axes array to iterate over the features
-axes = axes.flatten()
+outlier_methods = ['sequential', 'joint', 'winsorize', 'median']
 
-# Iterate over each feature
-for i, feature in enumerate(numerical_val):
-    if i < len(numerical_val) - 1:
-        # Plot histogram with KDE on the left side
-        sns.histplot(cleaned_df_train[feature], kde=True, ax=axes[i*num_cols])
-        axes[i*num_cols].set_title(f'{feature} Distribution')
-        axes[i*num_cols].set_xlabel('')
-        axes[i*num_cols].set_ylabel('')
 
-        # Plot boxplot on the right side
-        sns.boxplot(x=cleaned_df_train[feature], ax=axes[i*num_cols+1])
-        axes[i*num_cols+1].set_title(f'{feature} Boxplot')
-        axes[i*num_cols+1].set_xlabel('')
-        axes[i*num_cols+1].set_ylabel('')
-
-# Add a title for the entire subplot grid
-fig.suptitle('Distribution of Features After Cleaning Outliers', fontsize=16)
-
-# Adjust layout
-plt.tight_layout()
-plt.show()
+def iqr_bounds(values, k=1.5):
+    """Per-column IQR fences of a 2-D array in one vectorized pass (NaNs ignored, like pandas)."""
+    Q1, Q3 = np.nanquantile(values, [0.25, 0.75], axis=0)
+    IQR = Q3 - Q1
+    return Q1 - k * IQR, Q3 + k * IQR
+
+
+def remove_outliers(df, columns=col_except_rings, method='sequential', bounds=None):
+    """Handle IQR outliers in `columns`.
+
+    sequential  drop outliers column by column, each column's fences computed on the rows
+                that survived the previous columns (the original notebook behaviour)
+    joint       fences for all columns from the full data, drop rows outside any of them
+    winsorize   clip values to the joint fences, keeps every row
+    median      replace values outside the joint fences with the column median, keeps every row
+
+    Fences and masks are computed on one NumPy array and the frame is filtered or copied once.
+    `bounds` are precomputed (lower, upper) joint fences, e.g. `StreamingStats.iqr_bounds`.
+    """
+    if method not in outlier_methods:
+        raise ValueError('method must be one of %s, got %r' % (outlier_methods, method))
+    if bounds is not None and method == 'sequential':
+        raise ValueError("bounds are joint fences, method='sequential' recomputes them per column")
+    values = df[columns].to_numpy(dtype=float)
+
+    if method == 'sequential':
+        keep = np.ones(len(df), dtype=bool)
+        for j in range(len(columns)):
+            lower_bound, upper_bound = iqr_bounds(values[keep, j])
+            keep &= ~((values[:, j] < lower_bound) | (values[:, j] > upper_bound))
+    else:
+        lower_bound, upper_bound = iqr_bounds(values) if bounds is None else bounds
+        outliers = (values < lower_bound) | (values > upper_bound)
+        if method == 'joint':
+            keep = ~outliers.any(axis=1)
+        else:
+            cleaned_df_train = df.copy()
+            if method == 'winsorize':
+                replaced = np.clip(values, lower_bound, upper_bound)
+            else:
+                replaced = np.where(outliers, np.nanmedian(values, axis=0), values)
+            cleaned_df_train[columns] = replaced
+            return cleaned_df_train
+
+    cleaned_df_train = df[keep]
+    cleaned_df_train.reset_index(drop=True, inplace=True)
+    return cleaned_df_train
 
-cleaned_df_train.info()
 
 """## PCA
 
@@ -313,211 +366,203 @@ As all numerical attributes has high correlation with each other, except for the
 To check whether the multicollinearity will affect our model prediction, we will experiment using PCA on the cleaned dataset. PCA will create new uncorrelated components from the original features and also allow for dimensionality reduction since we captured most of the information in the dataset with the least amount of principle components.
 """
 
-from sklearn.decomposition import PCA
-from sklearn.preprocessing import StandardScaler
-
-feature_matrix = cleaned_df_train.iloc[:, 1:-1]
+def pca_explained_variance(X_scaled, method='full'):
+    """Cumulative explained variance ratio; a fitted `PCAStage` already holds it as `cumulative_variance_`."""
+    return PCAStage(method=method).fit(X_scaled).cumulative_variance_
 
-#feature_matrix = pd.get_dummies(feature_matrix)
 
-scaler = StandardScaler()
-X_scaled = scaler.fit_transform(feature_matrix)
+def plot_explained_variance(cumulative_var_exp, path=None):
+    plt, _ = _pyplot()
+    fig = plt.figure(figsize=(8, 6))
+    plt.plot(range(1, len(cumulative_var_exp) + 1), cumulative_var_exp, marker='o')
+    plt.xlabel('Number of Components')
+    plt.ylabel('Cumulative Explained Variance')
+    plt.title('Explained Variance by Component')
+    plt.grid(True)
+    _show(fig, path)
 
-pca = PCA()
-pca.fit(X_scaled)
 
-# Explained variance ratio
-explained_variance_ratio = pca.explained_variance_ratio_
-cumulative_var_exp = np.cumsum(explained_variance_ratio)
+def plot_pca_scatter(principalDf, path=None):
+    """Since, we cannot view 5-dimensional pca scatter plot, we will analyse using only PC1 and PC2,
+    which accounts for the highest explained variance."""
+    plt, _ = _pyplot()
+    fig = plt.figure(figsize=(8, 6))
+    plt.scatter(principalDf['principal component 1'], principalDf['principal component 2'])
+    plt.xlabel('Principal Component 1')
+    plt.ylabel('Principal Component 2')
+    plt.title('PCA Scatter Plot')
+    _show(fig, path)
 
-# Plot the explained variance ratio
-plt.figure(figsize=(8, 6))
-plt.plot(range(1, len(explained_variance_ratio) + 1), cumulative_var_exp, marker='o')
-plt.xlabel('Number of Components')
-plt.ylabel('Cumulative Explained Variance')
-plt.title('Explained Variance by Component')
-plt.grid(True)
-plt.show()
 
-"""Using the elbow method, it seems that the increase in explained variance slowed down after 5 components. Therefore, we will choose 5 Principle Components for our analysis."""
+def build_pca_features(cleaned_df, n_components=n_components, method='full', variance_threshold=None,
+                       max_components=None):
+    """Scale the cleaned measurements, project them onto `n_components` principal components
+    and add Sex back. Returns the combined frame plus the fitted scaler and PCA.
 
-n_components = 5
-pca = PCA(n_components=n_components)
-X_pca = pca.fit_transform(X_scaled)
+    The `PCAStage` also keeps the explained variance curve, so it is not fitted twice. With
+    `variance_threshold` the number of components is the fewest reaching that ratio.
+    `max_components` is how many leading directions method='randomized' computes.
+    """
+    feature_matrix = cleaned_df[col_except_rings]
 
-"""Since, we cannot view 5-dimensional pca scatter plot, we will analyse using only PC1 and PC2, which accounts for the highest explained variance. Based on the graph, we can see some clustering, with 1 big clusters and many smaller clusters."""
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(feature_matrix)
 
-# Create a DataFrame for the principal components
-principalDf = pd.DataFrame(data = X_pca, columns = ['principal component 1', 'principal component 2', 'principal component 3', 'principal component 4', 'principal component 5'])
+    # Using the elbow method, the increase in explained variance slowed down after 5 components.
+    pca = PCAStage(n_components=None if variance_threshold else n_components, variance_threshold=variance_threshold,
+                   method=method, max_components=max_components)
+    X_pca = pca.fit_transform(X_scaled)
 
-# Visualize the first two principal components
-plt.figure(figsize=(8, 6))
-plt.scatter(principalDf['principal component 1'], principalDf['principal component 2'])
-plt.xlabel('Principal Component 1')
-plt.ylabel('Principal Component 2')
-plt.title('PCA Scatter Plot')
-plt.show()
+    # Create a DataFrame for the principal components
+    principalDf = pd.DataFrame(data = X_pca, columns = ['principal component %d' % (i + 1) for i in range(pca.n_components_)])
 
-#add sex into principalDF
-df_combined = pd.concat([principalDf, cleaned_df_train.select_dtypes(include=['object'])], axis=1)
+    #add sex into principalDF
+    df_combined = pd.concat([principalDf, cleaned_df[['Sex']]], axis=1)
+    return df_combined, scaler, pca
 
-df_combined.info()
 
 """# Feature Selection and Standardization
 
 Instead of using only 1 dataset to train and test, we will use 3 different dataset to train and test. Reason being:
 
-
 1.   As observed, after the removal of outliers dataset, the correlation of predictor attribute and the target attribute decreases. Hence, it will be useful to have the original dataset as benchmark.
 2.   As observed, there are multicollinearity within the dataset, therefore, we should test whether having no correlation between predictor attributes improve the model.
 
 Other than PCA dataset which has been scaled previously, the other dataset will be normalised to improve model performance. Additionally, a random seed has been added to keep performance consistent for testing.
 """
 
-from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import train_test_split, cross_val_score
+def encode_sex(df):
+    """One-hot encode Sex with a fixed category order so every split gets the same columns."""
+    df = df.copy()
+    df['Sex'] = pd.Categorical(df['Sex'], categories=sex_categories)
+    return pd.get_dummies(df)
 
-random_seed = 42
-np.random.seed(random_seed)
-
-standardScale = StandardScaler()
-
-from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import train_test_split, cross_val_score
-
-random_seed = 42
-np.random.seed(random_seed)
-
-standardScale = StandardScaler()
-
-"""Original dataset"""
-
-df = pd.get_dummies(df)
 
-X1 = df.drop('age', axis = 1)
-y1 = df['age']
+def build_scaled_split(df, random_seed=random_seed):
+    """One-hot Sex, standardize every column and split, as for the original and cleaned datasets."""
+    encoded = encode_sex(df)
+    X = encoded.drop('age', axis = 1)
+    y = encoded['age']
 
-X_scaled1 = standardScale.fit_transform(X1)
+    standardScale = StandardScaler()
+    X_scaled = standardScale.fit_transform(X)
 
-X_train1, X_test1, y_train1, y_test1 = train_test_split(X_scaled1, y1, test_size=0.2, random_state=random_seed)
+    X_train, X_test, y_train, y_test = train_test_split(X_scaled, y, test_size=0.2, random_state=random_seed)
+    return {'X_train': X_train, 'X_test': X_test, 'y_train': y_train, 'y_test': y_test,
+            'columns': list(X.columns), 'scaler': standardScale, 'pca': None}
 
-"""Cleaned dataset"""
 
-# encode sex handling
-cleaned_df_train_encoded = pd.get_dummies(cleaned_df_train)
+def build_pca_split(cleaned_df, random_seed=random_seed, n_components=n_components, pca_method='full', pca_variance=None,
+                    pca_components=None):
+    """PCA dataset, the components are built from scaled data so they are not scaled again."""
+    df_combined, scaler, pca = build_pca_features(cleaned_df, n_components, pca_method, pca_variance, pca_components)
+    X3 = encode_sex(df_combined)
+    y3 = cleaned_df['age']
 
-X2 = cleaned_df_train_encoded.drop('age', axis = 1)
-y2 = cleaned_df_train_encoded['age']
+    X_train3, X_test3, y_train3, y_test3 = train_test_split(X3.to_numpy(dtype=float), y3, test_size=0.2, random_state=random_seed)
+    return {'X_train': X_train3, 'X_test': X_test3, 'y_train': y_train3, 'y_test': y_test3,
+            'columns': list(X3.columns), 'scaler': scaler, 'pca': pca}
 
-X_scaled2 = standardScale.fit_transform(X2)
 
-X_train2, X_test2, y_train2, y_test2 = train_test_split(X_scaled2, y2, test_size=0.2, random_state=random_seed)
+def build_datasets(df, cleaned_df, random_seed=random_seed, n_components=n_components, pca_method='full', pca_variance=None,
+                   pca_components=None):
+    """Build the original, cleaned and PCA train/test splits.
 
-"""PCA dataset"""
+    Each entry holds X_train/X_test/y_train/y_test plus the fitted `scaler`, `pca` and the
+    feature `columns`, which is everything needed to transform new records the same way.
+    """
+    np.random.seed(random_seed)
 
-X3 = pd.get_dummies(df_combined)
-y3 = cleaned_df_train['age']
+    return {
+        'original': build_scaled_split(df, random_seed),
+        'cleaned': build_scaled_split(cleaned_df, random_seed),
+        'pca': build_pca_split(cleaned_df, random_seed, n_components, pca_method, pca_variance, pca_components),
+    }
 
-X_train3, X_test3, y_train3, y_test3 = train_test_split(X3, y3, test_size=0.2, random_state=random_seed)
 
 """# Model Selection"""
 
-from sklearn.metrics import mean_absolute_error, mean_squared_error
-from sklearn.metrics import r2_score
-def model_evaluation(model, X_train, y_train, X_test, y_test, name):
-    model.fit(X_train, y_train)
-    y_train_pred = model.predict(X_train)
-    y_test_pred = model.predict(X_test)
+def regression_metrics(y_train, y_train_pred, y_test, y_test_pred):
+    return {
+        'mse_train': mean_squared_error(y_train, y_train_pred),
+        'mae_train': mean_absolute_error(y_train, y_train_pred),
+        'r2_train': r2_score(y_train, y_train_pred),
+        'mse_test': mean_squared_error(y_test, y_test_pred),
+        'mae_test': mean_absolute_error(y_test, y_test_pred),
+        'r2_test': r2_score(y_test, y_test_pred),
+    }
 
+
+def print_metrics(metrics, name):
     print('\nEvaluation for: %s\n'%name)
 
-    mse_train = mean_squared_error(y_train, y_train_pred)
-    print('Mean Squared error of training set: %.2f'%mse_train)
-    mae_train = mean_absolute_error(y_train, y_train_pred)
-    print('Mean Absolute error of training set: %.2f'%mae_train)
-    r2_train = r2_score(y_train, y_train_pred)
-    print('R2 Score of training set: %.2f'%r2_train)
+    print('Mean Squared error of training set: %.2f'%metrics['mse_train'])
+    print('Mean Absolute error of training set: %.2f'%metrics['mae_train'])
+    print('R2 Score of training set: %.2f'%metrics['r2_train'])
 
     print()
 
-    mse_test = mean_squared_error(y_test, y_test_pred)
-    print('Mean Squared error of testing set: %.2f'%mse_test)
-    mae_test = mean_absolute_error(y_test, y_test_pred)
-    print('Mean Absolute error of testing set: %.2f'%mae_test)
-    r2_test = r2_score(y_test, y_test_pred)
-    print('R2 Score of testing set: %.2f'%r2_test)
-
-"""# 1) Linear Regression"""
-
-from sklearn.linear_model import LinearRegression
-
-model_evaluation(LinearRegression(), X_train1, y_train1, X_test1, y_test1,  'Linear Regression Original Dataset')
-model_evaluation(LinearRegression(), X_train2, y_train2, X_test2, y_test2,  'Linear Regression Cleaned Dataset')
-model_evaluation(LinearRegression(), X_train3, y_train3, X_test3, y_test3,  'Linear Regression PCA Dataset')
-
-"""# 2) Ridge"""
-
-from sklearn.linear_model import Ridge
-
-model_evaluation(Ridge(), X_train1, y_train1, X_test1, y_test1,  'Ridge Original Dataset')
-model_evaluation(Ridge(), X_train2, y_train2, X_test2, y_test2,  'Ridge Cleaned Dataset')
-model_evaluation(Ridge(), X_train3, y_train3, X_test3, y_test3,  'Ridge PCA Dataset')
-
-"""# 3) Support Vector Regression"""
+    print('Mean Squared error of testing set: %.2f'%metrics['mse_test'])
+    print('Mean Absolute error of testing set: %.2f'%metrics['mae_test'])
+    print('R2 Score of testing set: %.2f'%metrics['r2_test'])
 
-from sklearn.svm import SVR
 
-"""10min per model total 25min"""
+def model_evaluation(model, X_train, y_train, X_test, y_test, name, verbose=True):
+    """Fit `model` and score both sets; returns the metrics plus fit/predict wall time and peak RSS."""
+    with profiler.stage('model_evaluation'), profiler.stage(name), PeakRSS() as peak:
+        start = time.perf_counter()
+        with profiler.stage('fit'):
+            model.fit(X_train, y_train)
+        fit_time = time.perf_counter() - start
 
-model_evaluation(SVR(kernel = 'linear'), X_train1, y_train1, X_test1, y_test1,  'SVR Original Dataset')
-model_evaluation(SVR(kernel = 'linear'), X_train2, y_train2, X_test2, y_test2,  'SVR Cleaned Dataset')
-model_evaluation(SVR(kernel = 'linear'), X_train3, y_train3, X_test3, y_test3,  'SVR PCA Dataset')
+        start = time.perf_counter()
+        with profiler.stage('predict_train'):
+            y_train_pred = model.predict(X_train)
+        with profiler.stage('predict_test'):
+            y_test_pred = model.predict(X_test)
+        predict_time = time.perf_counter() - start
 
-"""#4) Decision Tree Regression"""
+    metrics = regression_metrics(y_train, y_train_pred, y_test, y_test_pred)
+    if verbose:
+        print_metrics(metrics, name)
+    metrics.update(fit_time=fit_time, predict_time=predict_time, peak_memory=peak.bytes)
+    return metrics
 
-from sklearn.tree import DecisionTreeRegressor
 
-model_evaluation(DecisionTreeRegressor(random_state=42), X_train1, y_train1, X_test1, y_test1,  'DecisionTreeRegressor Original Dataset')
-model_evaluation(DecisionTreeRegressor(random_state=42), X_train2, y_train2, X_test2, y_test2,  'DecisionTreeRegressor Cleaned Dataset')
-model_evaluation(DecisionTreeRegressor(random_state=42), X_train3, y_train3, X_test3, y_test3,  'DecisionTreeRegressor PCA Dataset')
+def model_families():
+    """The estimators compared in model selection, keyed by display name."""
+    from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+    from sklearn.linear_model import LinearRegression, Ridge
+    from sklearn.neighbors import KNeighborsRegressor
+    from sklearn.svm import SVR
+    from sklearn.tree import DecisionTreeRegressor
 
-"""# 5) Random Forest Regression"""
+    return {
+        'Linear Regression': LinearRegression,
+        'Ridge': Ridge,
+        # 10min per model total 25min
+        'SVR': lambda: SVR(kernel = 'linear'),
+        'DecisionTreeRegressor': lambda: DecisionTreeRegressor(random_state=42),
+        'RandomForestRegressor': RandomForestRegressor,
+        'GradientBoostingRegressor': GradientBoostingRegressor,
+        'KNN': lambda: KNeighborsRegressor(n_neighbors =4 ),
+    }
 
-from sklearn.ensemble import RandomForestRegressor
 
-model_evaluation(RandomForestRegressor(), X_train1, y_train1, X_test1, y_test1,  'RandomForestRegressor Original Dataset')
-model_evaluation(RandomForestRegressor(), X_train2, y_train2, X_test2, y_test2,  'RandomForestRegressor Cleaned Dataset')
-model_evaluation(RandomForestRegressor(), X_train3, y_train3, X_test3, y_test3,  'RandomForestRegressor PCA Dataset')
+def evaluation_name(family, dataset):
+    return '%s %s Dataset' % (family, 'PCA' if dataset == 'pca' else dataset.capitalize())
 
-"""# 6) Gradient Boosting Regression"""
 
-from sklearn.ensemble import GradientBoostingRegressor
+"""#8) Artificial Neural Network"""
 
-model_evaluation(GradientBoostingRegressor(), X_train1, y_train1, X_test1, y_test1,  'GradientBoostingRegressor Original Dataset')
-model_evaluation(GradientBoostingRegressor(), X_train2, y_train2, X_test2, y_test2,  'GradientBoostingRegressor Cleaned Dataset')
-model_evaluation(GradientBoostingRegressor(), X_train3, y_train3, X_test3, y_test3,  'GradientBoostingRegressor PCA Dataset')
+def build_ann(n_features):
+    Sequential, Dense, _, Input, _ = _keras()
 
-from sklearn.neighbors import KNeighborsRegressor
-
-model_evaluation(KNeighborsRegressor(n_neighbors =4 ), X_train1, y_train1, X_test1, y_test1,  'KNN Original Dataset')
-model_evaluation(KNeighborsRegressor(n_neighbors =4 ), X_train2, y_train2, X_test2, y_test2,  'KNN Cleaned Dataset')
-model_evaluation(KNeighborsRegressor(n_neighbors =4 ), X_train3, y_train3, X_test3, y_test3,  'KNN PCA Dataset')
-
-"""#8) Artificial Neural Network
-
-"""
-
-import tensorflow as tf
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Dense
-from tensorflow.keras import Input
-
-def ann_model_evaluation(X_train, y_train, X_test, y_test, name):
     # Build the ANN
     ann_model = Sequential()
 
-        # Input layer
-    ann_model.add(Input(shape=(X_train.shape[1],)))
+    # Input layer
+    ann_model.add(Input(shape=(n_features,)))
 
     # First hidden layer
     ann_model.add(Dense(64, activation='relu'))
@@ -530,215 +575,224 @@ def ann_model_evaluation(X_train, y_train, X_test, y_test, name):
 
     # Compile the model
     ann_model.compile(optimizer='adam', loss='mse')
+    return ann_model
 
-    # Train the model
-    ann_model.fit(X_train, y_train, epochs=100, batch_size=32, validation_split=0.2, verbose=0)
-
-    y_train_pred = ann_model.predict(X_train)
-    y_test_pred = ann_model.predict(X_test)
-
-    print('Evaluation for: %s\n'%name)
-
-    mse_train = mean_squared_error(y_train, y_train_pred)
-    print('Mean Squared error of training set: %.2f'%mse_train)
-    mae_train = mean_absolute_error(y_train, y_train_pred)
-    print('Mean Absolute error of training set: %.2f'%mae_train)
-    r2_train = r2_score(y_train, y_train_pred)
-    print('R2 Score of training set: %.2f'%r2_train)
-
-    print()
-
-    mse_test = mean_squared_error(y_test, y_test_pred)
-    print('Mean Squared error of testing set: %.2f'%mse_test)
-    mae_test = mean_absolute_error(y_test, y_test_pred)
-    print('Mean Absolute error of testing set: %.2f'%mae_test)
-    r2_test = r2_score(y_test, y_test_pred)
-    print('R2 Score of testing set: %.2f'%r2_test)
-
-ann_model_evaluation(X_train1, y_train1, X_test1, y_test1,  'ANN Original Dataset')
-ann_model_evaluation(X_train2, y_train2, X_test2, y_test2,  'ANN Cleaned Dataset')
-ann_model_evaluation(X_train3, y_train3, X_test3, y_test3,  'ANN PCA Dataset')
-
-"""# Hyperparameter Tunning Using GridSearchCV"""
-
-from sklearn.model_selection import  GridSearchCV
 
-#Hyperparameter tunning
-# Hyperparameter tuning using GridSearchCV
-def hyperparameter_tuning(model, param_grid):
-    grid_search = GridSearchCV(estimator=model, param_grid=param_grid, scoring='r2', cv=5, n_jobs=-1)
-    grid_search.fit(X_train, y_train)
-    best_params = grid_search.best_params_
-    best_score = grid_search.best_score_
-    return best_params, best_score
-
-"""Linear Regression does not have hyperparameters"""
+ann_params = {'layers': [64, 32, 1], 'epochs': 100, 'batch_size': 32}
 
-# Linear Regression
 
-#initialise the model
-lr = LinearRegression()
+def ann_model_evaluation(X_train, y_train, X_test, y_test, name, verbose=True):
+    """Build and train the ANN and score both sets; returns the metrics plus fit/predict wall time and peak RSS."""
+    with profiler.stage('ann_model_evaluation'), profiler.stage(name), PeakRSS() as peak:
+        with profiler.stage('build'):
+            ann_model = build_ann(X_train.shape[1])
 
-# fit the model to the training data
-lr.fit(X_train, y_train)
+        # Train the model
+        start = time.perf_counter()
+        with profiler.stage('fit'):
+            ann_model.fit(X_train, y_train, epochs=ann_params['epochs'], batch_size=ann_params['batch_size'],
+                          validation_split=0.2, verbose=0)
+        fit_time = time.perf_counter() - start
 
-#predict the target values for the training data
-y_train_pred = lr.predict(X_train)
+        start = time.perf_counter()
+        with profiler.stage('predict_train'):
+            y_train_pred = ann_model.predict(X_train, verbose=0).ravel()
+        with profiler.stage('predict_test'):
+            y_test_pred = ann_model.predict(X_test, verbose=0).ravel()
+        predict_time = time.perf_counter() - start
 
-#predict the target values for the test data
-y_test_pred = lr.predict(X_test)
+    metrics = regression_metrics(y_train, y_train_pred, y_test, y_test_pred)
+    if verbose:
+        print_metrics(metrics, name)
+    metrics.update(fit_time=fit_time, predict_time=predict_time, peak_memory=peak.bytes)
+    return metrics
 
-# calculate and print the R2 score for the test data
-# R2 score indicates how well the model's predictions match the actual target values
-# ranges from 0 to 1, 1 means perfect prediction and 0 means no better than the mean of the target variable
-print(f'Linear Regression R2 Score: {r2_score(y_test, y_test_pred)}')
 
-# Calculate and print the Mean Squared Error for the test data
-mse_test = mean_squared_error(y_test, y_test_pred)
-print(f'Linear Regression Mean Squared Error: {mse_test:.2f}')
+"""# Hyperparameter Tunning Using GridSearchCV"""
 
-# Ridge Regression
 ridge_params = {
     'alpha': [0.01, 0.1, 1, 10, 100],
     'solver': ['auto', 'svd', 'cholesky', 'lsqr', 'sparse_cg', 'sag', 'saga']
 }
-
-ridge_best_params, ridge_best_score = hyperparameter_tuning(Ridge(random_state=42), ridge_params)
-
-# Display the best parameters and best score
-print(f'Best Ridge Params: {ridge_best_params}, Best Ridge Score: {ridge_best_score}')
-
-# Create the Ridge model with the best parameters
-ridge_mod = Ridge(**ridge_best_params, random_state=42)
-
-# Train the model with the training data
-ridge_mod.fit(X_train, y_train)
-
-# Make predictions on the test data
-ridge_model_pred = ridge_mod.predict(X_test)
-
-# Evaluate the model's performance
-ridge_r2 = ridge_mod.score(X_test, y_test)
-ridge_mse = mean_squared_error(y_test, ridge_model_pred)
-
-print(f'Ridge Regression R2 Score: {ridge_r2:.2f}')
-print(f'Ridge Regression Mean Squared Error: {ridge_mse:.2f}')
-
-# Support Vector Regressor
-
 svr_params = {'kernel': ['linear', 'poly', 'rbf', 'sigmoid'], 'C': [0.1, 1, 10, 100], 'gamma': ['scale', 'auto']}
-svr_best_params, svr_best_score = hyperparameter_tuning(SVR(), svr_params)
-
-# Display the best parameters and best score
-print(f'Best SVR Params: {svr_best_params}, Best SVR Score: {svr_best_score}')
-
-#create the SVR model with the best parameters
-svr_mod = SVR(**svr_best_params)
-
-#train the model with the training data
-svr_mod.fit(X_train, y_train)
-
-# Make predictions on the test data
-svr_model_pred = svr_mod.predict(X_test)
-
-# Evaluate the model's performance
-svr_r2 = svr_mod.score(X_test, y_test)
-svr_mse = mean_squared_error(y_test, svr_model_pred)
-
-print(f'Support Vector Regression R2 Score: {svr_r2:.2f}')
-print(f'Support Vector Regression Mean Squared Error: {svr_mse:.2f}')
-
-# Random Forest Regressor
 rf_params = {'n_estimators': [50, 100, 200], 'max_depth': [None, 10, 20, 30], 'min_samples_split': [2, 5, 10], 'min_samples_leaf': [1, 2, 4]}
-rf_best_params, rf_best_score = hyperparameter_tuning(RandomForestRegressor(random_state=42), rf_params)
-
-# Display the best parameters and best score
-print(f'Best RF Params: {rf_best_params}, Best RF Score: {rf_best_score}')
-
-#create the RF model with the best parameters
-rf_mod = RandomForestRegressor(**rf_best_params, random_state=42)
-
-#train the model with the training data
-rf_mod.fit(X_train, y_train)
-
-# Make predictions on the test data
-rf_model_pred = rf_mod.predict(X_test)
-
-# Evaluate the model's performance
-rf_r2 = rf_mod.score(X_test, y_test)
-rf_mse = mean_squared_error(y_test, rf_model_pred)
-
-print(f'Random Forest Regression R2 Score: {rf_r2:.2f}')
-print(f'Random Forest Regression Mean Squared Error: {rf_mse:.2f}')
-
-# Gradient Boosting Regressor
 gbr_params = {'n_estimators': [50, 100, 200], 'learning_rate': [0.01, 0.1, 0.2], 'max_depth': [3, 4, 5]}
-gbr_best_params, gbr_best_score = hyperparameter_tuning(GradientBoostingRegressor(random_state=42), gbr_params)
-
-# Display the best parameters and best score
-print(f'Best GBR Params: {gbr_best_params}, Best GBR Score: {gbr_best_score}')
-
-#create the GBR model with the best parameters
-gbr_mod = GradientBoostingRegressor(**gbr_best_params, random_state=42)
-
-#train the model with the training data
-gbr_mod.fit(X_train2, y_train2)
-
-#Make predictions on the test data
-gbr_model_pred = gbr_mod.predict(X_test2)
-
-# Evaluate the model's performance
-gbr_r2 = gbr_mod.score(X_test2, y_test2)
-gbr_mse = mean_squared_error(y_test2, gbr_model_pred)
-
-print(f'Gradient Boosting Regression R2 Score: {gbr_r2:.2f}')
-print(f'Gradient Boosting Regression Mean Squared Error: {gbr_mse:.2f}')
-
-# K-Nearest Neighbors Regressor
 knn_params = {'n_neighbors': [3, 5, 7, 9], 'weights': ['uniform', 'distance'], 'algorithm': ['auto', 'ball_tree', 'kd_tree', 'brute']}
-knn_best_params, knn_best_score = hyperparameter_tuning(KNeighborsRegressor(), knn_params)
-
-# Display the best parameters and best score
-print(f'Best KNN Params: {knn_best_params}, Best KNN Score: {knn_best_score}')
-
-#create the KNN model with the best parameters
-knn_mod = KNeighborsRegressor(**knn_best_params)
-
-#train the model with the training data
-knn_mod.fit(X_train, y_train)
-
-# Make predictions on the test data
-knn_model_pred = knn_mod.predict(X_test)
-
-# Evaluate the model's performance
-knn_r2 = knn_mod.score(X_test, y_test)
-knn_mse = mean_squared_error(y_test, knn_model_pred)
-
-print(f'K-Nearest Neighbors Regression R2 Score: {knn_r2:.2f}')
-print(f'K-Nearest Neighbors Regression Mean Squared Error: {knn_mse:.2f}')
-
-!pip install keras-tuner
+dt_params = {
+    'max_depth': [None, 10, 20, 30, 40, 50],  # Maximum depth of the tree
+    'min_samples_split': [2, 10, 20],         # Minimum samples required to split an internal node
+    'min_samples_leaf': [1, 5, 10]            # Minimum samples required to be at a leaf node
+}
 
-#Artificial Neural Network
 
-import tensorflow as tf
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Dense, Dropout
-from tensorflow.keras import Input
-from tensorflow.keras.callbacks import EarlyStopping
-from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
-import keras_tuner as kt
+# Hyperparameter tuning using GridSearchCV
+def hyperparameter_tuning(model, param_grid, X_train, y_train, store=None, name=None, dataset=None,
+                          search='grid', make_model=None, resource='n_samples', cache=None, folds=None):
+    """Best params and mean CV R2 for `param_grid`.
+
+    search='grid' is the exhaustive GridSearchCV; search='halving' runs
+    `tuning.successive_halving` on `make_model`, spending the budget on rows or
+    n_estimators (`resource`) and dropping the worst candidates at each rung. An
+    exhaustive grid over `n_estimators` for an ensemble (`resource='n_estimators'`) grows
+    one warm-started ensemble per remaining combination (`tuning.warm_start_search`).
+    `folds` is a `folds.FoldCache` of X_train/y_train shared by all the searches. Ridge's
+    alpha grid is solved in closed form (`linear_engine.ridge_cv_scores`, untransformed
+    folds only); every solver reaches the same optimum, so the solver axis is not searched.
+    """
+    from sklearn.linear_model import Ridge
+    stage = name or type(model).__name__
+    if (isinstance(model, Ridge) and set(param_grid) <= {'alpha', 'solver'}
+            and (folds is None or folds.transform is None)):
+        from folds import FoldCache
+        from linear_engine import ridge_cv_scores
+        alphas = param_grid['alpha']
+        if len(param_grid.get('solver', [])) > 1:
+            warnings.warn('%s: Ridge alphas are solved in closed form, the solver grid %s is not searched'
+                          % (stage, param_grid['solver']))
+        with profiler.stage('hyperparameter_tuning'), profiler.stage(stage), profiler.stage('ridge_path'):
+            if folds is None:
+                with FoldCache(X_train, y_train) as own_folds:
+                    scores = ridge_cv_scores(own_folds, alphas)
+            else:
+                scores = ridge_cv_scores(folds, alphas)
+        if store is not None:
+            store.record_many({'kind': 'tuning_trial', 'name': name, 'family': 'Ridge', 'dataset': dataset,
+                               'params': {'alpha': alpha}, 'cv_score': score, 'cv_metric': 'r2'}
+                              for alpha, score in zip(alphas, scores))
+        best = int(np.argmax(scores))
+        return {'alpha': alphas[best], 'solver': 'auto'}, float(scores[best])
+
+    if search == 'grid' and not (resource == 'n_estimators' and 'n_estimators' in param_grid):
+        grid_search = GridSearchCV(estimator=model, param_grid=param_grid, scoring='r2', n_jobs=-1,
+                                   cv=5 if folds is None else folds.splits)
+        with profiler.stage('hyperparameter_tuning'), profiler.stage(stage), profiler.stage('grid_search'):
+            if folds is None:
+                grid_search.fit(X_train, y_train)
+            else:
+                # Memory-mapped arrays are passed to the workers by file name, not pickled
+                grid_search.fit(folds.X, folds.y)
+
+        if store is not None:
+            # One row per candidate, the CV score is the mean R2 over the folds
+            cv = grid_search.cv_results_
+            store.record_many({'kind': 'tuning_trial', 'name': name, 'family': type(model).__name__, 'dataset': dataset,
+                               'params': params, 'cv_score': score, 'cv_metric': 'r2', 'fit_time': fit_time, 'predict_time': score_time}
+                              for params, score, fit_time, score_time in zip(cv['params'], cv['mean_test_score'],
+                                                                             cv['mean_fit_time'], cv['mean_score_time']))
+        return grid_search.best_params_, grid_search.best_score_
+
+    from tuning import successive_halving, warm_start_search
+    if search == 'halving':
+        with profiler.stage('hyperparameter_tuning'), profiler.stage(stage), profiler.stage('halving_search'):
+            best_params, best_score, report = successive_halving(make_model, param_grid, X_train, y_train,
+                                                                 resource=resource, cache=cache, folds=folds)
+        trials = [dict(trial, params=dict(trial['params'], _budget=trial['budget'], _resource=resource)) for trial in report['trials']]
+    else:
+        with profiler.stage('hyperparameter_tuning'), profiler.stage(stage), profiler.stage('warm_start_search'):
+            best_params, best_score, report = warm_start_search(make_model, param_grid, X_train, y_train, cache=cache, folds=folds)
+        trials = report['trials']
+
+    if store is not None:
+        store.record_many({'kind': 'tuning_trial', 'name': name, 'family': type(model).__name__, 'dataset': dataset,
+                           'params': trial['params'], 'cv_score': trial['score'], 'cv_metric': 'r2',
+                           'fit_time': trial.get('fit_time')} for trial in trials)
+    return best_params, best_score
 
-# Normalize the data
-scaler = StandardScaler()
-X_train_scaled = scaler.fit_transform(X_train)
-X_test_scaled = scaler.transform(X_test)
 
-# Define a function to create the model
-def build_model(hp):
+def evaluate_tuned(model, split, label, store=None, dataset=None, cv_score=None, fit=None, predict=None, params=None, family=None):
+    """Fit a tuned model on the training data, score both sets and record a 'tuned' row."""
+    fit = fit or (lambda: model.fit(split['X_train'], split['y_train']))
+    predict = predict or model.predict
+
+    with profiler.stage('hyperparameter_tuning'), profiler.stage(label), PeakRSS() as peak:
+        start = time.perf_counter()
+        with profiler.stage('fit'):
+            fit()
+        fit_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with profiler.stage('predict_train'):
+            y_train_pred = predict(split['X_train'])
+        with profiler.stage('predict_test'):
+            y_test_pred = predict(split['X_test'])
+        predict_time = time.perf_counter() - start
+
+    metrics = regression_metrics(split['y_train'], y_train_pred, split['y_test'], y_test_pred)
+    if store is not None:
+        if params is None and hasattr(model, 'get_params'):
+            params = model.get_params()
+        store.record(kind='tuned', name=label, family=family or type(model).__name__, dataset=dataset, params=params,
+                     cv_score=cv_score, cv_metric=None if cv_score is None else 'r2',
+                     fit_time=fit_time, predict_time=predict_time, peak_memory=peak.bytes, **metrics)
+    return metrics
+
+
+def tune_models(split, store=None, dataset='cleaned', search='grid', cache=None, svr='auto'):
+    """Tune every sklearn family on one split and refit the winners.
+
+    Returns {label: (fitted model, test metrics)}; with a `store`, every search candidate
+    and every refit winner is recorded. `search` and `cache` (a `tuning.TrialCache`) are
+    passed to `hyperparameter_tuning`; all searches share one `folds.FoldCache`. With
+    svr='approx' (or 'auto' above `approx_svr.exact_svr_max_rows` training rows) the SVR
+    grid is searched with the kernel-approximating `approx_svr.ApproxSVR`. The tuned KNN is
+    refit as a `knn_index.KNNIndex`, whose tree is built once and saved with the model.
+    """
+    from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+    from sklearn.linear_model import LinearRegression, Ridge
+    from sklearn.neighbors import KNeighborsRegressor
+    from sklearn.svm import SVR
+    from sklearn.tree import DecisionTreeRegressor
+
+    from approx_svr import ApproxSVR, exact_svr_max_rows
+    from folds import FoldCache
+    from knn_index import KNNIndex
+
+    X_train, y_train = split['X_train'], split['y_train']
+    tuned = {}
+    if svr == 'approx' or (svr == 'auto' and len(X_train) > exact_svr_max_rows):
+        make_svr = lambda **p: ApproxSVR(**p)
+    else:
+        make_svr = lambda **p: SVR(**p)
+
+    # Linear Regression does not have hyperparameters
+    lr = LinearRegression()
+    metrics = evaluate_tuned(lr, split, 'Linear Regression (Tuned)', store, dataset)
+    print(f'Linear Regression R2 Score: {metrics["r2_test"]}')
+    print(f'Linear Regression Mean Squared Error: {metrics["mse_test"]:.2f}')
+    tuned['Linear Regression (Tuned)'] = (lr, {'MSE': metrics['mse_test'], 'R2': metrics['r2_test']})
+
+    searches = [
+        ('Ridge', 'Ridge Regression', 'Ridge Regression (Tuned)', lambda **p: Ridge(**p, random_state=42), ridge_params),
+        ('SVR', 'Support Vector Regression', 'SVR (Tuned)', make_svr, svr_params),
+        ('RF', 'Random Forest Regression', 'Random Forest Regressor (Tuned)', lambda **p: RandomForestRegressor(**p, random_state=42), rf_params),
+        ('GBR', 'Gradient Boosting Regression', 'Gradient Boosting Regressor (Tuned)', lambda **p: GradientBoostingRegressor(**p, random_state=42), gbr_params),
+        ('KNN', 'K-Nearest Neighbors Regression', 'K-Nearest Neighbors (Tuned)', lambda **p: KNeighborsRegressor(**p), knn_params),
+        ('DT', 'Decision Tree Regression', 'Decision Tree Regressor (Tuned)', lambda **p: DecisionTreeRegressor(**p, random_state=42), dt_params),
+    ]
+    with FoldCache(X_train, y_train) as folds:
+        for short, long_name, label, make_model, params in searches:
+            # The ensembles are halved on n_estimators, everything else on training rows
+            resource = 'n_estimators' if short in ('RF', 'GBR') else 'n_samples'
+            best_params, best_score = hyperparameter_tuning(make_model(), params, X_train, y_train, store, label, dataset,
+                                                            search, make_model, resource, cache, folds)
+
+            # Display the best parameters and best score
+            print(f'Best {short} Params: {best_params}, Best {short} Score: {best_score}')
+
+            # Create the model with the best parameters, train it and evaluate it on the test data
+            model = KNNIndex(**best_params) if short == 'KNN' else make_model(**best_params)
+            metrics = evaluate_tuned(model, split, label, store, dataset, cv_score=best_score)
+
+            print(f'{long_name} R2 Score: {metrics["r2_test"]:.2f}')
+            print(f'{long_name} Mean Squared Error: {metrics["mse_test"]:.2f}')
+            tuned[label] = (model, {'MSE': metrics['mse_test'], 'R2': metrics['r2_test']})
+    return tuned
+
+
+def build_tuned_ann(hp, n_features):
+    Sequential, Dense, Dropout, Input, _ = _keras()
     model = Sequential()
-    model.add(Input(shape=(X_train_scaled.shape[1],)))
+    model.add(Input(shape=(n_features,)))
 
     # First hidden layer with variable number of units
     model.add(Dense(units=hp.Int('units', min_value=32, max_value=128, step=32), activation=hp.Choice('activation', values=['relu', 'tanh'])))
@@ -758,103 +812,201 @@ def build_model(hp):
     )
     return model
 
-# Initialize KerasTuner
-tuner = kt.RandomSearch(
-    build_model,
-    objective='val_mean_squared_error',
-    max_trials=10,  # Increase the number of trials
-    executions_per_trial=1,
-    directory='my_dir',
-    project_name='ann_tuning'
-)
-
-# Implement early stopping
-early_stopping = EarlyStopping(monitor='val_loss', patience=10, restore_best_weights=True)
-
-# Perform hyperparameter search
-tuner.search(X_train_scaled, y_train, epochs=100, validation_split=0.2, callbacks=[early_stopping])
-
-# Retrieve the best hyperparameters and model
-best_model = tuner.get_best_models(num_models=1)[0]
-best_params = tuner.get_best_hyperparameters()[0]
-
-print(f'Best Parameters: {best_params.values}')
-
-# Train the best model
-best_model.fit(X_train_scaled, y_train, epochs=100, batch_size=32, validation_split=0.2, callbacks=[early_stopping])
-
-# Predict using the best model
-ann_model_pred_train = best_model.predict(X_train_scaled)
-ann_model_pred_test = best_model.predict(X_test_scaled)
-
-# Evaluate the best model
-mse_train = mean_squared_error(y_train, ann_model_pred_train)
-mae_train = mean_absolute_error(y_train, ann_model_pred_train)
-r2_train = r2_score(y_train, ann_model_pred_train)
-
-mse_test = mean_squared_error(y_test, ann_model_pred_test)
-mae_test = mean_absolute_error(y_test, ann_model_pred_test)
-r2_test = r2_score(y_test, ann_model_pred_test)
-
-print(f'\nMean Squared error of training set: {mse_train:.2f}')
-print(f'Mean Absolute error of training set: {mae_train:.2f}')
-print(f'R2 Score of training set: {r2_train:.2f}')
-
-print(f'\nMean Squared error of testing set: {mse_test:.2f}')
-print(f'Mean Absolute error of testing set: {mae_test:.2f}')
-print(f'R2 Score of testing set: {r2_test:.2f}')
-
-#Decision Tree Regressor
-# Define the hyperparameter grid
-param_grid = {
-    'max_depth': [None, 10, 20, 30, 40, 50],  # Maximum depth of the tree
-    'min_samples_split': [2, 10, 20],         # Minimum samples required to split an internal node
-    'min_samples_leaf': [1, 5, 10]            # Minimum samples required to be at a leaf node
-}
-
-#initialize GridSearchCV with DecisionTreeRegressor
-grid = GridSearchCV(estimator=DecisionTreeRegressor(random_state=42),
-                    param_grid=param_grid,
-                    scoring='r2',  # Use R2 as the scoring metric
-                    cv=5,          # 5-fold cross-validation
-                    n_jobs=-1)     # Use all available cores
-
-#fit GridSearchCV to the training data
-grid_result = grid.fit(X_train, y_train)
-
-#print the best parameters and best score
-print(f'Best Parameters: {grid_result.best_params_}')
-print(f'Best R2 Score: {grid_result.best_score_}')
-
-#use the best estimator to predict on test data
-best_dt = grid_result.best_estimator_
-y_test_pred = best_dt.predict(X_test)
-
-#evaluate the model's performance
-best_test_mse = mean_squared_error(y_test, y_test_pred)
-best_test_r2 = r2_score(y_test, y_test_pred)
-print(f'Decision Tree Regression Mean Squared Error: {best_test_mse:.2f}')
-print(f'Decision Tree Regression R2 Score: {best_test_r2:.2f}')
-
-# Define performance metrics for each model
-model_performance = {
-    'Linear Regression (Tuned)': {'MSE': 4.46, 'R2': 0.549},
-    'Ridge Regression (Tuned)': {'MSE': 4.46, 'R2': 0.55},
-    'SVR (Tuned)': {'MSE': 4.42, 'R2': 0.55},
-    'Decision Tree Regressor (Tuned)': {'MSE': 5.49, 'R2': 0.45},
-    'Random Forest Regressor (Tuned)': {'MSE': 4.33, 'R2': 0.56},
-    'K-Nearest Neighbors (Tuned)': {'MSE': 5.18, 'R2': 0.52},
-    'Gradient Boosting Regressor (Tuned)': {'MSE': 4.55, 'R2': 0.54},
-    'ANN (Tuned)': {'MSE': 4.29, 'R2': 0.57}
-}
-
-# Find the model with the highest R2 Score
-best_model = max(model_performance, key=lambda x: model_performance[x]['R2'])
-best_model_metrics = model_performance[best_model]
-
-# Display the best model and its performance metrics
-print(f'Best Model: {best_model}')
-print(f'Mean Squared Error: {best_model_metrics["MSE"]:.2f}')
-print(f'R2 Score: {best_model_metrics["R2"]:.2f}')
 
-"""# In conclusion, The Artificial Neural Network (ANN) model (both untuned and tuned) shows the best performance with the highest R2 score of 0.57 and the lowest MSE around 4.22 to 4.29. This indicates that the ANN model is the best choice for predicting abalone age in this context."""
\ No newline at end of file
+def tune_ann(split, directory='my_dir', project_name='ann_tuning', store=None, dataset='cleaned', max_trials=10, n_jobs=None):
+    """Random search over the ANN architecture (`ann_tuning.search`).
+
+    Trials run in parallel processes and are checkpointed under directory/project_name,
+    so a rerun resumes the search and only trains configurations not evaluated before.
+    """
+    import ann_tuning
+    _, _, _, _, EarlyStopping = _keras()
+
+    X_train, y_train, X_test, y_test = split['X_train'], split['y_train'], split['X_test'], split['y_test']
+
+    # Normalize the data
+    scaler = StandardScaler()
+    X_train_scaled = scaler.fit_transform(X_train)
+    X_test_scaled = scaler.transform(X_test)
+
+    # Perform hyperparameter search
+    trial_dir = os.path.join(directory, project_name)
+    with profiler.stage('hyperparameter_tuning'), profiler.stage('ANN (Tuned)'), profiler.stage('search'):
+        records = ann_tuning.search(X_train_scaled, y_train, directory=trial_dir, max_trials=max_trials, n_jobs=n_jobs)
+
+    # Rebuild the best model from its checkpointed weights
+    best_params = records[0]['config']
+    best_model = build_tuned_ann(ann_tuning.FixedHyperParameters(best_params), X_train_scaled.shape[1])
+    best_model.set_weights(ann_tuning.load_weights(trial_dir, records[0]['key']))
+
+    print(f'Best Parameters: {best_params}')
+
+    if store is not None:
+        store.record_many({'kind': 'tuning_trial', 'name': 'ANN (Tuned)', 'family': 'ANN', 'dataset': dataset,
+                           'params': record['config'], 'cv_score': record['score'], 'cv_metric': 'val_mean_squared_error'}
+                          for record in records)
+
+    # Implement early stopping
+    early_stopping = EarlyStopping(monitor='val_loss', patience=10, restore_best_weights=True)
+
+    # Train the best model and evaluate it
+    scaled_split = {'X_train': X_train_scaled, 'y_train': y_train, 'X_test': X_test_scaled, 'y_test': y_test}
+    metrics = evaluate_tuned(
+        best_model, scaled_split, 'ANN (Tuned)', store, dataset, params=best_params, family='ANN',
+        fit=lambda: best_model.fit(X_train_scaled, y_train, epochs=100, batch_size=32, validation_split=0.2, callbacks=[early_stopping]),
+        predict=lambda X: best_model.predict(X).ravel())
+    print_metrics(metrics, 'ANN (Tuned)')
+    return best_model, scaler, {'MSE': metrics['mse_test'], 'R2': metrics['r2_test']}
+
+
+"""# Best model"""
+
+def select_best_model(store, run_id=None):
+    """Pick the tuned model with the highest test R2 from the results store (latest run by default)."""
+    best = store.best(kind='tuned', metric='r2_test', run_id=run_id)
+    if best is None:
+        print(f'No tuned results in {store.path}')
+        return None
+
+    # Display the best model and its performance metrics
+    print(f'Best Model: {best["name"]} (run {best["run_id"]})')
+    print(f'Mean Squared Error: {best["mse_test"]:.2f}')
+    print(f'R2 Score: {best["r2_test"]:.2f}')
+    return best
+
+
+"""# In conclusion, The Artificial Neural Network (ANN) model (both untuned and tuned) shows the best performance with the highest R2 score of 0.57 and the lowest MSE around 4.22 to 4.29. This indicates that the ANN model is the best choice for predicting abalone age in this context."""
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Abalone age prediction pipeline')
+    parser.add_argument('--data', default=DATA_PATH, help='path to abalone.csv')
+    parser.add_argument('--compact', action='store_true', help='chunked float32/categorical ingestion (see ingest.py)')
+    parser.add_argument('--cache', metavar='PATH', help='Parquet/Feather cache of the parsed data, implies --compact')
+    parser.add_argument('--dataset-cache', metavar='DIR', help='reuse cached cleaned frames and splits from DIR (skips the EDA)')
+    parser.add_argument('--no-plots', action='store_true', help='skip the EDA and PCA plots')
+    parser.add_argument('--report', metavar='DIR', help='write the EDA figures to DIR in worker processes instead of showing them (see eda_report.py)')
+    parser.add_argument('--skip-ann', action='store_true', help='skip the TensorFlow stages')
+    parser.add_argument('--ann-stream', action='store_true',
+                        help='also train the ANN streaming from --cache (or --data) through tf.data, see ann_streaming.py')
+    parser.add_argument('--skip-tuning', action='store_true', help='skip hyperparameter tuning')
+    parser.add_argument('--search', choices=['grid', 'halving'], default='grid', help='exhaustive grid or successive-halving search (see tuning.py)')
+    parser.add_argument('--svr', choices=['auto', 'exact', 'approx'], default='auto',
+                        help='exact SVR or kernel-approximating ApproxSVR for the SVR search (auto: approx above 20k rows)')
+    parser.add_argument('--trial-cache', metavar='PATH', help='SQLite cache of CV cells for --search halving and the ensemble grids')
+    parser.add_argument('--stream-stats', action='store_true',
+                        help='summary statistics, and the fences for --outliers joint/winsorize/median, from one parallel scan of the file (see stream_stats.py)')
+    parser.add_argument('--pca-method', choices=pca_methods, default='full', help='PCA decomposition, see pca_stage.py')
+    parser.add_argument('--pca-variance', type=float, metavar='RATIO',
+                        help='pick the number of PCA components reaching this explained variance (default: %d components)' % n_components)
+    parser.add_argument('--pca-components', type=int, metavar='N',
+                        help='leading directions computed by --pca-method randomized (default: all)')
+    parser.add_argument('--outliers', choices=outlier_methods, default='sequential', help='outlier handling, see remove_outliers')
+    parser.add_argument('--jobs', type=int, default=None, help='worker processes for model selection and ANN tuning trials (default: all cores)')
+    parser.add_argument('--results', default='results.sqlite', help='SQLite results store to append to')
+    parser.add_argument('--profile', metavar='PATH', help='profile the stages, write PATH (JSON) and PATH.folded')
+    parser.add_argument('--save-model', metavar='PATH', help='save the best tuned model as an AgePredictor artifact directory')
+    args = parser.parse_args(argv)
+    if args.pca_components is not None and args.pca_method != 'randomized':
+        parser.error('--pca-components only applies to --pca-method randomized')
+
+    store = ResultsStore(args.results)
+    if args.profile:
+        profiler.enable()
+
+    if args.dataset_cache:
+        # Splits come from the content-addressed cache; the EDA needs the raw frames so it is skipped
+        ignored = [flag for flag, value in [('--stream-stats', args.stream_stats), ('--report', args.report),
+                                            ('--cache', args.cache and not (args.ann_stream and not args.skip_ann))]
+                   if value]
+        if ignored:
+            warnings.warn('%s ignored with --dataset-cache, which skips loading the data and the EDA' % ', '.join(ignored))
+        from dataset_cache import DatasetCache
+        datasets = DatasetCache(args.dataset_cache).build_datasets(args.data, args.outliers, compact=args.compact,
+                                                                   pca_method=args.pca_method, pca_variance=args.pca_variance,
+                                                                   pca_components=args.pca_components)
+    else:
+        df = load_data(args.data, compact=args.compact, cache_path=args.cache)
+        bounds = None
+        if args.stream_stats:
+            from stream_stats import scan
+            stats = scan(args.cache or args.data, n_jobs=args.jobs)
+            describe_stats(stats)
+            if args.outliers == 'sequential':
+                warnings.warn('--stream-stats fences are only used by --outliers joint, winsorize or median; '
+                              'sequential outlier removal computes its own')
+            else:
+                bounds = stats.iqr_bounds(col_except_rings)
+        else:
+            describe_data(df)
+        interactive = not args.no_plots and not args.report
+        if interactive:
+            plot_pairplot(df)
+            plot_feature_densities(df)
+            plot_age_distribution(df)
+            plot_correlation(df)
+            plot_feature_distributions(df, 'Distribution of Features Before Cleaning Outliers')
+
+        cleaned_df_train = remove_outliers(df, method=args.outliers, bounds=bounds)
+        cleaned_df_train.info()
+        if interactive:
+            plot_feature_distributions(cleaned_df_train, 'Distribution of Features After Cleaning Outliers')
+        if args.report:
+            from eda_report import eda_report
+            eda_report(df, cleaned_df_train, args.report, n_jobs=args.jobs)
+            print(f'EDA report written to {os.path.join(args.report, "index.html")}')
+
+        datasets = build_datasets(df, cleaned_df_train, pca_method=args.pca_method, pca_variance=args.pca_variance,
+                                  pca_components=args.pca_components)
+        if interactive:
+            # The split's PCA already holds the variance curve, only the projection is recomputed
+            pca = datasets['pca']['pca']
+            plot_explained_variance(pca.cumulative_variance_)
+            X_scaled = datasets['pca']['scaler'].transform(cleaned_df_train[col_except_rings])
+            principalDf = pd.DataFrame(pca.transform(X_scaled),
+                                       columns=['principal component %d' % (i + 1) for i in range(pca.n_components_)])
+            plot_pca_scatter(principalDf)
+
+    from model_zoo import run_zoo, zoo_registry
+    results = run_zoo(datasets, zoo_registry(include_ann=not args.skip_ann), n_jobs=args.jobs)
+    print(results.drop(columns='params').to_string(index=False))
+    store.record_frame(results, kind='evaluation')
+
+    if args.ann_stream and not args.skip_ann:
+        from ann_streaming import train_streaming
+        _, history = train_streaming(args.cache or args.data)
+        print('Streaming ANN: %d epochs, best val_mse %.4f, %.0f samples/s in the last epoch' % (
+            len(history), min(row['val_mse'] for row in history), history[-1]['samples_per_sec']))
+
+    if not args.skip_tuning:
+        # Tuning is done on the cleaned dataset
+        split = datasets['cleaned']
+        cache = None
+        if args.trial_cache:
+            from tuning import TrialCache
+            cache = TrialCache(args.trial_cache)
+        tuned = tune_models(split, store, search=args.search, cache=cache, svr=args.svr)
+        candidates = {label: AgePredictor.from_split(split, model) for label, (model, _) in tuned.items()}
+        if not args.skip_ann:
+            ann_model, ann_scaler, _ = tune_ann(split, store=store, n_jobs=args.jobs)
+            # Serve the ANN from the NumPy runtime, checked against Keras on the test rows
+            from ann_runtime import DenseNetwork, verify_against_keras
+            network = DenseNetwork.from_keras(ann_model)
+            X_check = split['X_test'] if ann_scaler is None else ann_scaler.transform(split['X_test'])
+            print(f'NumPy ANN runtime max |diff| vs Keras: {verify_against_keras(network, ann_model, X_check):.2e}')
+            candidates['ANN (Tuned)'] = AgePredictor.from_split(split, network, ann_scaler)
+
+        best = select_best_model(store, run_id=store.run_id)
+        if args.save_model:
+            candidates[best['name']].save(args.save_model)
+            print(f'Saved {best["name"]} to {args.save_model}')
+    else:
+        select_best_model(store)
+
+    store.close()
+    if args.profile:
+        profiler.to_json(args.profile)
+        profiler.to_folded(args.profile + '.folded')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""NumPy forward pass for the Dense ANNs, so serving them does not need TensorFlow.
+
+`DenseNetwork.from_keras` copies the weights, biases and activation names of a trained
+Sequential model of Dense (and Dropout, an identity at inference) layers into plain
+arrays. `predict` is the same float32 forward pass Keras runs, and the artifact format
+stores the arrays as .npy files, so a saved ANN loads and predicts with NumPy alone:
+
+    network = DenseNetwork.from_keras(ann_model)
+    verify_against_keras(network, ann_model, split['X_test'])   # max |diff|, raises above tolerance
+    network.predict(X)
+"""
+
+import numpy as np
+
+
+def _sigmoid(x):
+    return 1 / (1 + np.exp(-x))
+
+
+activation_functions = {
+    'linear': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0),
+    'tanh': np.tanh,
+    'sigmoid': _sigmoid,
+    'elu': lambda x: np.where(x > 0, x, np.expm1(np.minimum(x, 0))),
+    'selu': lambda x: np.float32(1.0507009873554805) * np.where(x > 0, x, np.float32(1.6732632423543772) * np.expm1(np.minimum(x, 0))),
+    'softplus': lambda x: np.logaddexp(np.float32(0), x),
+    'swish': lambda x: x * _sigmoid(x),
+    'silu': lambda x: x * _sigmoid(x),
+}
+
+# Layers that do nothing at inference time
+passthrough_layers = ['Dropout', 'InputLayer', 'GaussianNoise', 'GaussianDropout', 'AlphaDropout']
+
+
+class DenseNetwork:
+    def __init__(self, weights, biases, activations):
+        unknown = set(activations) - set(activation_functions)
+        if unknown:
+            raise ValueError('unsupported activations %s' % sorted(unknown))
+        self.weights = [np.asarray(w, dtype=np.float32) for w in weights]
+        self.biases = [np.asarray(b, dtype=np.float32) for b in biases]
+        self.activations = list(activations)
+
+    @classmethod
+    def from_keras(cls, model):
+        """Export a Sequential model of Dense layers; raises TypeError for any other layer."""
+        weights, biases, activations = [], [], []
+        for layer in model.layers:
+            kind = type(layer).__name__
+            if kind in passthrough_layers:
+                continue
+            if kind != 'Dense':
+                raise TypeError('cannot export %s layer %r to a DenseNetwork' % (kind, layer.name))
+            params = layer.get_weights()
+            weights.append(params[0])
+            biases.append(params[1] if len(params) > 1 else np.zeros(params[0].shape[1], dtype=np.float32))
+            activation = layer.get_config()['activation']
+            activations.append(activation if isinstance(activation, str) else activation.get('config', {}).get('name', repr(activation)))
+        return cls(weights, biases, activations)
+
+    def arrays(self):
+        arrays = {}
+        for i, (w, b) in enumerate(zip(self.weights, self.biases)):
+            arrays['W%d' % i] = w
+            arrays['b%d' % i] = b
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays, activations):
+        return cls([arrays['W%d' % i] for i in range(len(activations))],
+                   [arrays['b%d' % i] for i in range(len(activations))], activations)
+
+    def predict(self, X, batch_size=65536):
+        """(n_rows, n_outputs) float32 outputs, like `keras.Model.predict`."""
+        X = np.asarray(X, dtype=np.float32)
+        outputs = []
+        for start in range(0, max(len(X), 1), batch_size):
+            h = X[start:start + batch_size]
+            for w, b, activation in zip(self.weights, self.biases, self.activations):
+                h = activation_functions[activation](h @ w + b)
+            outputs.append(h)
+        return np.concatenate(outputs)
+
+
+def verify_against_keras(network, model, X, atol=1e-4, rtol=1e-5):
+    """Max |difference| between the NumPy and Keras predictions on X; ValueError if not allclose."""
+    expected = np.asarray(model.predict(X, verbose=0), dtype=np.float64)
+    actual = network.predict(X).astype(np.float64)
+    if expected.shape != actual.shape:
+        raise ValueError('output shape %s differs from Keras %s' % (actual.shape, expected.shape))
+    difference = float(np.abs(actual - expected).max()) if len(expected) else 0.0
+    if not np.allclose(actual, expected, atol=atol, rtol=rtol):
+        raise ValueError('NumPy ANN differs from Keras by up to %.3g' % difference)
+    return difference
@@ -0,0 +1,217 @@
+"""Streaming ANN training from the abalone data on disk.
+
+`model.fit(X, y, batch_size=32)` needs the whole split in memory and runs one small,
+eagerly dispatched step per 32 rows. `train_streaming` reads the CSV (through
+`ingest.iter_chunks`) or its Parquet/Feather cache chunk by chunk, so only one
+chunk is in memory, and feeds a `tf.data` pipeline that batches and prefetches while the
+previous batch trains. The training step is a `tf.function` (XLA-compiled by default),
+the batch size doubles between epochs while that still raises samples/sec, and early
+stopping on the validation MSE is on by default, restoring the best weights:
+
+    predictor, history = train_streaming('abalone.parquet', epochs=100)
+    history[-1]['samples_per_sec']
+    predictor.predict(new_df)
+
+Preprocessing matches `build_scaled_split` (one-hot Sex, then standardize every column)
+with the mean/scale taken in one pass over the file. Every `validation_every`-th row is
+held out for validation, whatever the chunk size.
+"""
+
+import time
+
+import numpy as np
+
+from ingest import iter_chunks
+from predictor import AgePredictor, measurement_columns
+from profiling import profiler
+
+sex_categories = ['F', 'I', 'M']
+
+
+def _encode(chunk, categories):
+    measurements = chunk[measurement_columns].to_numpy(dtype=float)
+    sex = chunk['Sex'].to_numpy()
+    return np.hstack([measurements, np.stack([sex == c for c in categories], axis=1)])
+
+
+def fit_preprocessing(path, chunksize=1_000_000, categories=sex_categories):
+    """A transform-only `AgePredictor` standardizing the encoded columns, from one pass over the file."""
+    n, mean, m2 = 0, None, None
+    for chunk in iter_chunks(path, chunksize):
+        X = _encode(chunk, categories)
+        if not len(X):
+            continue
+        chunk_mean = X.mean(axis=0)
+        chunk_m2 = ((X - chunk_mean) ** 2).sum(axis=0)
+        if mean is None:
+            n, mean, m2 = len(X), chunk_mean, chunk_m2
+        else:
+            # Chan et al. merge of two (count, mean, M2) summaries
+            total = n + len(X)
+            delta = chunk_mean - mean
+            mean = mean + delta * len(X) / total
+            m2 = m2 + chunk_m2 + delta ** 2 * n * len(X) / total
+            n = total
+    if mean is None:
+        raise ValueError('%s has no rows' % path)
+    scale = np.sqrt(m2 / n)
+    scale[scale == 0] = 1.0   # as StandardScaler does for constant columns
+    columns = measurement_columns + ['Sex_' + c for c in categories]
+    return AgePredictor(None, columns, [(mean, scale)], categories)
+
+
+def iter_batches(path, transform, batch_size, part='train', validation_every=5, chunksize=1_000_000, seed=None):
+    """(X, y) float32 batches of the training or validation rows, one chunk in memory at a time.
+
+    With a `seed` rows are shuffled within each chunk. A batch that would straddle two
+    chunks is completed from the next one, so every batch but the last is full.
+    """
+    rng = None if seed is None else np.random.RandomState(seed)
+    offset = 0
+    carry_X, carry_y = np.empty((0, len(transform.columns)), np.float32), np.empty(0, np.float32)
+    for chunk in iter_chunks(path, chunksize):
+        held_out = (offset + np.arange(len(chunk))) % validation_every == 0
+        offset += len(chunk)
+        chunk = chunk[held_out if part == 'validation' else ~held_out]
+        X = transform.transform(chunk['Sex'].to_numpy(), chunk[measurement_columns].to_numpy(dtype=float)).astype(np.float32)
+        y = chunk['age'].to_numpy(dtype=np.float32)
+        if rng is not None:
+            order = rng.permutation(len(y))
+            X, y = X[order], y[order]
+        X, y = np.concatenate([carry_X, X]), np.concatenate([carry_y, y])
+        full = len(y) - len(y) % batch_size
+        for start in range(0, full, batch_size):
+            yield X[start:start + batch_size], y[start:start + batch_size]
+        carry_X, carry_y = X[full:], y[full:]
+    if len(carry_y):
+        yield carry_X, carry_y
+
+
+def make_dataset(path, transform, batch_size, part='train', validation_every=5, chunksize=1_000_000, seed=None):
+    """`tf.data.Dataset` over `iter_batches`, prefetching batches while the previous one trains.
+
+    `batch_size` is read each time the dataset is iterated, so it may be a callable
+    returning the current size (as the adaptive schedule does).
+    """
+    import tensorflow as tf
+
+    n_features = len(transform.columns)
+    epoch = [0]
+
+    def generator():
+        size = batch_size() if callable(batch_size) else batch_size
+        epoch_seed = None if seed is None else seed + epoch[0]
+        epoch[0] += 1
+        yield from iter_batches(path, transform, size, part, validation_every, chunksize, epoch_seed)
+
+    signature = (tf.TensorSpec((None, n_features), tf.float32), tf.TensorSpec((None,), tf.float32))
+    return tf.data.Dataset.from_generator(generator, output_signature=signature).prefetch(tf.data.AUTOTUNE)
+
+
+def _compiled_steps(model, n_features, jit_compile):
+    import tensorflow as tf
+
+    signature = [tf.TensorSpec((None, n_features), tf.float32), tf.TensorSpec((None,), tf.float32)]
+    optimizer = model.optimizer
+    # Optimizer slots must exist before the step is traced
+    optimizer.build(model.trainable_variables)
+
+    @tf.function(input_signature=signature, jit_compile=jit_compile)
+    def train_step(X, y):
+        with tf.GradientTape() as tape:
+            loss = tf.reduce_mean(tf.square(y - model(X, training=True)[:, 0]))
+        optimizer.apply_gradients(zip(tape.gradient(loss, model.trainable_variables), model.trainable_variables))
+        return loss
+
+    @tf.function(input_signature=signature, jit_compile=jit_compile)
+    def squared_error(X, y):
+        return tf.reduce_sum(tf.square(y - model(X, training=False)[:, 0]))
+
+    return train_step, squared_error
+
+
+def train_streaming(path, model=None, epochs=100, batch_size=256, max_batch_size=8192, min_speedup=0.1,
+                    patience=10, validation_every=5, chunksize=1_000_000, jit_compile=True, seed=42, transform=None):
+    """Train `model` (default `build_ann`) streaming from `path`; returns (AgePredictor, history).
+
+    The batch size starts at `batch_size` and doubles after each epoch, up to
+    `max_batch_size`, until doubling raises samples/sec by less than `min_speedup`; it then
+    stays at the fastest size seen. Training stops after `patience` epochs without a better
+    validation MSE (None trains all `epochs`) and the best weights are restored. `history`
+    has one dict per epoch with batch_size, samples, seconds, samples_per_sec, loss and
+    val_mse, also printed as the epoch ends.
+    """
+    import tensorflow as tf
+
+    from abalone_age_model import build_ann
+
+    tf.keras.utils.set_random_seed(seed)
+    with profiler.stage('ann_streaming'):
+        with profiler.stage('fit_preprocessing'):
+            transform = transform or fit_preprocessing(path, chunksize)
+        model = model or build_ann(len(transform.columns))
+        train_step, squared_error = _compiled_steps(model, len(transform.columns), jit_compile)
+
+        schedule = {'batch_size': batch_size, 'growing': True, 'best_rate': 0.0, 'best_size': batch_size}
+        train = make_dataset(path, transform, lambda: schedule['batch_size'], 'train', validation_every, chunksize, seed)
+        validation = make_dataset(path, transform, max_batch_size, 'validation', validation_every, chunksize)
+
+        history = []
+        best_mse, best_weights, stale = np.inf, None, 0
+        for epoch in range(epochs):
+            size = schedule['batch_size']
+            with profiler.stage('epoch'):
+                start = time.perf_counter()
+                samples, loss_sum = 0, 0.0
+                for X, y in train:
+                    loss = train_step(X, y)
+                    n = int(y.shape[0])
+                    samples += n
+                    loss_sum += float(loss) * n
+                seconds = time.perf_counter() - start
+
+                val_n, val_sum = 0, 0.0
+                for X, y in validation:
+                    val_sum += float(squared_error(X, y))
+                    val_n += int(y.shape[0])
+            if not samples:
+                raise ValueError('%s has no training rows' % path)
+
+            row = {'epoch': epoch + 1, 'batch_size': size, 'samples': samples, 'seconds': seconds,
+                   'samples_per_sec': samples / seconds if seconds > 0 else float('inf'),
+                   'loss': loss_sum / samples, 'val_mse': val_sum / val_n if val_n else float('nan')}
+            history.append(row)
+            print('epoch %3d  batch %5d  loss %.4f  val_mse %.4f  %10.0f samples/s' % (
+                row['epoch'], size, row['loss'], row['val_mse'], row['samples_per_sec']))
+
+            if epoch:
+                # The first epoch includes tracing and compiling the step, it is not a fair rate
+                _adapt_batch_size(schedule, row['samples_per_sec'], max_batch_size, min_speedup)
+
+            if row['val_mse'] < best_mse:
+                best_mse, best_weights, stale = row['val_mse'], model.get_weights(), 0
+            else:
+                stale += 1
+                if patience is not None and stale >= patience:
+                    break
+
+        if best_weights is not None:
+            model.set_weights(best_weights)
+    transform.model = model
+    return transform, history
+
+
+def _adapt_batch_size(schedule, rate, max_batch_size, min_speedup):
+    if not schedule['growing']:
+        return
+    if schedule['best_rate'] and rate < schedule['best_rate'] * (1 + min_speedup):
+        # Doubling no longer pays off, settle on the fastest size seen
+        if rate < schedule['best_rate']:
+            schedule['batch_size'] = schedule['best_size']
+        schedule['growing'] = False
+        return
+    schedule['best_rate'], schedule['best_size'] = rate, schedule['batch_size']
+    if schedule['batch_size'] * 2 > max_batch_size:
+        schedule['growing'] = False
+    else:
+        schedule['batch_size'] *= 2
@@ -0,0 +1,185 @@
+"""Parallel, resumable random search over the tuned ANN architecture.
+
+Replaces `kt.RandomSearch`, which runs trials one after another and starts over after a
+crash. Trial configurations are drawn in a fixed order (by `seed`) from `ann_space`, the
+space `build_tuned_ann` samples, and each one is trained in its own process. Every
+finished trial is checkpointed in `directory` as `<key>.json` (config, validation MSE,
+epochs run) plus `<key>.npz` (the trained weights), keyed by the config, the training
+data, the epoch budget and the seed. A new search with the same directory first counts
+the checkpointed trials that still lie in the space, then fills up to `max_trials` with new
+draws, so an interrupted search resumes where it stopped and raising `max_trials` or
+widening the space only trains the new configurations:
+
+    records = search(X_train_scaled, y_train, directory='my_dir/ann_tuning', max_trials=10, n_jobs=4)
+    records[0]['config'], records[0]['score']
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+
+import numpy as np
+
+from folds import data_fingerprint
+
+# Values build_tuned_ann can ask for (hp.Int/Float/Choice ranges there)
+ann_space = {
+    'units': [32, 64, 96, 128],
+    'activation': ['relu', 'tanh'],
+    'dropout_rate': [0.2, 0.3, 0.4, 0.5],
+    'units2': [16, 32, 48, 64],
+    'optimizer': ['adam', 'rmsprop'],
+}
+
+
+class FixedHyperParameters:
+    """Stands in for keras-tuner's `hp` in `build_tuned_ann`, answering from a fixed config."""
+
+    def __init__(self, values):
+        self.values = dict(values)
+
+    def _get(self, name, allowed):
+        value = self.values[name]
+        if value not in allowed:
+            raise ValueError('%s=%r is outside the model space %r' % (name, value, allowed))
+        return value
+
+    def Int(self, name, min_value, max_value, step=1):
+        return self._get(name, list(range(min_value, max_value + 1, step)))
+
+    def Float(self, name, min_value, max_value, step):
+        value = self.values[name]
+        if not min_value - 1e-9 <= value <= max_value + 1e-9:
+            raise ValueError('%s=%r is outside [%r, %r]' % (name, value, min_value, max_value))
+        return value
+
+    def Choice(self, name, values):
+        return self._get(name, list(values))
+
+
+def sample_configs(space=ann_space, max_trials=10, seed=42):
+    """The first `max_trials` distinct configs of a seeded shuffle of the whole space."""
+    names = sorted(space)
+    sizes = [len(space[name]) for name in names]
+    order = np.random.RandomState(seed).permutation(int(np.prod(sizes)))[:max_trials]
+    configs = []
+    for index in order:
+        config = {}
+        for name, size in zip(reversed(names), reversed(sizes)):
+            index, position = divmod(int(index), size)
+            value = space[name][position]
+            config[name] = value.item() if isinstance(value, np.generic) else value
+        configs.append(config)
+    return configs
+
+
+def trial_key(config, fingerprint, epochs, seed):
+    return hashlib.sha1(json.dumps([config, fingerprint, epochs, seed], sort_keys=True).encode()).hexdigest()[:20]
+
+
+def in_space(config, space):
+    return set(config) == set(space) and all(config[name] in values for name, values in space.items())
+
+
+def load_trials(directory):
+    """{key: record} of every checkpointed trial in `directory`."""
+    trials = {}
+    if os.path.isdir(directory):
+        for name in os.listdir(directory):
+            if name.endswith('.json'):
+                with open(os.path.join(directory, name)) as f:
+                    trials[name[:-len('.json')]] = json.load(f)
+    return trials
+
+
+def load_weights(directory, key):
+    with np.load(os.path.join(directory, key + '.npz')) as data:
+        return [data['w%d' % i] for i in range(len(data.files))]
+
+
+def _checkpoint(directory, key, record, weights):
+    # Weights first, then the record: a record on disk always has its weights
+    np.savez(os.path.join(directory, key + '.tmp.npz'), **{'w%d' % i: w for i, w in enumerate(weights)})
+    os.replace(os.path.join(directory, key + '.tmp.npz'), os.path.join(directory, key + '.npz'))
+    with open(os.path.join(directory, key + '.json.tmp'), 'w') as f:
+        json.dump(record, f)
+    os.replace(os.path.join(directory, key + '.json.tmp'), os.path.join(directory, key + '.json'))
+
+
+def _init_worker(threads):
+    # Keep TensorFlow to its share of the cores, set before it is imported
+    os.environ['TF_NUM_INTRAOP_THREADS'] = str(threads)
+    os.environ['TF_NUM_INTEROP_THREADS'] = '1'
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+
+
+def run_trial(config, X_path, y_path, epochs=100, seed=42, patience=10):
+    """Train one config; returns (best validation MSE, epochs run, weights)."""
+    import tensorflow as tf
+
+    from abalone_age_model import _keras, build_tuned_ann
+    _, _, _, _, EarlyStopping = _keras()
+
+    tf.keras.utils.set_random_seed(seed)
+    X = np.load(X_path, mmap_mode='r')
+    y = np.load(y_path, mmap_mode='r')
+    model = build_tuned_ann(FixedHyperParameters(config), X.shape[1])
+    early_stopping = EarlyStopping(monitor='val_loss', patience=patience, restore_best_weights=True)
+    history = model.fit(np.asarray(X), np.asarray(y), epochs=epochs, validation_split=0.2, callbacks=[early_stopping], verbose=0)
+    return float(min(history.history['val_mean_squared_error'])), len(history.history['loss']), model.get_weights()
+
+
+def search(X, y, directory='my_dir/ann_tuning', space=ann_space, max_trials=10, epochs=100, seed=42, n_jobs=None):
+    """Run every trial not checkpointed yet; returns the records of all `max_trials` configs, best first.
+
+    Each record has key, config, score (validation MSE, lower is better) and epochs_run;
+    the weights are read with `load_weights(directory, key)`.
+    """
+    X = np.asarray(X, dtype=np.float32)
+    y = np.asarray(y, dtype=np.float32)
+    os.makedirs(directory, exist_ok=True)
+    fingerprint = data_fingerprint(X, y)
+    done = {key: record for key, record in load_trials(directory).items()
+            if (record['fingerprint'], record['max_epochs'], record['seed']) == (fingerprint, epochs, seed)
+            and in_space(record['config'], space)}
+
+    # Trials from earlier runs count first, new draws fill up to max_trials
+    configs = {key: done[key]['config'] for key in sorted(done)[:max_trials]}
+    for config in sample_configs(space, int(np.prod([len(values) for values in space.values()])), seed):
+        if len(configs) >= max_trials:
+            break
+        configs.setdefault(trial_key(config, fingerprint, epochs, seed), config)
+    pending = [key for key in configs if key not in done]
+    print('ANN search: %d trials, %d checkpointed in %s, %d to run' % (len(configs), len(configs) - len(pending), directory, len(pending)))
+
+    n_jobs = max(1, min(n_jobs or os.cpu_count(), len(pending) or 1))
+    shm_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+    with tempfile.TemporaryDirectory(prefix='abalone-ann-', dir=shm_dir) as data_dir:
+        # Workers memory-map the training data instead of receiving a pickled copy
+        X_path, y_path = os.path.join(data_dir, 'X.npy'), os.path.join(data_dir, 'y.npy')
+        np.save(X_path, X)
+        np.save(y_path, y)
+
+        def finish(key, result):
+            score, epochs_run, weights = result
+            record = {'key': key, 'config': configs[key], 'score': score, 'epochs_run': epochs_run,
+                      'fingerprint': fingerprint, 'max_epochs': epochs, 'seed': seed}
+            _checkpoint(directory, key, record, weights)
+            done[key] = record
+            print('  trial %s %s val_mse=%.4f (%d epochs)' % (key, configs[key], score, epochs_run))
+
+        if n_jobs == 1:
+            for key in pending:
+                finish(key, run_trial(configs[key], X_path, y_path, epochs, seed))
+        else:
+            # TensorFlow is not fork-safe, start clean interpreters
+            with ProcessPoolExecutor(max_workers=n_jobs, mp_context=get_context('spawn'), initializer=_init_worker,
+                                     initargs=(max(1, (os.cpu_count() or 1) // n_jobs),)) as pool:
+                futures = {pool.submit(run_trial, configs[key], X_path, y_path, epochs, seed): key for key in pending}
+                for future in as_completed(futures):
+                    finish(futures[future], future.result())
+
+    return sorted((done[key] for key in configs), key=lambda record: record['score'])
@@ -0,0 +1,79 @@
+"""SVR with an approximate kernel map for training sets too large for the exact `SVR`.
+
+The exact kernel SVR costs quadratic-to-cubic time in rows. `ApproxSVR` maps the features
+through a Nyström approximation of the kernel (any of SVR's kernels) or random Fourier
+features (rbf only) and fits a linear epsilon-insensitive SVR (liblinear) on the mapped
+features, which is linear in rows. `n_components` is the accuracy/speed knob: more
+components approximate the kernel better and cost proportionally more time per row.
+
+    model = ApproxSVR(kernel='rbf', C=10, n_components=300).fit(X_train, y_train)
+
+It takes the same kernel/C/gamma/degree/coef0/epsilon parameters as `SVR`, so the
+`svr_params` grid works unchanged; `benchmarks/bench_approx_svr.py` compares R2 and fit time
+with the exact SVR. The sigmoid kernel is not positive semi-definite, so its Nyström map
+is a different model rather than an approximation (it usually scores far better than the
+exact sigmoid SVR on this data).
+"""
+
+import numpy as np
+from sklearn.base import BaseEstimator, RegressorMixin
+from sklearn.kernel_approximation import Nystroem, RBFSampler
+from sklearn.svm import LinearSVR
+
+# Above this many training rows tune_models switches the SVR search to ApproxSVR
+exact_svr_max_rows = 20_000
+
+
+class ApproxSVR(RegressorMixin, BaseEstimator):
+    def __init__(self, kernel='rbf', C=1.0, gamma='scale', degree=3, coef0=0.0, epsilon=0.1,
+                 n_components=300, method='nystroem', max_iter=5000, random_state=42):
+        self.kernel = kernel
+        self.C = C
+        self.gamma = gamma
+        self.degree = degree
+        self.coef0 = coef0
+        self.epsilon = epsilon
+        self.n_components = n_components
+        self.method = method
+        self.max_iter = max_iter
+        self.random_state = random_state
+
+    def _gamma(self, X):
+        # Same definitions as SVR
+        if self.gamma == 'scale':
+            variance = X.var()
+            return 1.0 / (X.shape[1] * variance) if variance > 0 else 1.0
+        if self.gamma == 'auto':
+            return 1.0 / X.shape[1]
+        return self.gamma
+
+    def fit(self, X, y):
+        X = np.asarray(X, dtype=float)
+        y = np.asarray(y, dtype=float)
+        if self.kernel == 'linear':
+            # The linear kernel needs no feature map
+            self.feature_map_ = None
+        elif self.method == 'rff':
+            if self.kernel != 'rbf':
+                raise ValueError("method='rff' only approximates the rbf kernel, got kernel=%r" % self.kernel)
+            self.feature_map_ = RBFSampler(gamma=self._gamma(X), n_components=self.n_components,
+                                           random_state=self.random_state)
+        elif self.method == 'nystroem':
+            self.feature_map_ = Nystroem(kernel=self.kernel, gamma=self._gamma(X), degree=self.degree, coef0=self.coef0,
+                                         n_components=min(self.n_components, len(X)), random_state=self.random_state)
+        else:
+            raise ValueError("method must be 'nystroem' or 'rff', got %r" % self.method)
+
+        features = X if self.feature_map_ is None else self.feature_map_.fit_transform(X)
+        # liblinear penalizes the intercept, so fit around the median target instead of 0
+        self.offset_ = float(np.median(y))
+        self.svr_ = LinearSVR(C=self.C, epsilon=self.epsilon, loss='epsilon_insensitive', dual=True,
+                              max_iter=self.max_iter, random_state=self.random_state)
+        self.svr_.fit(features, y - self.offset_)
+        self.n_features_in_ = X.shape[1]
+        return self
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=float)
+        features = X if self.feature_map_ is None else self.feature_map_.transform(X)
+        return self.svr_.predict(features) + self.offset_
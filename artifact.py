@@ -0,0 +1,139 @@
+"""Versioned on-disk format for a fitted AgePredictor.
+
+An artifact is a directory:
+
+    manifest.json       format name/version, column order, Sex categories, model description
+    *.npy               scaler means/scales, PCA mean/components and model arrays
+    model.pkl           sklearn models without an array layout (SVR, KNN, Ridge, ...)
+    model.keras         Keras models that are not plain Dense stacks
+
+Tree models (DecisionTree, RandomForest, GradientBoosting) are stored as the flat node
+arrays of `tree_inference.TreeEnsembleModel`, in the layout its `predict` traverses, and
+Dense Keras models as the weight arrays of `ann_runtime.DenseNetwork`, which loads and
+predicts without TensorFlow. `load_artifact(path, mmap=True)` opens every .npy with
+`mmap_mode='r'`, so worker processes loading the same artifact share the pages through the
+OS page cache instead of each holding its own copy of the forest.
+"""
+
+import datetime
+import json
+import os
+import pickle
+
+import numpy as np
+
+from ann_runtime import DenseNetwork
+from predictor import AgePredictor
+from tree_inference import TreeEnsembleModel, array_names
+
+FORMAT_NAME = 'abalone-age-model'
+FORMAT_VERSION = 2
+
+tree_models = ['DecisionTreeRegressor', 'RandomForestRegressor', 'GradientBoostingRegressor']
+
+
+def _save_array(path, name, array):
+    np.save(os.path.join(path, name + '.npy'), np.ascontiguousarray(array))
+    return name + '.npy'
+
+
+def save_artifact(predictor, path):
+    """Write `predictor` to the directory `path` (created if needed) and return the manifest.
+
+    Files of an artifact already saved at `path` are replaced.
+    """
+    os.makedirs(path, exist_ok=True)
+    if os.path.exists(os.path.join(path, 'manifest.json')):
+        for name in os.listdir(path):
+            if name == 'manifest.json' or name.endswith(('.npy', '.pkl', '.keras')):
+                os.remove(os.path.join(path, name))
+
+    scalers = []
+    for i, (mean, scale) in enumerate(predictor.scalers):
+        scalers.append({'mean': _save_array(path, 'scaler%d_mean' % i, mean),
+                        'scale': _save_array(path, 'scaler%d_scale' % i, scale)})
+
+    pca = None
+    if predictor.pca_components is not None:
+        pca = {'mean': _save_array(path, 'pca_mean', predictor.pca_mean),
+               'components': _save_array(path, 'pca_components', predictor.pca_components)}
+
+    model = predictor.model
+    model_type = type(model).__name__
+    if isinstance(model, TreeEnsembleModel) or model_type in tree_models:
+        if not isinstance(model, TreeEnsembleModel):
+            model = TreeEnsembleModel.from_sklearn(model)
+        model_info = {'kind': 'tree_ensemble', 'type': model_type, 'base': model.base, 'scale': model.scale, 'depth': model.depth,
+                      'arrays': {name: _save_array(path, 'tree_' + name, array) for name, array in model.arrays().items()}}
+    elif isinstance(model, DenseNetwork) or type(model).__module__.startswith('keras'):
+        try:
+            network = model if isinstance(model, DenseNetwork) else DenseNetwork.from_keras(model)
+        except (TypeError, ValueError):
+            # Layers the NumPy runtime does not implement, keep the Keras model
+            network = None
+        if network is not None:
+            model_info = {'kind': 'dense_network', 'type': model_type, 'activations': network.activations,
+                          'arrays': {name: _save_array(path, 'ann_' + name, array) for name, array in network.arrays().items()}}
+        else:
+            model.save(os.path.join(path, 'model.keras'))
+            model_info = {'kind': 'keras', 'type': model_type, 'file': 'model.keras'}
+    else:
+        with open(os.path.join(path, 'model.pkl'), 'wb') as f:
+            pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+        model_info = {'kind': 'pickle', 'type': model_type, 'file': 'model.pkl'}
+
+    manifest = {
+        'format': FORMAT_NAME,
+        'version': FORMAT_VERSION,
+        'created': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'columns': predictor.columns,
+        'sex_categories': predictor.sex_categories,
+        'scalers': scalers,
+        'pca': pca,
+        'model': model_info,
+    }
+    with open(os.path.join(path, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def read_manifest(path):
+    with open(os.path.join(path, 'manifest.json')) as f:
+        manifest = json.load(f)
+    if manifest.get('format') != FORMAT_NAME:
+        raise ValueError('%s is not an %s artifact' % (path, FORMAT_NAME))
+    if manifest.get('version') != FORMAT_VERSION:
+        raise ValueError('unsupported %s version %r (expected %d)' % (FORMAT_NAME, manifest.get('version'), FORMAT_VERSION))
+    return manifest
+
+
+def load_artifact(path, mmap=True):
+    """Load an AgePredictor from `path`; with `mmap` the arrays are read-only memory maps."""
+    manifest = read_manifest(path)
+    mmap_mode = 'r' if mmap else None
+
+    def load(name):
+        return np.load(os.path.join(path, name), mmap_mode=mmap_mode)
+
+    scalers = [(load(s['mean']), load(s['scale'])) for s in manifest['scalers']]
+    pca_mean = pca_components = None
+    if manifest['pca'] is not None:
+        pca_mean, pca_components = load(manifest['pca']['mean']), load(manifest['pca']['components'])
+
+    model_info = manifest['model']
+    if model_info['kind'] == 'tree_ensemble':
+        arrays = {name: load(model_info['arrays'][name]) for name in array_names}
+        model = TreeEnsembleModel(base=model_info['base'], scale=model_info['scale'], depth=model_info['depth'], **arrays)
+    elif model_info['kind'] == 'dense_network':
+        arrays = {name: load(file) for name, file in model_info['arrays'].items()}
+        model = DenseNetwork.from_arrays(arrays, model_info['activations'])
+    elif model_info['kind'] == 'keras':
+        from tensorflow import keras
+        model = keras.models.load_model(os.path.join(path, model_info['file']))
+    elif model_info['kind'] == 'pickle':
+        with open(os.path.join(path, model_info['file']), 'rb') as f:
+            model = pickle.load(f)
+    else:
+        raise ValueError('unknown model kind %r in %s' % (model_info['kind'], path))
+
+    return AgePredictor(model, manifest['columns'], scalers, manifest['sex_categories'], pca_mean, pca_components)
@@ -0,0 +1,72 @@
+"""ANN training throughput: in-memory `model.fit(batch_size=32)` vs `ann_streaming.train_streaming`.
+
+Both train `build_ann` on the same rows (synthetic rows resampled from abalone.csv when
+--rows is given) for a fixed number of epochs without early stopping, and report the
+samples/sec of each epoch after the first and the final validation MSE.
+
+    python benchmarks/bench_ann_streaming.py --data abalone.csv --rows 1000000 --epochs 5
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from common import synthetic_abalone
+
+import abalone_age_model as aam
+from ann_streaming import fit_preprocessing, iter_batches, train_streaming
+from ingest import load_abalone, write_cache
+
+
+def fit_baseline(path, transform, epochs, validation_every):
+    # The same train/validation rows and scaling as the streaming run, all in memory
+    X_train, y_train = map(np.concatenate, zip(*iter_batches(path, transform, 1 << 20, 'train', validation_every)))
+    X_val, y_val = map(np.concatenate, zip(*iter_batches(path, transform, 1 << 20, 'validation', validation_every)))
+    model = aam.build_ann(X_train.shape[1])
+    rates = []
+    for _ in range(epochs):
+        start = time.perf_counter()
+        model.fit(X_train, y_train, epochs=1, batch_size=32, verbose=0)
+        rates.append(len(y_train) / (time.perf_counter() - start))
+    val_mse = float(np.mean((model.predict(X_val, verbose=0).ravel() - y_val) ** 2))
+    return rates, val_mse
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='ANN training throughput benchmark')
+    parser.add_argument('--data', default=aam.DATA_PATH)
+    parser.add_argument('--rows', type=int, help='resample the data to this many rows (default: the file as is)')
+    parser.add_argument('--epochs', type=int, default=5)
+    parser.add_argument('--validation-every', type=int, default=5)
+    parser.add_argument('--no-jit', action='store_true', help='run the streaming step as a tf.function without XLA')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix='abalone-ann-bench-') as directory:
+        if args.rows:
+            base = pd.read_csv(args.data) if os.path.exists(args.data) else None
+            source = os.path.join(directory, 'abalone.csv')
+            synthetic_abalone(args.rows, 0, base).to_csv(source, index=False)
+        else:
+            source = args.data
+        path = os.path.join(directory, 'abalone.parquet')
+        write_cache(load_abalone(source), path)
+        transform = fit_preprocessing(path)
+
+        rates, val_mse = fit_baseline(path, transform, args.epochs, args.validation_every)
+        print('model.fit batch 32        %10.0f samples/s  val_mse %.4f' % (np.median(rates[1:] or rates), val_mse))
+
+        _, history = train_streaming(path, epochs=args.epochs, patience=None, validation_every=args.validation_every,
+                                     jit_compile=not args.no_jit, transform=transform)
+        rate = np.median([row['samples_per_sec'] for row in history[1:]] or [history[0]['samples_per_sec']])
+        print('train_streaming batch %-5d%10.0f samples/s  val_mse %.4f  (%.1fx)' % (
+            history[-1]['batch_size'], rate, history[-1]['val_mse'], rate / np.median(rates[1:] or rates)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
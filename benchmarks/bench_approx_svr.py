@@ -0,0 +1,63 @@
+"""Exact SVR vs ApproxSVR: test R2 and fit time per kernel and number of components.
+
+The exact SVR is only fit up to --exact-max-rows; above that the approximate models are
+reported alone.
+
+    python benchmarks/bench_approx_svr.py --data abalone.csv --components 50,200,800
+    python benchmarks/bench_approx_svr.py --data abalone.csv --rows 1000000 --kernels rbf
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+from common import synthetic_abalone
+
+import abalone_age_model as aam
+from approx_svr import ApproxSVR
+
+
+def fit_score(model, split):
+    from sklearn.metrics import r2_score
+    start = time.perf_counter()
+    model.fit(split['X_train'], split['y_train'])
+    fit_time = time.perf_counter() - start
+    return r2_score(split['y_test'], model.predict(split['X_test'])), fit_time
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare ApproxSVR with the exact SVR')
+    parser.add_argument('--data', default=aam.DATA_PATH)
+    parser.add_argument('--rows', type=int, help='resample the data to this many rows (default: the file as is)')
+    parser.add_argument('--kernels', nargs='*', default=['linear', 'poly', 'rbf', 'sigmoid'])
+    parser.add_argument('--C', type=float, default=1.0)
+    parser.add_argument('--components', default='50,200,800', help='comma separated n_components levels')
+    parser.add_argument('--exact-max-rows', type=int, default=20_000)
+    args = parser.parse_args(argv)
+
+    df = aam.load_data(args.data)
+    if args.rows:
+        base = pd.read_csv(args.data) if os.path.exists(args.data) else None
+        df = synthetic_abalone(args.rows, 0, base)
+        df['age'] = df.pop('Rings') + 1.5
+    split = aam.build_scaled_split(aam.remove_outliers(df), aam.random_seed)
+    print('%d training rows' % len(split['X_train']))
+
+    from sklearn.svm import SVR
+    for kernel in args.kernels:
+        if len(split['X_train']) <= args.exact_max_rows:
+            r2, fit_time = fit_score(SVR(kernel=kernel, C=args.C), split)
+            print('%-8s exact               R2 %.4f  fit %8.2fs' % (kernel, r2, fit_time))
+        methods = ['nystroem', 'rff'] if kernel == 'rbf' else ['nystroem']
+        for n_components in ([0] if kernel == 'linear' else [int(c) for c in args.components.split(',')]):
+            for method in methods:
+                r2, fit_time = fit_score(ApproxSVR(kernel=kernel, C=args.C, n_components=n_components or 1, method=method), split)
+                print('%-8s %-8s %5s comp  R2 %.4f  fit %8.2fs' % (kernel, method if n_components else 'linear', n_components or '-', r2, fit_time))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
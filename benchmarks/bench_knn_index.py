@@ -0,0 +1,58 @@
+"""KNN predict latency as the reference set grows: KNNIndex vs KNeighborsRegressor(brute).
+
+Reference sets are synthetic rows resampled from abalone.csv, standardized like the
+cleaned split; each query batch is --batch rows.
+
+    python benchmarks/bench_knn_index.py --data abalone.csv --sizes 10000,100000,1000000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from common import latency_summary, synthetic_abalone, timed
+
+import abalone_age_model as aam
+from knn_index import KNNIndex
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='KNN index latency benchmark')
+    parser.add_argument('--data', default=aam.DATA_PATH)
+    parser.add_argument('--sizes', default='10000,100000,1000000', help='comma separated reference set sizes')
+    parser.add_argument('--batch', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--n-neighbors', type=int, default=4)
+    parser.add_argument('--brute-max-rows', type=int, default=200_000)
+    args = parser.parse_args(argv)
+
+    from sklearn.neighbors import KNeighborsRegressor
+    from sklearn.preprocessing import StandardScaler
+    base = pd.read_csv(args.data) if os.path.exists(args.data) else None
+    for size in (int(float(s)) for s in args.sizes.split(',')):
+        df = synthetic_abalone(size + args.batch, 0, base)
+        df['age'] = df.pop('Rings') + 1.5
+        X = StandardScaler().fit_transform(aam.encode_sex(df).drop('age', axis=1).to_numpy(dtype=float))
+        y = df['age'].to_numpy(dtype=float)
+        X_ref, y_ref, X_query = X[:size], y[:size], X[size:]
+
+        start = time.perf_counter()
+        index = KNNIndex(n_neighbors=args.n_neighbors).fit(X_ref, y_ref)
+        build = time.perf_counter() - start
+        summary = latency_summary(timed(lambda: index.predict(X_query), args.repeat), args.batch)
+        print('%-9d KNNIndex  build %7.2fs  p50 %8.4fs  %10.0f rows/s' % (size, build, summary['p50'], summary['rows_per_sec']))
+
+        if size <= args.brute_max_rows:
+            brute = KNeighborsRegressor(n_neighbors=args.n_neighbors, algorithm='brute').fit(X_ref, y_ref)
+            summary = latency_summary(timed(lambda: brute.predict(X_query), args.repeat), args.batch)
+            assert np.allclose(brute.predict(X_query), index.predict(X_query))
+            print('%-9d brute                  p50 %8.4fs  %10.0f rows/s' % (size, summary['p50'], summary['rows_per_sec']))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
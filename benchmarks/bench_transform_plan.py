@@ -0,0 +1,83 @@
+"""Per-row preprocessing latency: the pandas/sklearn chain, AgePredictor's NumPy chain and the fused plan.
+
+For the cleaned and PCA splits, times each preprocessing path per batch size:
+
+    pandas     pd.get_dummies + StandardScaler.transform (+ pca.transform + pd.concat)
+    reference  AgePredictor.transform_reference
+    fused      TransformPlan (what AgePredictor.transform runs)
+    fused-out  TransformPlan into a preallocated output buffer
+    folded     TransformPlan(fold=True), one matmul + gather
+
+tests/test_transform_plan.py pins the fused output to the reference chain bit for bit.
+
+    python benchmarks/bench_transform_plan.py --data abalone.csv --batches 1,10,100,1000,10000,100000
+"""
+
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+from common import latency_summary, timed
+
+import abalone_age_model as aam
+from predictor import AgePredictor, measurement_columns
+from transform_plan import TransformPlan
+
+
+def pandas_chain(split):
+    scaler, pca = split['scaler'], split['pca']
+    if pca is None:
+        return lambda frame: scaler.transform(aam.encode_sex(frame[['Sex'] + measurement_columns]))
+
+    def transform(frame):
+        components = pd.DataFrame(pca.transform(scaler.transform(frame[measurement_columns])))
+        return pd.concat([components, aam.encode_sex(frame[['Sex']]).reset_index(drop=True)], axis=1).to_numpy(dtype=float)
+    return transform
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Fused preprocessing benchmark')
+    parser.add_argument('--data', default=aam.DATA_PATH)
+    parser.add_argument('--batches', default='1,10,100,1000,10000,100000', help='comma separated batch sizes')
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args(argv)
+
+    df = aam.load_data(args.data)
+    datasets = aam.build_datasets(df, aam.remove_outliers(df))
+    batches = [int(b) for b in args.batches.split(',')]
+    rows = df.sample(max(batches), replace=True, random_state=0).reset_index(drop=True)
+    sex_all, measurements_all = rows['Sex'].to_numpy(), rows[measurement_columns].to_numpy(dtype=float)
+
+    for dataset in ('cleaned', 'pca'):
+        predictor = AgePredictor.from_split(datasets[dataset], None)
+        plan = TransformPlan.from_predictor(predictor)
+        folded = TransformPlan.from_predictor(predictor, fold=True)
+        to_pandas = pandas_chain(datasets[dataset])
+
+        reference = predictor.transform_reference(sex_all, measurements_all)
+        print('%-8s folded max |diff| %.1e  pandas max |diff| %.1e' % (
+            dataset, np.abs(folded.transform(sex_all, measurements_all) - reference).max(),
+            np.abs(to_pandas(rows) - reference).max()))
+
+        for batch in batches:
+            frame, sex, measurements = rows[:batch], sex_all[:batch], measurements_all[:batch]
+            out = np.empty((batch, plan.n_outputs))
+            paths = {
+                'pandas': lambda: to_pandas(frame),
+                'reference': lambda: predictor.transform_reference(sex, measurements),
+                'fused': lambda: plan.transform(sex, measurements),
+                'fused-out': lambda: plan.transform(sex, measurements, out=out),
+                'folded': lambda: folded.transform(sex, measurements, out=out),
+            }
+            line = '%-8s batch %-7d' % (dataset, batch)
+            for label, transform in paths.items():
+                summary = latency_summary(timed(transform, args.repeat if batch <= 10_000 else 5), batch)
+                line += '  %s %8.3fus/row' % (label, summary['p50'] / batch * 1e6)
+            print(line)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
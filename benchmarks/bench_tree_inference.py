@@ -0,0 +1,66 @@
+"""Throughput of the flattened tree-ensemble engine against sklearn's predict.
+
+Fits the tuned Random Forest / Gradient Boosting settings on the cleaned split and times
+predict per batch size for sklearn, `TreeEnsembleModel` and its float32-threshold copy.
+Exits 1 if any engine output differs from sklearn's by more than --tolerance.
+
+    python benchmarks/bench_tree_inference.py --data abalone.csv --batches 1,10,100,1000,10000
+"""
+
+import argparse
+import sys
+
+import numpy as np
+
+from common import latency_summary, timed
+
+import abalone_age_model as aam
+from tree_inference import TreeEnsembleModel
+
+
+def models():
+    from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+    return {
+        'RandomForestRegressor': RandomForestRegressor(n_estimators=200, max_depth=10, min_samples_split=10, random_state=42),
+        'GradientBoostingRegressor': GradientBoostingRegressor(n_estimators=200, learning_rate=0.1, max_depth=3, random_state=42),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Tree ensemble inference benchmark')
+    parser.add_argument('--data', default=aam.DATA_PATH)
+    parser.add_argument('--batches', default='1,10,100,1000,10000', help='comma separated batch sizes')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--tolerance', type=float, default=1e-9)
+    args = parser.parse_args(argv)
+
+    split = aam.build_scaled_split(aam.remove_outliers(aam.load_data(args.data)), aam.random_seed)
+    # Query rows: the test set, tiled with jitter up to the largest batch
+    X_test = split['X_test']
+    largest = max(int(b) for b in args.batches.split(','))
+    reps = -(-largest // len(X_test))
+    X_query = np.tile(X_test, (reps, 1)) + np.random.default_rng(0).normal(0, 0.05, (len(X_test) * reps, X_test.shape[1]))
+
+    failed = False
+    for name, model in models().items():
+        model.fit(split['X_train'], split['y_train'])
+        engine = TreeEnsembleModel.from_sklearn(model)
+        engines = {'sklearn': model.predict, 'flat': engine.predict, 'flat-f32': engine.quantize().predict}
+
+        expected = model.predict(X_query[:largest])
+        for label, predict in engines.items():
+            error = np.abs(predict(X_query[:largest]) - expected).max()
+            failed |= error > args.tolerance
+            print('%s %-8s max |diff| %.2e' % (name, label, error))
+        for batch in (int(b) for b in args.batches.split(',')):
+            X = X_query[:batch]
+            line = '%-26s batch %-6d' % (name, batch)
+            for label, predict in engines.items():
+                summary = latency_summary(timed(lambda: predict(X), max(1, args.repeat if batch <= 1000 else 3)), batch)
+                line += '  %s %8.5fs %10.0f rows/s' % (label, summary['p50'], summary['rows_per_sec'])
+            print(line)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""Shared helpers for the benchmark scripts: repo imports, synthetic data and timing.
+
+The scripts run with benchmarks/ as sys.path[0], ahead of the repo root, so a script that
+measures a repo module is named bench_<module>.py rather than <module>.py.
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from predictor import measurement_columns  # noqa: E402
+
+
+def synthetic_abalone(n_rows, seed=0, base=None):
+    """`n_rows` abalone-like records with a Rings column.
+
+    With a `base` frame (the real abalone.csv) rows are resampled with 1% multiplicative
+    jitter on the measurements, otherwise measurements are generated from Length with
+    roughly the real correlations.
+    """
+    rng = np.random.default_rng(seed)
+    if base is not None:
+        frame = base.iloc[rng.integers(0, len(base), n_rows)].reset_index(drop=True)
+        jitter = rng.normal(1.0, 0.01, size=(n_rows, len(measurement_columns)))
+        frame[measurement_columns] = (frame[measurement_columns].to_numpy() * jitter).round(4)
+        return frame
+
+    length = rng.uniform(0.075, 0.815, n_rows)
+    whole = length ** 3 * 2.5 + rng.normal(0, 0.05, n_rows)
+    return pd.DataFrame({
+        'Sex': rng.choice(['M', 'F', 'I'], n_rows),
+        'Length': length.round(3),
+        'Diameter': (length * 0.8 + rng.normal(0, 0.02, n_rows)).round(3),
+        'Height': (length * 0.27 + rng.normal(0, 0.02, n_rows)).round(3),
+        'Whole weight': whole.round(4),
+        'Shucked weight': (whole * 0.43 + rng.normal(0, 0.02, n_rows)).round(4),
+        'Viscera weight': (whole * 0.22 + rng.normal(0, 0.01, n_rows)).round(4),
+        'Shell weight': (whole * 0.29 + rng.normal(0, 0.02, n_rows)).round(4),
+        'Rings': np.clip((length * 15 + rng.normal(0, 2.5, n_rows)).round(), 1, 29).astype(int),
+    })
+
+
+def write_synthetic_csv(path, n_rows, seed=0, base=None, chunk_rows=1_000_000):
+    """Write `n_rows` synthetic records to `path` in chunks so 10M rows never sit in memory at once."""
+    for i, start in enumerate(range(0, n_rows, chunk_rows)):
+        chunk = synthetic_abalone(min(chunk_rows, n_rows - start), seed + i, base)
+        chunk.to_csv(path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+    return path
+
+
+def timed(fn, repeat=5, warmup=1):
+    """Run `fn` warmup + repeat times; returns the list of timed durations in seconds."""
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def latency_summary(timings, rows):
+    """min/p50/p90/p99 latency (seconds) and rows/sec at the median."""
+    timings = np.asarray(timings)
+    p50 = float(np.percentile(timings, 50))
+    return {
+        'rows': int(rows),
+        'runs': len(timings),
+        'min': float(timings.min()),
+        'p50': p50,
+        'p90': float(np.percentile(timings, 90)),
+        'p99': float(np.percentile(timings, 99)),
+        'rows_per_sec': rows / p50 if p50 > 0 else float('inf'),
+    }
@@ -0,0 +1,140 @@
+"""Load generator for serve.py: throughput and latency with and without micro-batching.
+
+Starts the server on a saved artifact once per --max-batch setting (1 = a predict call per
+request), drives it with --concurrency keep-alive connections each sending single-record
+POST /predict requests for --seconds, and reports client-side requests/sec and p50/p99
+latency next to the server's own /metrics. Without --model a Random Forest is fitted on
+the cleaned split and saved to a temporary artifact first.
+
+    python benchmarks/serve_load.py --data abalone.csv --concurrency 64 --seconds 10
+    python benchmarks/serve_load.py --model age_model --max-batch 1,32,256
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from common import REPO_ROOT, latency_summary
+
+import abalone_age_model as aam
+from predictor import AgePredictor, raw_columns
+
+
+def build_model(data_path, directory):
+    from sklearn.ensemble import RandomForestRegressor
+    df = aam.load_data(data_path)
+    split = aam.build_scaled_split(aam.remove_outliers(df), aam.random_seed)
+    model = RandomForestRegressor(n_estimators=100, max_depth=10, random_state=42).fit(split['X_train'], split['y_train'])
+    path = os.path.join(directory, 'age_model')
+    AgePredictor.from_split(split, model).save(path)
+    return path
+
+
+async def request(reader, writer, method, target, body=b''):
+    writer.write(b'%s %s HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n'
+                 % (method.encode(), target.encode(), len(body)) + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        if line.lower().startswith(b'content-length:'):
+            length = int(line.split(b':')[1])
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def wait_ready(port, timeout=60):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            status, _ = await request(reader, writer, 'GET', '/health')
+            writer.close()
+            if status == 200:
+                return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError('server on port %d did not start' % port)
+
+
+async def drive(port, bodies, concurrency, seconds):
+    latencies = []
+    stop = time.perf_counter() + seconds
+
+    async def client(offset):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        i = offset
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            status, _ = await request(reader, writer, 'POST', '/predict', bodies[i % len(bodies)])
+            if status != 200:
+                raise RuntimeError('request failed with HTTP %d' % status)
+            latencies.append(time.perf_counter() - start)
+            i += concurrency
+        writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(c) for c in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    _, metrics = await request(reader, writer, 'GET', '/metrics')
+    writer.close()
+    return latencies, elapsed, metrics
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Prediction server load generator')
+    parser.add_argument('--data', default=aam.DATA_PATH)
+    parser.add_argument('--model', help='artifact directory (default: fit and save a Random Forest)')
+    parser.add_argument('--max-batch', default='1,256', help='comma separated server --max-batch settings')
+    parser.add_argument('--max-wait-ms', type=float, default=2.0)
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix='abalone-serve-') as directory:
+        model = args.model or build_model(args.data, directory)
+        rows = pd.read_csv(args.data)[raw_columns].sample(1000, replace=True, random_state=0)
+        bodies = [json.dumps(record).encode() for record in rows.to_dict('records')]
+
+        results = {}
+        for max_batch in (int(b) for b in args.max_batch.split(',')):
+            command = [sys.executable, os.path.join(REPO_ROOT, 'serve.py'), model, '--port', str(args.port),
+                       '--max-batch', str(max_batch), '--max-wait-ms', str(args.max_wait_ms)]
+            if args.workers:
+                command += ['--workers', str(args.workers)]
+            server = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+            try:
+                asyncio.run(wait_ready(args.port))
+                latencies, elapsed, metrics = asyncio.run(drive(args.port, bodies, args.concurrency, args.seconds))
+            finally:
+                server.terminate()
+                server.wait()
+
+            summary = latency_summary(latencies, len(latencies))
+            results[max_batch] = len(latencies) / elapsed
+            print('max_batch %-5d %9.0f req/s  p50 %7.2fms  p99 %7.2fms  mean batch %6.1f rows  (server p50 %.2fms p99 %.2fms)' % (
+                max_batch, results[max_batch], summary['p50'] * 1e3, summary['p99'] * 1e3,
+                metrics['mean_batch_rows'], metrics['p50_ms'], metrics['p99_ms']))
+
+        if 1 in results:
+            for max_batch, rate in results.items():
+                if max_batch != 1:
+                    print('max_batch %d: %.1fx the throughput of per-request predict' % (max_batch, rate / results[1]))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,64 @@
+"""Cold-import benchmark for the prediction path.
+
+Imports the module in a fresh interpreter several times and fails (exit code 1) when the
+median import time goes over the budget or when one of the heavy training/plotting
+libraries gets pulled in at import time.
+
+    python benchmarks/startup.py --module predictor --budget 1.0
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Libraries that must only be imported by the stage that needs them
+heavy_modules = ['tensorflow', 'keras', 'keras_tuner', 'seaborn', 'matplotlib']
+
+_probe = '''
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+loaded = [m for m in {heavy!r} if m in sys.modules]
+print(elapsed)
+print(','.join(loaded))
+'''
+
+
+def cold_import(module):
+    code = _probe.format(module=module, heavy=heavy_modules)
+    out = subprocess.run([sys.executable, '-c', code], cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+    elapsed, loaded = out.stdout.strip().split('\n') + [''] * (2 - len(out.stdout.strip().split('\n')))
+    return float(elapsed), [m for m in loaded.split(',') if m]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--module', default='predictor')
+    parser.add_argument('--budget', type=float, default=1.0, help='median cold import budget in seconds')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    timings = []
+    for _ in range(args.repeat):
+        elapsed, loaded = cold_import(args.module)
+        timings.append(elapsed)
+        if loaded:
+            print('FAIL: importing %s pulled in %s' % (args.module, ', '.join(loaded)))
+            return 1
+
+    median = statistics.median(timings)
+    print('%s cold import: median %.3fs, min %.3fs, max %.3fs (budget %.3fs)'
+          % (args.module, median, min(timings), max(timings), args.budget))
+    if median > args.budget:
+        print('FAIL: over budget')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,143 @@
+"""Training and inference throughput benchmarks built on the pipeline stages.
+
+Stages: CSV load, IQR outlier cleaning, scaling, PCA, fit and batched predict for each
+model family, and (with --ann) ANN training. Each stage is run on the real 4,177-row
+abalone.csv and on synthetic data resampled from it at the requested sizes; results are
+latency percentiles and rows/sec per (stage, rows).
+
+    python benchmarks/suite.py --data abalone.csv --rows 4177,100000,10000000 --output bench.json
+    python benchmarks/suite.py --data abalone.csv --save-baseline benchmarks/baseline.json
+    python benchmarks/suite.py --data abalone.csv --compare benchmarks/baseline.json --tolerance 0.25
+
+With --compare the exit code is 1 when any stage's median time regressed by more than the
+tolerance against the baseline.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from common import latency_summary, timed, write_synthetic_csv
+
+import abalone_age_model as aam
+
+# Fitting these beyond the limit takes hours (SVR is quadratic in rows), skip larger sizes
+family_row_limits = {'SVR': 20_000, 'KNN': 1_000_000, 'DecisionTreeRegressor': 2_000_000,
+                     'RandomForestRegressor': 1_000_000, 'GradientBoostingRegressor': 2_000_000}
+
+
+def environment():
+    import sklearn
+    return {'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+            'sklearn': sklearn.__version__, 'cpus': os.cpu_count(), 'machine': platform.machine()}
+
+
+def bench_rows(csv_path, n_rows, args, results):
+    def record(stage, timings, rows):
+        summary = latency_summary(timings, rows)
+        results.append(dict(stage=stage, **summary))
+        print('%-45s rows=%-9d p50=%9.4fs p99=%9.4fs %12.0f rows/s' % (stage, rows, summary['p50'], summary['p99'], summary['rows_per_sec']))
+
+    repeat = args.repeat if n_rows <= 1_000_000 else 1
+    record('csv_load', timed(lambda: aam.load_data(csv_path), repeat, warmup=0), n_rows)
+
+    df = aam.load_data(csv_path)
+    record('clean_iqr', timed(lambda: aam.remove_outliers(df), repeat), n_rows)
+    cleaned = aam.remove_outliers(df)
+
+    from sklearn.preprocessing import StandardScaler
+
+    from pca_stage import PCAStage
+    features = cleaned[aam.col_except_rings].to_numpy()
+    record('scale', timed(lambda: StandardScaler().fit_transform(features), repeat), len(features))
+    X_scaled = StandardScaler().fit_transform(features)
+    record('pca', timed(lambda: PCAStage(n_components=aam.n_components).fit_transform(X_scaled), repeat), len(features))
+
+    split = aam.build_datasets(df, cleaned)['cleaned']
+    X_train, y_train, X_test = split['X_train'], split['y_train'], split['X_test']
+    families = aam.model_families()
+    for family in args.families or families:
+        if len(X_train) > family_row_limits.get(family, float('inf')):
+            print('%-45s skipped above %d rows' % ('fit/' + family, family_row_limits[family]))
+            continue
+        model = families[family]()
+        record('fit/' + family, timed(lambda: model.fit(X_train, y_train), 1 if len(X_train) > 100_000 else repeat, warmup=0), len(X_train))
+
+        # Per-batch predict latency over the test rows
+        batches = [X_test[i:i + args.batch_size] for i in range(0, len(X_test), args.batch_size)][:args.max_batches]
+        timings = [t for batch in batches for t in timed(lambda: model.predict(batch), 1, warmup=0)]
+        record('predict/%s/batch%d' % (family, args.batch_size), timings, min(args.batch_size, len(X_test)))
+
+    if args.ann:
+        def train_ann():
+            model = aam.build_ann(X_train.shape[1])
+            model.fit(X_train, y_train, epochs=args.ann_epochs, batch_size=32, validation_split=0.2, verbose=0)
+        record('fit/ANN/%depochs' % args.ann_epochs, timed(train_ann, 1, warmup=0), len(X_train))
+
+
+def compare(results, baseline, tolerance, min_delta=0.001):
+    """Stages whose median time grew by more than `tolerance` (fraction) and `min_delta` seconds."""
+    previous = {(r['stage'], r['rows']): r for r in baseline['results']}
+    regressions = []
+    for r in results:
+        old = previous.get((r['stage'], r['rows']))
+        if old is not None and r['p50'] > old['p50'] * (1 + tolerance) and r['p50'] - old['p50'] > min_delta:
+            regressions.append((r['stage'], r['rows'], old['p50'], r['p50']))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Abalone pipeline benchmarks')
+    parser.add_argument('--data', default=aam.DATA_PATH, help='real abalone.csv, also the resampling base for synthetic rows')
+    parser.add_argument('--rows', default='4177,100000', help='comma separated sizes; the real file size uses the file as is')
+    parser.add_argument('--families', nargs='*', help='model families to benchmark (default: all)')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--max-batches', type=int, default=200)
+    parser.add_argument('--ann', action='store_true', help='also benchmark ANN training (imports TensorFlow)')
+    parser.add_argument('--ann-epochs', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write results JSON here')
+    parser.add_argument('--save-baseline', metavar='PATH', help='write results JSON as the new baseline')
+    parser.add_argument('--compare', metavar='PATH', help='baseline JSON to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed median slowdown before flagging, as a fraction')
+    parser.add_argument('--min-delta', type=float, default=0.001, help='ignore slowdowns smaller than this many seconds')
+    args = parser.parse_args(argv)
+
+    np.random.seed(args.seed)
+    base = pd.read_csv(args.data) if os.path.exists(args.data) else None
+    results = []
+    with tempfile.TemporaryDirectory(prefix='abalone-bench-') as directory:
+        for n_rows in (int(float(r)) for r in args.rows.split(',')):
+            if base is not None and n_rows == len(base):
+                csv_path = args.data
+            else:
+                csv_path = write_synthetic_csv(os.path.join(directory, 'abalone_%d.csv' % n_rows), n_rows, args.seed, base)
+            print('\n== %d rows (%s)' % (n_rows, 'real' if csv_path == args.data else 'synthetic'))
+            bench_rows(csv_path, n_rows, args, results)
+
+    report = {'environment': environment(), 'config': vars(args), 'results': results}
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance, args.min_delta)
+        for stage, rows, old, new in regressions:
+            print('REGRESSION %s rows=%d: p50 %.4fs -> %.4fs (+%.0f%%)' % (stage, rows, old, new, (new / old - 1) * 100))
+        if regressions:
+            return 1
+        print('\nNo regressions beyond %.0f%% against %s' % (args.tolerance * 100, args.compare))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
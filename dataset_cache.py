@@ -0,0 +1,167 @@
+"""Content-addressed disk cache for the loaded/cleaned frames and the train/test splits.
+
+Every stage output is stored under a key hashed from the stage's inputs, and each key
+chains the key of the stage it depends on:
+
+    load      sha256 of the CSV contents, compact ingestion flag
+    clean     load key, outlier method and columns
+    original  load key, random_seed
+    cleaned   clean key, random_seed
+    pca       clean key, n_components, PCA method, variance threshold and components, random_seed
+
+so changing e.g. `n_components` only rebuilds the PCA split, and changing the outlier
+method reuses the parsed CSV and the original split. Split arrays are saved as .npy and
+returned memory-mapped; the cache directory is kept under `max_bytes` by evicting the
+least recently used entries.
+
+    cache = DatasetCache('.abalone_cache')
+    datasets = cache.build_datasets('abalone.csv', outlier_method='sequential')
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+
+import numpy as np
+
+import abalone_age_model as aam
+
+CACHE_VERSION = 1
+array_keys = ['X_train', 'X_test', 'y_train', 'y_test']
+
+
+def _key(*parts):
+    return hashlib.sha256(json.dumps([CACHE_VERSION] + list(parts), default=str).encode()).hexdigest()[:24]
+
+
+def _dir_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+class DatasetCache:
+    def __init__(self, directory='.abalone_cache', max_bytes=2 * 1024 ** 3):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    # Entries
+
+    def _entry(self, kind, key):
+        return os.path.join(self.directory, '%s-%s' % (kind, key))
+
+    def _touch(self, entry):
+        os.utime(entry)
+
+    def _commit(self, kind, key, write):
+        """Write an entry through `write(tmp_dir)` and move it into place atomically."""
+        tmp = tempfile.mkdtemp(prefix='.tmp-', dir=self.directory)
+        try:
+            write(tmp)
+            os.replace(tmp, self._entry(kind, key))
+        except OSError:
+            # Another process committed the same entry first
+            shutil.rmtree(tmp, ignore_errors=True)
+            if not os.path.isdir(self._entry(kind, key)):
+                raise
+        self.evict(keep=self._entry(kind, key))
+
+    def evict(self, keep=None):
+        """Remove least recently used entries until the cache fits in `max_bytes`."""
+        entries = [os.path.join(self.directory, name) for name in os.listdir(self.directory) if not name.startswith('.')]
+        sizes = {entry: _dir_size(entry) for entry in entries}
+        total = sum(sizes.values())
+        for entry in sorted(entries, key=os.path.getmtime):
+            if total <= self.max_bytes:
+                break
+            if entry != keep:
+                shutil.rmtree(entry, ignore_errors=True)
+                total -= sizes[entry]
+
+    def file_digest(self, path):
+        """sha256 of a file's contents, remembered per (path, size, mtime) to avoid rehashing."""
+        stat = os.stat(path)
+        index_path = os.path.join(self.directory, '.file_digests.json')
+        try:
+            with open(index_path) as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = {}
+        signature = '%s:%d:%d' % (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        if signature not in index:
+            digest = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+            index[signature] = digest.hexdigest()
+            with open(index_path, 'w') as f:
+                json.dump(index, f)
+        return index[signature]
+
+    # Frames (loaded and cleaned data)
+
+    def frame(self, key, build):
+        entry = self._entry('frame', key)
+        if os.path.isdir(entry):
+            self._touch(entry)
+            with open(os.path.join(entry, 'frame.pkl'), 'rb') as f:
+                return pickle.load(f)
+        df = build()
+
+        def write(tmp):
+            with open(os.path.join(tmp, 'frame.pkl'), 'wb') as f:
+                pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self._commit('frame', key, write)
+        return df
+
+    # Splits
+
+    def split(self, key, build, mmap=True):
+        entry = self._entry('split', key)
+        if os.path.isdir(entry):
+            self._touch(entry)
+            with open(os.path.join(entry, 'meta.pkl'), 'rb') as f:
+                split = pickle.load(f)
+            for name in array_keys:
+                split[name] = np.load(os.path.join(entry, name + '.npy'), mmap_mode='r' if mmap else None)
+            return split
+        split = build()
+
+        def write(tmp):
+            for name in array_keys:
+                np.save(os.path.join(tmp, name + '.npy'), np.asarray(split[name]))
+            with open(os.path.join(tmp, 'meta.pkl'), 'wb') as f:
+                pickle.dump({k: v for k, v in split.items() if k not in array_keys}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self._commit('split', key, write)
+        return self.split(key, build, mmap)
+
+    def build_datasets(self, data_path, outlier_method='sequential', random_seed=aam.random_seed,
+                       n_components=aam.n_components, compact=False, mmap=True, pca_method='full', pca_variance=None,
+                       pca_components=None):
+        """`abalone_age_model.build_datasets` for a CSV, computing only the stages not cached yet."""
+        load_key = _key('load', self.file_digest(data_path), compact)
+        clean_key = _key('clean', load_key, outlier_method, aam.col_except_rings)
+
+        frames = {}
+
+        def load():
+            if 'load' not in frames:
+                frames['load'] = self.frame(load_key, lambda: aam.load_data(data_path, compact=compact))
+            return frames['load']
+
+        def clean():
+            if 'clean' not in frames:
+                frames['clean'] = self.frame(clean_key, lambda: aam.remove_outliers(load(), method=outlier_method))
+            return frames['clean']
+
+        return {
+            'original': self.split(_key('original', load_key, random_seed),
+                                   lambda: aam.build_scaled_split(load(), random_seed), mmap),
+            'cleaned': self.split(_key('cleaned', clean_key, random_seed),
+                                  lambda: aam.build_scaled_split(clean(), random_seed), mmap),
+            'pca': self.split(_key('pca', clean_key, n_components, pca_method, pca_variance, pca_components, random_seed),
+                              lambda: aam.build_pca_split(clean(), random_seed, n_components, pca_method, pca_variance,
+                                                          pca_components), mmap),
+        }
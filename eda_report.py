@@ -0,0 +1,238 @@
+"""Headless EDA report: the EDA figures written to files by parallel worker processes.
+
+The interactive EDA (`plot_pairplot`, `plot_feature_densities`, ...) draws every row and
+blocks on `plt.show()`. `eda_report` renders the same figures with the Agg backend in
+worker processes and writes them, with an `index.html`, to a directory:
+
+    paths = eda_report(df, cleaned_df, 'eda_report', n_jobs=4)
+
+Figures that draw individual rows (the pairplot scatter and the per-Sex KDEs) use a
+sample of at most `sample_rows` rows, stratified by Sex. The histograms, age counts,
+boxplots and correlations are computed over all rows in the main process and only the
+binned results are sent to the workers. Each file name carries a hash of the rows it was
+drawn from and of the report settings, so a rerun on unchanged data reuses the files
+instead of rendering them again.
+"""
+
+import hashlib
+import html
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+
+import numpy as np
+import pandas as pd
+
+from profiling import profiler
+
+# Bump when a figure's drawing code changes, so cached files are rendered again
+report_version = 1
+
+
+def data_hash(df):
+    """sha1 of the frame's columns, dtypes and values."""
+    digest = hashlib.sha1(repr([(str(c), str(t)) for c, t in df.dtypes.items()]).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def stratified_sample(df, n_rows, column='Sex', seed=42):
+    """At most about `n_rows` rows keeping each `column` group's share; small frames are returned as is."""
+    if len(df) <= n_rows:
+        return df
+    return df.groupby(column, observed=True, group_keys=False).sample(frac=n_rows / len(df), random_state=seed)
+
+
+def box_stats(values, fliers, whis=1.5):
+    """`Axes.bxp` statistics of `values`; `fliers` are the outliers to draw (e.g. from a sample)."""
+    q1, median, q3 = np.percentile(values, [25, 50, 75])
+    iqr = q3 - q1
+    inside = values[(values >= q1 - whis * iqr) & (values <= q3 + whis * iqr)]
+    low, high = (inside.min(), inside.max()) if len(inside) else (q1, q3)
+    fliers = fliers[(fliers < low) | (fliers > high)]
+    return {'q1': q1, 'med': median, 'q3': q3, 'whislo': low, 'whishi': high, 'fliers': fliers}
+
+
+def binned_kde(values, edges, bandwidth=None):
+    """Gaussian KDE (Scott's bandwidth, as seaborn) evaluated on the bin centers of a histogram of `values`."""
+    counts, _ = np.histogram(values, edges)
+    centers = (edges[:-1] + edges[1:]) / 2
+    if bandwidth is None:
+        bandwidth = values.std() * len(values) ** -0.2
+    if not bandwidth > 0:
+        return centers, np.zeros_like(centers)
+    kernel = np.exp(-0.5 * ((centers[:, None] - centers[None, :]) / bandwidth) ** 2) / (bandwidth * np.sqrt(2 * np.pi))
+    return centers, kernel @ counts / max(counts.sum(), 1)
+
+
+def feature_summary(values, sample_values, bins='auto', max_bins=100, kde_points=256):
+    """Histogram, KDE grid and box statistics of one column, for `render_distributions`."""
+    values = values[~np.isnan(values)]
+    edges = np.histogram_bin_edges(values, bins)
+    if len(edges) > max_bins + 1:
+        edges = np.linspace(edges[0], edges[-1], max_bins + 1)
+    counts, _ = np.histogram(values, edges)
+    grid, density = binned_kde(values, np.linspace(edges[0], edges[-1], kde_points + 1))
+    # Drawn on the count axis like histplot(kde=True)
+    density = density * len(values) * (edges[1] - edges[0])
+    return {'edges': edges, 'counts': counts, 'kde_grid': grid, 'kde': density, 'box': box_stats(values, sample_values)}
+
+
+# Renderers, run in the workers with the Agg backend
+
+def render_pairplot(sample, path):
+    from abalone_age_model import plot_pairplot
+    plot_pairplot(sample, path)
+
+
+def render_feature_densities(sample, path):
+    from abalone_age_model import plot_feature_densities
+    plot_feature_densities(sample, path)
+
+
+def render_correlation(corr, path):
+    from abalone_age_model import plot_correlation_matrix
+    plot_correlation_matrix(corr, path)
+
+
+def render_age_counts(counts, path):
+    """Bar per age value, as `sns.countplot(x='age')`."""
+    from abalone_age_model import _pyplot, _show
+    plt, _ = _pyplot()
+    fig, ax = plt.subplots(figsize=(12, 6))
+    colors = plt.get_cmap('Dark2').colors
+    ax.bar([str(a) for a in counts.index], counts.to_numpy(), color=[colors[i % len(colors)] for i in range(len(counts))])
+    ax.set_xlabel('age')
+    ax.set_ylabel('count')
+    ax.tick_params(axis='x', labelrotation=45)
+    ax.set_title('Distribution of Age')
+    _show(fig, path)
+
+
+def render_age_boxplot(stats, path):
+    from abalone_age_model import _pyplot, _show
+    plt, _ = _pyplot()
+    fig, ax = plt.subplots(figsize=(6, 12))
+    ax.bxp([stats], showfliers=True)
+    ax.set_xticks([])
+    ax.set_title('Age Boxplot')
+    ax.set_ylabel('Age')
+    _show(fig, path)
+
+
+def render_distributions(payload, path):
+    """Histogram + KDE and boxplot per feature from `feature_summary` results, as `plot_feature_distributions`."""
+    from abalone_age_model import _pyplot, _show
+    plt, _ = _pyplot()
+    title, summaries = payload
+    fig, axes = plt.subplots(7, 2, figsize=(14, 10))
+    axes = axes.flatten()
+    for i, (feature, summary) in enumerate(list(summaries.items())[:len(axes) // 2]):
+        hist_ax, box_ax = axes[2 * i], axes[2 * i + 1]
+        hist_ax.stairs(summary['counts'], summary['edges'], fill=True, alpha=0.5)
+        hist_ax.plot(summary['kde_grid'], summary['kde'])
+        hist_ax.set_title(f'{feature} Distribution')
+        box_ax.bxp([summary['box']], vert=False, showfliers=True)
+        box_ax.set_yticks([])
+        box_ax.set_title(f'{feature} Boxplot')
+    fig.suptitle(title, fontsize=16)
+    fig.tight_layout()
+    _show(fig, path)
+
+
+renderers = {
+    'pairplot': render_pairplot,
+    'feature_densities': render_feature_densities,
+    'age_counts': render_age_counts,
+    'age_boxplot': render_age_boxplot,
+    'correlation': render_correlation,
+    'distributions_before': render_distributions,
+    'distributions_after': render_distributions,
+}
+
+
+def _figure_inputs(name, df, sample, title=None):
+    # Everything a renderer needs, computed here so the workers only receive small inputs
+    if name in ('pairplot', 'feature_densities'):
+        return sample
+    if name == 'age_counts':
+        return df['age'].value_counts().sort_index()
+    if name == 'age_boxplot':
+        return box_stats(df['age'].to_numpy(dtype=float), sample['age'].to_numpy(dtype=float))
+    numerical = df.select_dtypes(include='number').columns
+    if name == 'correlation':
+        return df[numerical].corr()
+    # plot_feature_distributions leaves out the last numerical column (age)
+    return title, {feature: feature_summary(df[feature].to_numpy(dtype=float), sample[feature].to_numpy(dtype=float))
+                   for feature in numerical[:-1]}
+
+
+def _headless():
+    # Set before pyplot is first imported in this process
+    os.environ['MPLBACKEND'] = 'Agg'
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+def _render(name, payload, path):
+    _headless()
+    renderers[name](payload, path + '.tmp.png')
+    os.replace(path + '.tmp.png', path)
+    return name, path
+
+
+def eda_report(df, cleaned_df=None, directory='eda_report', sample_rows=20_000, n_jobs=None, seed=42):
+    """Render the EDA figures of `df` (and the after-cleaning distributions of `cleaned_df`) to `directory`.
+
+    Returns {figure name: PNG path}. Figures whose data and settings are unchanged since a
+    previous report in the same directory are not rendered again.
+    """
+    os.makedirs(directory, exist_ok=True)
+    frames = {'before': df, 'after': cleaned_df}
+    figures = {'pairplot': 'before', 'feature_densities': 'before', 'age_counts': 'before', 'age_boxplot': 'before',
+               'correlation': 'before', 'distributions_before': 'before'}
+    if cleaned_df is not None:
+        figures['distributions_after'] = 'after'
+    titles = {'distributions_before': 'Distribution of Features Before Cleaning Outliers',
+              'distributions_after': 'Distribution of Features After Cleaning Outliers'}
+
+    with profiler.stage('eda_report'):
+        with profiler.stage('hash'):
+            hashes = {frame: data_hash(frames[frame]) for frame in set(figures.values())}
+        paths, pending = {}, []
+        for name, frame in figures.items():
+            key = hashlib.sha1(repr([hashes[frame], name, sample_rows, seed, report_version]).encode()).hexdigest()[:16]
+            paths[name] = os.path.join(directory, '%s-%s.png' % (name, key))
+            if not os.path.exists(paths[name]):
+                pending.append(name)
+        print('EDA report: %d figures, %d cached in %s, %d to render' % (len(paths), len(paths) - len(pending), directory, len(pending)))
+
+        with profiler.stage('summaries'):
+            samples = {frame: stratified_sample(frames[frame], sample_rows, seed=seed)
+                       for frame in {figures[name] for name in pending}}
+            tasks = [(name, _figure_inputs(name, frames[figures[name]], samples[figures[name]], titles.get(name)), paths[name])
+                     for name in pending]
+
+        with profiler.stage('render'):
+            n_jobs = max(1, min(n_jobs or os.cpu_count(), len(tasks) or 1))
+            if n_jobs == 1:
+                for task in tasks:
+                    _render(*task)
+            else:
+                # Fresh interpreters, so no GUI backend state is inherited from this process
+                with ProcessPoolExecutor(max_workers=n_jobs, mp_context=get_context('spawn')) as pool:
+                    for future in as_completed([pool.submit(_render, *task) for task in tasks]):
+                        future.result()
+
+    # Files of earlier versions of each figure are stale now
+    current = {os.path.basename(path) for path in paths.values()}
+    for file_name in os.listdir(directory):
+        if file_name.endswith('.png') and file_name.rsplit('-', 1)[0] in figures and file_name not in current:
+            os.remove(os.path.join(directory, file_name))
+
+    with open(os.path.join(directory, 'index.html'), 'w') as f:
+        f.write('<html><head><title>Abalone EDA</title></head><body>\n')
+        for name, path in paths.items():
+            f.write('<h2>%s</h2>\n<img src="%s">\n' % (html.escape(name.replace('_', ' ')), html.escape(os.path.basename(path))))
+        f.write('</body></html>\n')
+    return paths
@@ -0,0 +1,125 @@
+"""CV folds computed once per training set and shared with the tuning workers.
+
+`FoldCache` splits a training set into KFold(cv) folds (no shuffling, the splits
+GridSearchCV uses for a regressor) and writes the per-fold train/test matrices once to a
+temporary directory (under /dev/shm when available). The arrays are opened with
+`mmap_mode='r'`, and pickling a FoldCache only sends the directory, so joblib/process
+workers map the same pages instead of each getting its own copy of the data:
+
+    with FoldCache(split['X_train'], split['y_train']) as folds:
+        X_train, y_train, X_test, y_test = folds.fold(0)
+
+An optional `transform` (e.g. `StandardScaler`) is fitted once per fold on the fold's
+training rows and its output stored instead of the raw matrices.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.model_selection import KFold
+
+fold_arrays = ['X_train', 'y_train', 'X_test', 'y_test', 'train', 'test', 'order']
+
+
+def data_fingerprint(X, y):
+    digest = hashlib.sha1()
+    for array in (X, y):
+        array = np.ascontiguousarray(np.asarray(array, dtype=float))
+        digest.update(str(array.shape).encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+class FoldCache:
+    def __init__(self, X, y, cv=5, transform=None, random_state=42, directory=None):
+        X = np.asarray(X, dtype=float)
+        y = np.asarray(y, dtype=float)
+        self.cv = cv
+        self.transform = transform
+        self.fingerprint = data_fingerprint(X, y)
+        if transform is not None:
+            # A fold-level transform changes the data every estimator sees
+            self.fingerprint = hashlib.sha1((self.fingerprint + repr(transform)).encode()).hexdigest()
+        self.owner = directory is None
+        shm_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+        self.directory = directory or tempfile.mkdtemp(prefix='abalone-folds-', dir=shm_dir)
+
+        # Fixed per-fold row order, used by the halving search to subsample training rows
+        rng = np.random.RandomState(random_state)
+        self._save('X', X)
+        self._save('y', y)
+        for f, (train, test) in enumerate(KFold(n_splits=cv).split(X)):
+            X_train, X_test = X[train], X[test]
+            if transform is not None:
+                fitted = clone(transform).fit(X_train)
+                X_train, X_test = fitted.transform(X_train), fitted.transform(X_test)
+            arrays = dict(X_train=X_train, y_train=y[train], X_test=X_test, y_test=y[test], train=train, test=test,
+                          order=rng.permutation(len(train)))
+            for name in fold_arrays:
+                self._save('%s_%d' % (name, f), arrays[name])
+        with open(os.path.join(self.directory, 'meta.json'), 'w') as f:
+            json.dump({'cv': cv, 'fingerprint': self.fingerprint,
+                       'transform': None if transform is None else repr(transform)}, f)
+        self._arrays = {}
+
+    @classmethod
+    def attach(cls, directory):
+        """Open the folds written by another FoldCache (e.g. in a worker process)."""
+        self = cls.__new__(cls)
+        with open(os.path.join(directory, 'meta.json')) as f:
+            meta = json.load(f)
+        # Workers only get the transform's repr, enough to tell transformed folds apart
+        self.cv, self.fingerprint, self.transform = meta['cv'], meta['fingerprint'], meta['transform']
+        self.directory, self.owner, self._arrays = directory, False, {}
+        return self
+
+    def __reduce__(self):
+        return FoldCache.attach, (self.directory,)
+
+    def _save(self, name, array):
+        np.save(os.path.join(self.directory, name + '.npy'), np.ascontiguousarray(array))
+
+    def _load(self, name):
+        if name not in self._arrays:
+            self._arrays[name] = np.load(os.path.join(self.directory, name + '.npy'), mmap_mode='r')
+        return self._arrays[name]
+
+    @property
+    def X(self):
+        return self._load('X')
+
+    @property
+    def y(self):
+        return self._load('y')
+
+    @property
+    def splits(self):
+        """[(train, test)] index pairs, usable as GridSearchCV's `cv`."""
+        return [(self._load('train_%d' % f), self._load('test_%d' % f)) for f in range(self.cv)]
+
+    def fold(self, f, rows=None):
+        """(X_train, y_train, X_test, y_test) of fold `f`; `rows` keeps the first rows of the fixed shuffled order."""
+        X_train, y_train = self._load('X_train_%d' % f), self._load('y_train_%d' % f)
+        if rows is not None:
+            keep = self._load('order_%d' % f)[:rows]
+            X_train, y_train = X_train[keep], y_train[keep]
+        return X_train, y_train, self._load('X_test_%d' % f), self._load('y_test_%d' % f)
+
+    def n_train(self, f):
+        return len(self._load('train_%d' % f))
+
+    def close(self):
+        self._arrays = {}
+        if self.owner:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
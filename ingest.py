@@ -0,0 +1,147 @@
+"""Chunked, typed ingestion of abalone measurement exports.
+
+The CSV is parsed in chunks with explicit dtypes (float32 measurements, categorical Sex,
+int16 Rings) so `Sex` never exists as an object column and each measurement takes half
+the memory of the default float64. Per chunk, the target `age = Rings + 1.5` is derived
+and rows with `Height == 0` (measurement noise) are counted. The result can be written to
+a columnar cache that later runs load instead of re-parsing the text:
+
+    df = load_abalone('abalone.csv', cache_path='abalone.parquet')
+    df.attrs['height_zero_rows']
+
+Parquet/Feather caches need pyarrow (`pip install pyarrow`).
+"""
+
+import io
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from predictor import measurement_columns
+
+sex_dtype = pd.CategoricalDtype(['F', 'I', 'M'])
+csv_dtypes = dict({'Sex': sex_dtype, 'Rings': np.int16}, **{c: np.float32 for c in measurement_columns})
+
+
+def _prepare_chunk(chunk, drop_zero_height):
+    chunk['age'] = (chunk['Rings'] + 1.5).astype(np.float32)
+    chunk = chunk.drop('Rings', axis=1)
+
+    zero_height = chunk['Height'] == 0
+    n_zero = int(zero_height.sum())
+    if drop_zero_height and n_zero:
+        chunk = chunk[~zero_height]
+    chunk.attrs['height_zero_rows'] = n_zero
+    return chunk
+
+
+def iter_abalone_chunks(path, chunksize=1_000_000, drop_zero_height=False):
+    """Yield typed chunks with `age` derived; each chunk's Height == 0 count is in `attrs`."""
+    for chunk in pd.read_csv(path, dtype=csv_dtypes, chunksize=chunksize):
+        yield _prepare_chunk(chunk, drop_zero_height)
+
+
+def iter_chunks(path, chunksize=1_000_000):
+    """Typed frames with `age` from a CSV, or from a Parquet/Feather cache written by `write_cache`."""
+    if path.endswith(('.parquet', '.pq')):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    elif path.endswith(('.feather', '.arrow')):
+        import pyarrow.feather as feather
+        for batch in feather.read_table(path, memory_map=True).to_batches(max_chunksize=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from iter_abalone_chunks(path, chunksize)
+
+
+def csv_byte_ranges(path, n_parts):
+    """Split a CSV into `n_parts` (start, end) byte ranges of the data rows, cut at line ends."""
+    with open(path, 'rb') as f:
+        f.readline()
+        data_start = f.tell()
+        size = os.fstat(f.fileno()).st_size
+        cuts = [data_start]
+        for i in range(1, n_parts):
+            f.seek(max(data_start + (size - data_start) * i // n_parts - 1, cuts[-1]))
+            f.readline()
+            cuts.append(max(f.tell(), cuts[-1]))
+        cuts.append(size)
+    return [(start, end) for start, end in zip(cuts[:-1], cuts[1:]) if end > start]
+
+
+def iter_abalone_range(path, start, end, chunk_bytes=64 << 20, drop_zero_height=False):
+    """Like `iter_abalone_chunks` for the rows in one `csv_byte_ranges` range, read `chunk_bytes` at a time."""
+    with open(path, 'rb') as f:
+        names = pd.read_csv(io.BytesIO(f.readline()), nrows=0).columns
+        f.seek(start)
+        while f.tell() < end:
+            block = f.read(min(chunk_bytes, end - f.tell()))
+            if f.tell() < end:
+                # Finish the last line of the block
+                block += f.readline()
+            chunk = pd.read_csv(io.BytesIO(block), header=None, names=names, dtype=csv_dtypes)
+            yield _prepare_chunk(chunk, drop_zero_height)
+
+
+def write_cache(df, cache_path):
+    """Write `df` as Parquet, or Feather for a `.feather`/`.arrow` path."""
+    if cache_path.endswith(('.feather', '.arrow')):
+        df.reset_index(drop=True).to_feather(cache_path)
+    else:
+        df.to_parquet(cache_path, index=False)
+
+
+def read_cache(cache_path):
+    if cache_path.endswith(('.feather', '.arrow')):
+        return pd.read_feather(cache_path)
+    return pd.read_parquet(cache_path)
+
+
+def cache_options(path, chunksize, drop_zero_height):
+    """What a cache of `path` was built from; a cache is only reused when these match."""
+    stat = os.stat(path)
+    return {'source': os.path.abspath(path), 'source_size': stat.st_size, 'source_mtime_ns': stat.st_mtime_ns,
+            'chunksize': chunksize, 'drop_zero_height': bool(drop_zero_height)}
+
+
+def _read_cache_meta(cache_path):
+    try:
+        with open(cache_path + '.json') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def load_abalone(path, chunksize=1_000_000, cache_path=None, drop_zero_height=False):
+    """Load an abalone CSV with compact dtypes.
+
+    With `cache_path`, the cache is loaded directly if its sidecar `<cache_path>.json`
+    records the same source file (path, size, mtime) and the same `chunksize` and
+    `drop_zero_height`; otherwise the CSV is parsed and the cache (re)written.
+    """
+    options = cache_options(path, chunksize, drop_zero_height) if cache_path else None
+    if cache_path and os.path.exists(cache_path):
+        meta = _read_cache_meta(cache_path)
+        if meta is not None and meta.get('options') == options:
+            df = read_cache(cache_path)
+            df.attrs['height_zero_rows'] = meta['height_zero_rows']
+            return df
+
+    chunks = list(iter_abalone_chunks(path, chunksize, drop_zero_height))
+    if not chunks:
+        raise ValueError('%s has no rows' % path)
+    n_zero = sum(chunk.attrs['height_zero_rows'] for chunk in chunks)
+    df = pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0].reset_index(drop=True)
+    df.attrs['height_zero_rows'] = n_zero
+
+    if cache_path:
+        # The metadata is removed first and written last, so an interrupted write leaves no valid cache
+        if os.path.exists(cache_path + '.json'):
+            os.remove(cache_path + '.json')
+        write_cache(df, cache_path)
+        with open(cache_path + '.json', 'w') as f:
+            json.dump({'options': options, 'height_zero_rows': n_zero}, f, indent=2)
+    return df
@@ -0,0 +1,114 @@
+"""KNN regression on a prebuilt, persisted neighbor index.
+
+`KNeighborsRegressor` rebuilds its tree on every fit and the 'brute' setting searches all
+training rows per query. `KNNIndex` builds a KD-tree (or ball tree) once on the
+standardized features, answers batches from a thread pool (the tree queries release the
+GIL) and takes new labelled rows without a rebuild: they go to a small buffer tree whose
+neighbors are merged with the main tree's, and the main tree is only rebuilt once the
+buffer outgrows `rebuild_fraction` of it.
+
+    index = KNNIndex(n_neighbors=4).fit(split['X_train'], split['y_train'])
+    index.save('knn.pkl')
+    index = KNNIndex.load('knn.pkl')
+    index.add(X_new, y_new)
+    index.predict(X_query)
+
+Predictions equal `KNeighborsRegressor` with the same n_neighbors/weights, up to the
+order of equidistant neighbors.
+"""
+
+import os
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from sklearn.base import BaseEstimator, RegressorMixin
+from sklearn.neighbors import BallTree, KDTree
+
+
+class KNNIndex(RegressorMixin, BaseEstimator):
+    def __init__(self, n_neighbors=5, weights='uniform', algorithm='kd_tree', leaf_size=40,
+                 rebuild_fraction=0.1, batch_size=10_000, n_threads=None):
+        self.n_neighbors = n_neighbors
+        self.weights = weights
+        self.algorithm = algorithm
+        self.leaf_size = leaf_size
+        self.rebuild_fraction = rebuild_fraction
+        self.batch_size = batch_size
+        self.n_threads = n_threads
+
+    def fit(self, X, y):
+        self._build(np.asarray(X, dtype=float), np.asarray(y, dtype=float))
+        return self
+
+    def _build(self, X, y):
+        # 'auto' and 'brute' in a KNN grid still get a tree here, the neighbors are the same
+        self.tree_ = self._tree(X)
+        self.y_ = y
+        self.buffer_tree_ = None
+        self.buffer_X_ = np.empty((0, X.shape[1]))
+        self.buffer_y_ = np.empty(0)
+        self.n_features_in_ = X.shape[1]
+
+    def _tree(self, X):
+        tree_class = BallTree if self.algorithm == 'ball_tree' else KDTree
+        return tree_class(X, leaf_size=self.leaf_size)
+
+    @property
+    def n_rows(self):
+        return len(self.y_) + len(self.buffer_y_)
+
+    def add(self, X, y):
+        """Add labelled rows; the tree is rebuilt only when the buffer exceeds rebuild_fraction of it."""
+        self.buffer_X_ = np.vstack([self.buffer_X_, np.asarray(X, dtype=float)])
+        self.buffer_y_ = np.concatenate([self.buffer_y_, np.asarray(y, dtype=float)])
+        if len(self.buffer_y_) > self.rebuild_fraction * len(self.y_):
+            X_all = np.vstack([np.asarray(self.tree_.data), self.buffer_X_])
+            self._build(X_all, np.concatenate([self.y_, self.buffer_y_]))
+        else:
+            self.buffer_tree_ = self._tree(self.buffer_X_)
+        return self
+
+    def kneighbors(self, X):
+        """(distances, targets) of the n_neighbors nearest rows, nearest first."""
+        distances, indices = self.tree_.query(X, k=min(self.n_neighbors, len(self.y_)))
+        targets = self.y_[indices]
+        if self.buffer_tree_ is not None:
+            buffer_distances, buffer_indices = self.buffer_tree_.query(X, k=min(self.n_neighbors, len(self.buffer_y_)))
+            distances = np.hstack([distances, buffer_distances])
+            targets = np.hstack([targets, self.buffer_y_[buffer_indices]])
+            nearest = np.argsort(distances, axis=1, kind='stable')[:, :self.n_neighbors]
+            distances = np.take_along_axis(distances, nearest, axis=1)
+            targets = np.take_along_axis(targets, nearest, axis=1)
+        return distances, targets
+
+    def _predict_batch(self, X):
+        distances, targets = self.kneighbors(X)
+        if self.weights == 'uniform':
+            return targets.mean(axis=1)
+        # Inverse distance weights; an exact match gets all the weight, as in KNeighborsRegressor
+        with np.errstate(divide='ignore'):
+            weights = 1.0 / distances
+        exact = np.isinf(weights)
+        rows = exact.any(axis=1)
+        weights[rows] = exact[rows]
+        return (weights * targets).sum(axis=1) / weights.sum(axis=1)
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=float)
+        if len(X) == 0:
+            return np.empty(0)
+        batches = [X[i:i + self.batch_size] for i in range(0, len(X), self.batch_size)]
+        if len(batches) <= 1:
+            return self._predict_batch(X)
+        with ThreadPoolExecutor(max_workers=self.n_threads or os.cpu_count()) as pool:
+            return np.concatenate(list(pool.map(self._predict_batch, batches)))
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(path):
+        with open(path, 'rb') as f:
+            return pickle.load(f)
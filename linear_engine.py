@@ -0,0 +1,155 @@
+"""Closed-form Ridge / LinearRegression from sufficient statistics.
+
+With ~10 features, everything a least-squares fit needs is in the running sums
+n, sum(x), sum(y), X^T X, X^T y and y^T y (`LinearStats`). They add up over batches, so a
+growing dataset is retrained by updating the sums with the new rows only. One
+eigendecomposition of the centered X^T X gives the coefficients for every alpha:
+
+    coef(alpha) = V diag(1 / (w + alpha)) V^T X^T y     (X^T X = V diag(w) V^T, centered)
+
+`ridge_cv_scores` uses this for the Ridge grid: per-fold statistics come from subtracting
+each held-out fold from the total, then all alphas are solved from one decomposition per
+fold. The intercept is not penalized, as in sklearn's Ridge, so the result is the exact
+optimum every sklearn solver converges to.
+
+    stats = LinearStats.from_arrays(X_train, y_train)
+    stats.update(X_new, y_new)
+    coef, intercept = stats.solve(alpha=10)
+"""
+
+import numpy as np
+from sklearn.base import BaseEstimator, RegressorMixin
+
+
+class LinearStats:
+    def __init__(self, n_features):
+        self.n = 0
+        self.sum_x = np.zeros(n_features)
+        self.sum_y = 0.0
+        self.xtx = np.zeros((n_features, n_features))
+        self.xty = np.zeros(n_features)
+        self.yty = 0.0
+
+    @classmethod
+    def from_arrays(cls, X, y):
+        X = np.asarray(X, dtype=float)
+        return cls(X.shape[1]).update(X, y)
+
+    def update(self, X, y):
+        """Add a batch of rows; returns self."""
+        X = np.asarray(X, dtype=float)
+        y = np.asarray(y, dtype=float)
+        self.n += len(X)
+        self.sum_x += X.sum(axis=0)
+        self.sum_y += y.sum()
+        self.xtx += X.T @ X
+        self.xty += X.T @ y
+        self.yty += y @ y
+        return self
+
+    def _combine(self, other, sign):
+        combined = LinearStats(len(self.sum_x))
+        combined.n = self.n + sign * other.n
+        for name in ('sum_x', 'sum_y', 'xtx', 'xty', 'yty'):
+            setattr(combined, name, getattr(self, name) + sign * getattr(other, name))
+        return combined
+
+    def __add__(self, other):
+        return self._combine(other, 1)
+
+    def __sub__(self, other):
+        return self._combine(other, -1)
+
+    def save(self, path):
+        np.savez(path, n=self.n, sum_x=self.sum_x, sum_y=self.sum_y, xtx=self.xtx, xty=self.xty, yty=self.yty)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        stats = cls(len(data['sum_x']))
+        stats.n = int(data['n'])
+        for name in ('sum_x', 'sum_y', 'xtx', 'xty', 'yty'):
+            setattr(stats, name, data[name] if data[name].ndim else float(data[name]))
+        return stats
+
+    # Solving
+
+    def centered(self):
+        """(mean_x, mean_y, centered X^T X, centered X^T y)."""
+        mean_x = self.sum_x / self.n
+        mean_y = self.sum_y / self.n
+        return (mean_x, mean_y, self.xtx - self.n * np.outer(mean_x, mean_x),
+                self.xty - self.n * mean_x * mean_y)
+
+    def path(self, alphas):
+        """Coefficients (len(alphas), n_features) and intercepts for every alpha from one eigendecomposition.
+
+        alpha=0 is ordinary least squares; directions with no variance (e.g. a constant
+        column) get a zero coefficient, as with a pseudo-inverse.
+        """
+        mean_x, mean_y, xtx, xty = self.centered()
+        w, V = np.linalg.eigh(xtx)
+        projected = V.T @ xty
+        alphas = np.asarray(alphas, dtype=float)
+        shrink = w[None, :] + alphas[:, None]
+        tol = max(w.max(), 0.0) * len(w) * np.finfo(float).eps
+        inverse = np.divide(1.0, shrink, out=np.zeros_like(shrink), where=np.abs(shrink) > tol)
+        coefs = (inverse * projected[None, :]) @ V.T
+        return coefs, mean_y - coefs @ mean_x
+
+    def solve(self, alpha=0.0):
+        coefs, intercepts = self.path([alpha])
+        return coefs[0], intercepts[0]
+
+
+def ridge_cv_scores(folds, alphas):
+    """Mean CV R2 per alpha on a `folds.FoldCache`.
+
+    Each fold's held-out rows are summarized once; the training statistics of fold f are
+    the total minus fold f, so the data is read once whatever the number of alphas. That
+    needs every fold to hold the same rows, so folds with a `transform` (fitted per fold)
+    are rejected.
+    """
+    if folds.transform is not None:
+        raise ValueError('ridge_cv_scores needs untransformed folds, got transform=%r' % (folds.transform,))
+    held_out = [LinearStats.from_arrays(*folds.fold(f)[2:]) for f in range(folds.cv)]
+    total = held_out[0]
+    for stats in held_out[1:]:
+        total = total + stats
+
+    scores = np.zeros((len(alphas), folds.cv))
+    for f in range(folds.cv):
+        coefs, intercepts = (total - held_out[f]).path(alphas)
+        _, _, X_test, y_test = folds.fold(f)
+        y_pred = X_test @ coefs.T + intercepts
+        residual = ((y_test[:, None] - y_pred) ** 2).sum(axis=0)
+        scores[:, f] = 1 - residual / ((y_test - y_test.mean()) ** 2).sum()
+    return scores.mean(axis=1)
+
+
+class ClosedFormRidge(RegressorMixin, BaseEstimator):
+    """Ridge (alpha > 0) or LinearRegression (alpha = 0) fitted from `LinearStats`.
+
+    `partial_fit` adds rows to the statistics and re-solves, without revisiting old rows.
+    """
+
+    def __init__(self, alpha=1.0):
+        self.alpha = alpha
+
+    def fit(self, X, y):
+        self.stats_ = LinearStats.from_arrays(X, y)
+        return self._solve()
+
+    def partial_fit(self, X, y):
+        if not hasattr(self, 'stats_'):
+            return self.fit(X, y)
+        self.stats_.update(X, y)
+        return self._solve()
+
+    def _solve(self):
+        self.coef_, self.intercept_ = self.stats_.solve(self.alpha)
+        self.n_features_in_ = len(self.coef_)
+        return self
+
+    def predict(self, X):
+        return np.asarray(X, dtype=float) @ self.coef_ + self.intercept_
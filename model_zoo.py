@@ -0,0 +1,119 @@
+"""Run the model-selection grid (model family x dataset) on a process pool.
+
+The registry is a list of (family, dataset) pairs; families are the keys of
+`abalone_age_model.model_families()` plus 'ANN'. The train/test arrays of every dataset
+are written once to .npy files in a temporary directory (under /dev/shm when available)
+and workers open them with `mmap_mode='r'`, so the splits are shared rather than pickled
+to each worker. Results come back as one DataFrame, one row per pair, with the metrics,
+fit/predict wall time and how far RSS rose during that pair's fit and predict
+(`results_store.ResultsStore.record_frame` appends it to the results store):
+
+    results = run_zoo(datasets, n_jobs=4)
+    results.sort_values('r2_test', ascending=False)
+"""
+
+import json
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+import pandas as pd
+
+import abalone_age_model as aam
+from profiling import profiler
+
+split_keys = ['X_train', 'X_test', 'y_train', 'y_test']
+result_columns = ['name', 'family', 'dataset', 'params', 'mse_train', 'mae_train', 'r2_train',
+                  'mse_test', 'mae_test', 'r2_test', 'fit_time', 'predict_time', 'peak_memory']
+
+# Set in each worker by _attach_splits
+_splits = None
+
+
+def zoo_registry(families=None, datasets=None, include_ann=False):
+    """All (family, dataset) pairs to evaluate, in the order of the Model Selection section."""
+    if families is None:
+        families = list(aam.model_families()) + (['ANN'] if include_ann else [])
+    if datasets is None:
+        datasets = aam.dataset_names
+    return [(family, dataset) for family in families for dataset in datasets]
+
+
+def share_splits(datasets, directory):
+    """Write each split array to `directory`; returns {dataset: {key: path}}."""
+    paths = {}
+    for dataset, split in datasets.items():
+        paths[dataset] = {}
+        for key in split_keys:
+            path = os.path.join(directory, '%s_%s.npy' % (dataset, key))
+            np.save(path, np.asarray(split[key], dtype=float))
+            paths[dataset][key] = path
+    return paths
+
+
+def _attach_splits(paths, profile=False, threads=1):
+    global _splits
+    # Keep TensorFlow to the worker's share of the cores, set before it is imported
+    os.environ['TF_NUM_INTRAOP_THREADS'] = str(threads)
+    os.environ['TF_NUM_INTEROP_THREADS'] = '1'
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+    profiler.enabled = profile
+    _splits = {dataset: {key: np.load(path, mmap_mode='r') for key, path in keys.items()}
+               for dataset, keys in paths.items()}
+
+
+def evaluate_pair(family, dataset, split):
+    """Fit one family on one split and return its result row."""
+    name = aam.evaluation_name(family, dataset)
+    if family == 'ANN':
+        metrics = aam.ann_model_evaluation(split['X_train'], split['y_train'], split['X_test'], split['y_test'],
+                                           name, verbose=False)
+        params = aam.ann_params
+    else:
+        model = aam.model_families()[family]()
+        metrics = aam.model_evaluation(model, split['X_train'], split['y_train'], split['X_test'], split['y_test'],
+                                       name, verbose=False)
+        params = model.get_params()
+
+    row = {'name': name, 'family': family, 'dataset': dataset,
+           'params': json.dumps(params, sort_keys=True, default=str)}
+    row.update(metrics)
+    return row
+
+
+def _evaluate_shared(family, dataset):
+    # Profile records stay in the worker, send this pair's back with the row
+    first = len(profiler.records)
+    row = evaluate_pair(family, dataset, _splits[dataset])
+    return row, profiler.records[first:]
+
+
+def run_zoo(datasets, registry=None, n_jobs=None):
+    """Evaluate every registry pair; `n_jobs` workers (default: all cores, 1 runs in-process)."""
+    if registry is None:
+        registry = zoo_registry()
+    if n_jobs is None:
+        n_jobs = os.cpu_count()
+
+    if n_jobs == 1:
+        rows = [evaluate_pair(family, dataset, datasets[dataset]) for family, dataset in registry]
+        return pd.DataFrame(rows, columns=result_columns)
+
+    needed = {dataset: datasets[dataset] for _, dataset in registry}
+    shm_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+    with tempfile.TemporaryDirectory(prefix='abalone-zoo-', dir=shm_dir) as directory:
+        paths = share_splits(needed, directory)
+        # Spawned, not forked: a forked worker would inherit TensorFlow's thread pools if the
+        # parent had already imported it
+        threads = max(1, (os.cpu_count() or 1) // n_jobs)
+        with ProcessPoolExecutor(max_workers=n_jobs, mp_context=get_context('spawn'), initializer=_attach_splits,
+                                 initargs=(paths, profiler.enabled, threads)) as pool:
+            futures = [pool.submit(_evaluate_shared, family, dataset) for family, dataset in registry]
+            rows = []
+            for future in futures:
+                row, records = future.result()
+                rows.append(row)
+                profiler.records.extend(records)
+    return pd.DataFrame(rows, columns=result_columns)
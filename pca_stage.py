@@ -0,0 +1,124 @@
+"""PCA fitted once for both the explained-variance curve and the projection.
+
+The PCA section fitted a full `PCA()` for the cumulative explained variance and then a
+second `PCA(n_components=5)` on the same matrix. `PCAStage` keeps the whole spectrum of one
+fit: `cumulative_variance_` is the curve, and `components_` holds only the first
+`n_components_` directions, used by `transform`. `n_components` may also be picked from
+the curve, as the fewest components reaching `variance_threshold`.
+
+    pca = PCAStage(n_components=5).fit(X_scaled)
+    pca.cumulative_variance_, pca.transform(X_scaled)
+    PCAStage(variance_threshold=0.95).fit(X_scaled).n_components_
+
+Methods:
+
+    full         sklearn `PCA` of the whole matrix (exact; a covariance eigendecomposition for
+                 tall matrices, an SVD otherwise)
+    randomized   randomized SVD of the leading `max_components` directions, for wide
+                 matrices; the curve only covers those directions
+    incremental  the mean and X^T X are accumulated over mini-batches (`batch_size` rows of
+                 X, or chunks given to `partial_fit`) and the covariance is decomposed, so
+                 the data need not fit in memory; same result as 'full' up to rounding
+
+    pca = PCAStage(n_components=5, method='incremental')
+    for chunk in iter_chunks('abalone.parquet'):
+        pca.partial_fit(scaler.transform(chunk[col_except_rings]))
+
+Attributes match sklearn's `PCA` (mean_, components_, explained_variance_,
+explained_variance_ratio_, n_components_), so `AgePredictor.from_split` takes either.
+"""
+
+import numpy as np
+from sklearn.base import BaseEstimator, TransformerMixin
+
+pca_methods = ['full', 'randomized', 'incremental']
+
+
+class PCAStage(TransformerMixin, BaseEstimator):
+    def __init__(self, n_components=None, variance_threshold=None, method='full', max_components=None,
+                 batch_size=100_000, random_state=42):
+        self.n_components = n_components
+        self.variance_threshold = variance_threshold
+        self.method = method
+        self.max_components = max_components
+        self.batch_size = batch_size
+        self.random_state = random_state
+
+    def fit(self, X, y=None):
+        if self.method not in pca_methods:
+            raise ValueError('method must be one of %s, got %r' % (pca_methods, self.method))
+        if self.method == 'incremental':
+            self._reset()
+            for start in range(0, len(X), self.batch_size):
+                self._accumulate(X[start:start + self.batch_size])
+            return self._solve_covariance()
+
+        from sklearn.decomposition import PCA
+        X = np.asarray(X, dtype=float)
+        if self.method == 'full':
+            pca = PCA()
+        else:
+            pca = PCA(n_components=self.max_components or min(X.shape), svd_solver='randomized',
+                      random_state=self.random_state)
+        pca.fit(X)
+        return self._select(pca.mean_, pca.components_, pca.explained_variance_, pca.explained_variance_ratio_)
+
+    def partial_fit(self, X, y=None):
+        """Add a chunk of rows and update the decomposition (method='incremental')."""
+        if self.method != 'incremental':
+            raise ValueError("partial_fit needs method='incremental', got %r" % self.method)
+        if not hasattr(self, 'n_samples_seen_'):
+            self._reset()
+        self._accumulate(X)
+        return self._solve_covariance()
+
+    def _reset(self):
+        self.n_samples_seen_ = 0
+        self.sum_ = None
+        self.xtx_ = None
+
+    def _accumulate(self, X):
+        X = np.asarray(X, dtype=float)
+        if self.sum_ is None:
+            self.sum_ = np.zeros(X.shape[1])
+            self.xtx_ = np.zeros((X.shape[1], X.shape[1]))
+        self.n_samples_seen_ += len(X)
+        self.sum_ += X.sum(axis=0)
+        self.xtx_ += X.T @ X
+
+    def _solve_covariance(self):
+        n = self.n_samples_seen_
+        if n < 2:
+            raise ValueError('PCA needs at least 2 rows, got %d' % n)
+        mean = self.sum_ / n
+        covariance = (self.xtx_ - n * np.outer(mean, mean)) / (n - 1)
+        variance, vectors = np.linalg.eigh(covariance)
+        order = np.argsort(variance)[::-1][:min(n, len(mean))]
+        variance = np.maximum(variance[order], 0)
+        components = vectors[:, order].T
+        # Same sign convention as sklearn's PCA: the largest loading of each component is positive
+        signs = np.sign(components[np.arange(len(components)), np.abs(components).argmax(axis=1)])
+        components *= signs[:, None]
+        return self._select(mean, components, variance, variance / np.trace(covariance))
+
+    def _select(self, mean, components, variance, ratio):
+        self.mean_ = mean
+        self.cumulative_variance_ = np.cumsum(ratio)
+        if self.n_components is not None:
+            n = self.n_components
+        elif self.variance_threshold is not None:
+            # Fewest components whose cumulative ratio reaches the threshold
+            n = min(int(np.searchsorted(self.cumulative_variance_, self.variance_threshold - 1e-12) + 1), len(components))
+        else:
+            n = len(components)
+        if n > len(components):
+            raise ValueError('n_components=%d but only %d components were computed' % (n, len(components)))
+        self.n_components_ = n
+        self.components_ = components[:n]
+        self.explained_variance_ = variance[:n]
+        self.explained_variance_ratio_ = ratio[:n]
+        self.n_features_in_ = len(mean)
+        return self
+
+    def transform(self, X):
+        return (np.asarray(X, dtype=float) - self.mean_) @ self.components_.T
@@ -0,0 +1,168 @@
+"""Batch and streaming inference for a trained abalone age model.
+
+`AgePredictor` replays the preprocessing used to build the training split in
+`abalone_age_model.build_datasets` (one-hot Sex -> StandardScaler, or StandardScaler -> PCA
+-> one-hot Sex for the PCA dataset) and then calls the fitted model:
+
+    predictor = AgePredictor.from_split(datasets['cleaned'], rf_mod)
+    predictor.save('age_model')
+
+    predictor = AgePredictor.load('age_model')
+    ages = predictor.predict(new_df)
+    for ages in predictor.predict_stream(open('measurements.csv'), chunk_size=50000):
+        ...
+
+Only numpy and pandas are imported here so scoring workers start quickly.
+"""
+
+import csv
+
+import numpy as np
+import pandas as pd
+
+from transform_plan import TransformPlan
+
+measurement_columns = ['Length', 'Diameter', 'Height', 'Whole weight', 'Shucked weight', 'Viscera weight', 'Shell weight']
+raw_columns = ['Sex'] + measurement_columns
+
+
+class AgePredictor:
+    """Preprocessing + fitted model for scoring raw abalone measurements.
+
+    `scalers` is a list of (mean, scale) pairs applied in order. With `pca_components` set,
+    the first scaler standardizes the measurements before the projection and the one-hot
+    Sex columns are appended unscaled, like the PCA dataset.
+    """
+
+    def __init__(self, model, columns, scalers, sex_categories=('F', 'I', 'M'), pca_mean=None, pca_components=None):
+        self.model = model
+        self.columns = list(columns)
+        self.scalers = [(np.asarray(mean, dtype=float), np.asarray(scale, dtype=float)) for mean, scale in scalers]
+        self.sex_categories = list(sex_categories)
+        self.pca_mean = None if pca_mean is None else np.asarray(pca_mean, dtype=float)
+        self.pca_components = None if pca_components is None else np.asarray(pca_components, dtype=float)
+        self._plan = None
+
+    @classmethod
+    def from_split(cls, split, model, input_scaler=None):
+        """Build a predictor from a `build_datasets` entry and a model fitted on it.
+
+        `input_scaler` is an extra StandardScaler fitted on X_train, as used by the tuned ANN.
+        """
+        scalers = [(split['scaler'].mean_, split['scaler'].scale_)]
+        if input_scaler is not None:
+            scalers.append((input_scaler.mean_, input_scaler.scale_))
+        sex_categories = [c[len('Sex_'):] for c in split['columns'] if c.startswith('Sex_')]
+        pca = split.get('pca')
+        if pca is None:
+            return cls(model, split['columns'], scalers, sex_categories)
+        return cls(model, split['columns'], scalers, sex_categories, pca.mean_, pca.components_)
+
+    def save(self, path):
+        """Write a versioned artifact directory, see `artifact.save_artifact`."""
+        from artifact import save_artifact
+        return save_artifact(self, path)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Load an artifact directory; arrays are memory-mapped unless `mmap` is False."""
+        from artifact import load_artifact
+        return load_artifact(path, mmap=mmap)
+
+    def _one_hot(self, sex):
+        sex = np.asarray(sex)
+        return np.stack([sex == category for category in self.sex_categories], axis=1).astype(float)
+
+    def plan(self):
+        """The fused `TransformPlan` of this predictor's preprocessing, built on first use."""
+        if self._plan is None:
+            self._plan = TransformPlan.from_predictor(self)
+        return self._plan
+
+    def transform(self, sex, measurements, out=None):
+        """Model input for `sex` (n,) and `measurements` (n, 7) in `measurement_columns` order.
+
+        Runs the fused plan, bit-for-bit equal to `transform_reference`; `out` is an
+        optional preallocated (n, len(columns)) float64 buffer.
+        """
+        return self.plan().transform(sex, measurements, out)
+
+    def transform_reference(self, sex, measurements):
+        """The unfused preprocessing chain, kept as the reference for `TransformPlan`."""
+        measurements = np.asarray(measurements, dtype=float)
+        scalers = self.scalers
+        if self.pca_components is None:
+            X = np.hstack([measurements, self._one_hot(sex)])
+        else:
+            mean, scale = scalers[0]
+            X = (measurements - mean) / scale
+            X = (X - self.pca_mean) @ self.pca_components.T
+            X = np.hstack([X, self._one_hot(sex)])
+            scalers = scalers[1:]
+        for mean, scale in scalers:
+            X = (X - mean) / scale
+        return X
+
+    def _predict_transformed(self, X):
+        return np.asarray(self.model.predict(X), dtype=float).ravel()
+
+    def predict_arrays(self, sex, measurements):
+        """Predict ages for `sex` (n,) and `measurements` (n, 7) in `measurement_columns` order."""
+        return self._predict_transformed(self.transform(sex, measurements))
+
+    def predict(self, X):
+        """Predict ages for a DataFrame/dict with Sex + measurement columns, or an array in `raw_columns` order."""
+        if isinstance(X, np.ndarray):
+            X = pd.DataFrame(X, columns=raw_columns)
+        elif not isinstance(X, pd.DataFrame):
+            X = pd.DataFrame(X)
+        if len(X) == 0:
+            return np.empty(0)
+        return self.predict_arrays(X['Sex'].to_numpy(), X[measurement_columns].to_numpy(dtype=float))
+
+    def predict_stream(self, rows, chunk_size=10000, header=None):
+        """Score an iterable of CSV rows (lines or field lists), yielding one array per `chunk_size` rows.
+
+        Only one chunk is held in memory at a time. A header row naming `Sex` is detected and
+        used to locate the columns; otherwise rows are read in `header` or `raw_columns` order.
+        """
+        rows = iter(rows)
+        first = next(rows, None)
+        if first is None:
+            return
+        if isinstance(first, str):
+            rows = csv.reader(_chain(first, rows))
+            first = next(rows)
+        if 'Sex' in first:
+            header = list(first)
+        else:
+            rows = _chain(first, rows)
+        header = list(header or raw_columns)
+        sex_pos = header.index('Sex')
+        measurement_pos = [header.index(c) for c in measurement_columns]
+
+        chunk = []
+        for row in rows:
+            if not row:
+                continue
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                yield self._predict_rows(chunk, sex_pos, measurement_pos)
+                chunk = []
+        if chunk:
+            yield self._predict_rows(chunk, sex_pos, measurement_pos)
+
+    def _predict_rows(self, chunk, sex_pos, measurement_pos):
+        sex = np.array([row[sex_pos] for row in chunk])
+        measurements = np.array([[row[i] for i in measurement_pos] for row in chunk], dtype=float)
+        return self.predict_arrays(sex, measurements)
+
+    def predict_csv(self, path, chunk_size=100000):
+        """Score a CSV file chunk by chunk, yielding one array of ages per chunk."""
+        for chunk in pd.read_csv(path, chunksize=chunk_size):
+            yield self.predict(chunk)
+
+
+def _chain(first, rest):
+    yield first
+    yield from rest
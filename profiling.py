@@ -0,0 +1,221 @@
+"""Stage profiler for the training and evaluation code.
+
+Stages nest; each one records wall time, CPU time, how far RSS rose above its value when the
+stage started (see `PeakRSS`) and the tracemalloc allocation peak reached inside it:
+
+    from profiling import profiler
+
+    profiler.enable()
+    with profiler.stage('model_evaluation'), profiler.stage('fit'):
+        model.fit(X_train, y_train)
+    profiler.to_json('profile.json')
+    profiler.to_folded('profile.folded')   # flamegraph.pl / speedscope input
+
+The module-level `profiler` starts disabled; `stage()` then returns a shared no-op context
+manager, so instrumented code pays one attribute check per stage.
+"""
+
+import contextlib
+import ctypes
+import json
+import time
+import tracemalloc
+
+_disabled_stage = contextlib.nullcontext()
+
+try:
+    # glibc only; CDLL(None) resolves it from the running process without searching for libc
+    _malloc_trim = ctypes.CDLL(None).malloc_trim
+except (OSError, AttributeError):
+    _malloc_trim = None
+
+# PeakRSS blocks that are currently open, innermost last
+_open_peaks = []
+
+
+def _vm_hwm():
+    # Peak RSS since the last reset, in bytes; None without /proc
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _reset_vm_hwm():
+    # Restart the peak from the current RSS; False where it cannot be reset
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        return False
+    return True
+
+
+class PeakRSS:
+    """How far the resident set size rose above its value at entry inside the block, in bytes:
+
+        with PeakRSS() as peak:
+            model.fit(X_train, y_train)
+        peak.bytes
+
+    On entry the heap's free pages are returned to the OS (glibc `malloc_trim`), so memory
+    freed by an earlier block is not silently reused, and the process peak is reset, so the
+    RSS the process already had (imported libraries, loaded data) is not counted. Blocks
+    nest: the peak an enclosing block had reached is kept when an inner one resets it.
+    Where the peak cannot be reset (no /proc/self/clear_refs), `bytes` is None.
+    """
+
+    def __init__(self):
+        self.bytes = None
+        self._start = None
+        self._peak = 0
+
+    def __enter__(self):
+        hwm = _vm_hwm()
+        if _open_peaks and hwm is not None:
+            _open_peaks[-1]._peak = max(_open_peaks[-1]._peak, hwm)
+        if _malloc_trim is not None:
+            _malloc_trim(0)
+        if hwm is not None and _reset_vm_hwm():
+            self._start = _vm_hwm()
+        _open_peaks.append(self)
+        return self
+
+    def __exit__(self, *exc):
+        _open_peaks.remove(self)
+        if self._start is not None:
+            peak = max(self._peak, _vm_hwm())
+            self.bytes = peak - self._start
+            if _open_peaks:
+                _open_peaks[-1]._peak = max(_open_peaks[-1]._peak, peak)
+        return False
+
+
+class _Frame:
+    __slots__ = ('name', 'wall', 'cpu', 'alloc_base', 'child_wall', 'child_peak', 'rss')
+
+    def __init__(self, name):
+        self.name = name
+        self.child_wall = 0.0
+        self.child_peak = 0
+
+
+class _Stage:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.frame = _Frame(name)
+
+    def __enter__(self):
+        self.profiler._push(self.frame)
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler._pop(self.frame)
+        return False
+
+
+class Profiler:
+    def __init__(self, enabled=False, trace_memory=True):
+        self.enabled = enabled
+        self.trace_memory = trace_memory
+        self.records = []
+        self._stack = []
+        self._started_tracing = False
+
+    def enable(self, trace_memory=True):
+        self.enabled = True
+        self.trace_memory = trace_memory
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        self.records = []
+
+    def stage(self, name):
+        if not self.enabled:
+            return _disabled_stage
+        return _Stage(self, name)
+
+    def _push(self, frame):
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                # reset_peak below would lose the parent's peak so far, keep it on the parent
+                parent = self._stack[-1]
+                parent.child_peak = max(parent.child_peak, peak - parent.alloc_base)
+            tracemalloc.reset_peak()
+            frame.alloc_base = current
+        frame.rss = PeakRSS().__enter__()
+        self._stack.append(frame)
+        frame.cpu = time.process_time()
+        frame.wall = time.perf_counter()
+
+    def _pop(self, frame):
+        wall = time.perf_counter() - frame.wall
+        cpu = time.process_time() - frame.cpu
+        path = ';'.join(f.name for f in self._stack)
+        self._stack.pop()
+        frame.rss.__exit__(None, None, None)
+
+        alloc_peak = None
+        if self.trace_memory and tracemalloc.is_tracing():
+            _, peak = tracemalloc.get_traced_memory()
+            alloc_peak = max(peak - frame.alloc_base, frame.child_peak)
+            if self._stack:
+                parent = self._stack[-1]
+                parent.child_peak = max(parent.child_peak, alloc_peak + frame.alloc_base - parent.alloc_base)
+            elif self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+        if self._stack:
+            self._stack[-1].child_wall += wall
+
+        self.records.append({
+            'stage': path,
+            'wall_time': wall,
+            'self_time': wall - frame.child_wall,
+            'cpu_time': cpu,
+            'peak_rss': frame.rss.bytes,
+            'alloc_peak': alloc_peak,
+        })
+
+    def summary(self):
+        """Totals per stage path: calls, wall/self/CPU time and the largest memory peaks."""
+        totals = {}
+        for record in self.records:
+            total = totals.setdefault(record['stage'], {'calls': 0, 'wall_time': 0.0, 'self_time': 0.0, 'cpu_time': 0.0,
+                                                        'peak_rss': 0, 'alloc_peak': 0})
+            total['calls'] += 1
+            for key in ('wall_time', 'self_time', 'cpu_time'):
+                total[key] += record[key]
+            for key in ('peak_rss', 'alloc_peak'):
+                total[key] = max(total[key], record[key] or 0)
+        return totals
+
+    def to_json(self, path=None):
+        profile = {'stages': self.records, 'summary': self.summary()}
+        if path is not None:
+            with open(path, 'w') as f:
+                json.dump(profile, f, indent=2)
+        return profile
+
+    def to_folded(self, path=None):
+        """Collapsed-stack profile (`a;b;c <self time in microseconds>`) for flame graph tools."""
+        lines = ['%s %d' % (stage, round(total['self_time'] * 1e6))
+                 for stage, total in self.summary().items()]
+        text = '\n'.join(lines) + '\n'
+        if path is not None:
+            with open(path, 'w') as f:
+                f.write(text)
+        return text
+
+
+profiler = Profiler()
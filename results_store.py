@@ -0,0 +1,113 @@
+"""Append-only SQLite store for evaluation, tuning and ANN results.
+
+Every row records one fitted configuration: which run and stage produced it, the model
+family/dataset, its parameters (JSON), the regression metrics, fit/predict wall time and
+peak memory. Rows are only ever inserted, so results from different runs can be compared
+over time and the best model is a query instead of a hand-typed table:
+
+    store = ResultsStore('results.sqlite')
+    store.record(kind='tuned', name='Ridge Regression (Tuned)', r2_test=0.55, mse_test=4.46)
+    store.best(kind='tuned')
+"""
+
+import datetime
+import json
+import sqlite3
+import uuid
+
+import numpy as np
+import pandas as pd
+
+# kind: 'evaluation' (model selection), 'tuning_trial' (one search candidate), 'tuned' (refit winner)
+columns = {
+    'run_id': 'TEXT',
+    'created': 'TEXT',
+    'kind': 'TEXT',
+    'name': 'TEXT',
+    'family': 'TEXT',
+    'dataset': 'TEXT',
+    'params': 'TEXT',
+    'mse_train': 'REAL',
+    'mae_train': 'REAL',
+    'r2_train': 'REAL',
+    'mse_test': 'REAL',
+    'mae_test': 'REAL',
+    'r2_test': 'REAL',
+    'cv_score': 'REAL',
+    'cv_metric': 'TEXT',
+    'fit_time': 'REAL',
+    'predict_time': 'REAL',
+    'peak_memory': 'INTEGER',
+}
+
+
+def new_run_id():
+    return uuid.uuid4().hex[:12]
+
+
+def _plain(value):
+    # sqlite3 does not know numpy scalars
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
+
+class ResultsStore:
+    def __init__(self, path='results.sqlite', run_id=None):
+        self.path = path
+        self.run_id = run_id or new_run_id()
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('CREATE TABLE IF NOT EXISTS results (id INTEGER PRIMARY KEY AUTOINCREMENT, %s)'
+                          % ', '.join('%s %s' % item for item in columns.items()))
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def record_many(self, records):
+        """Insert dicts keyed by `columns`; `params` may be a dict, missing fields are NULL."""
+        created = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        rows = []
+        for record in records:
+            record = dict(record)
+            record.setdefault('run_id', self.run_id)
+            record.setdefault('created', created)
+            if not isinstance(record.get('params'), (str, type(None))):
+                record['params'] = json.dumps(record['params'], sort_keys=True, default=str)
+            rows.append([_plain(record.get(column)) for column in columns])
+        with self.conn:
+            self.conn.executemany('INSERT INTO results (%s) VALUES (%s)' % (', '.join(columns), ', '.join('?' * len(columns))), rows)
+
+    def record(self, **record):
+        self.record_many([record])
+
+    def record_frame(self, frame, **fields):
+        """Insert every row of a results DataFrame (e.g. from `model_zoo.run_zoo`)."""
+        records = frame.to_dict('records')
+        for record in records:
+            record.update(fields)
+        self.record_many(records)
+
+    def query(self, kind=None, run_id=None, dataset=None):
+        sql, args = 'SELECT * FROM results WHERE 1=1', []
+        for column, value in (('kind', kind), ('run_id', run_id), ('dataset', dataset)):
+            if value is not None:
+                sql += ' AND %s = ?' % column
+                args.append(value)
+        return pd.read_sql_query(sql + ' ORDER BY id', self.conn, params=args)
+
+    def best(self, kind='tuned', metric='r2_test', run_id=None, higher_is_better=True):
+        """The row with the best `metric`, latest run only unless `run_id` is given; None if empty."""
+        if metric not in columns:
+            raise ValueError('unknown metric %r' % metric)
+        if run_id is None:
+            row = self.conn.execute('SELECT run_id FROM results WHERE kind = ? ORDER BY id DESC LIMIT 1', (kind,)).fetchone()
+            if row is None:
+                return None
+            run_id = row[0]
+        order = 'DESC' if higher_is_better else 'ASC'
+        frame = pd.read_sql_query('SELECT * FROM results WHERE kind = ? AND run_id = ? AND %s IS NOT NULL ORDER BY %s %s LIMIT 1'
+                                  % (metric, metric, order), self.conn, params=[kind, run_id])
+        return None if frame.empty else frame.iloc[0].to_dict()
@@ -0,0 +1,277 @@
+"""Local HTTP prediction server with micro-batching.
+
+Serves a saved `AgePredictor` artifact (whichever model `--save-model` wrote: tree
+ensemble, ANN, pickled sklearn model):
+
+    python serve.py age_model --port 8000 --max-batch 256 --max-wait-ms 2 --workers 2
+
+    POST /predict   {"Sex": "M", "Length": 0.455, ..., "Shell weight": 0.15}  ->  {"age": 9.9}
+                    a list of records                                        ->  {"ages": [...]}
+    GET  /metrics   request/batch counters, p50/p99 latency and throughput
+    GET  /health
+
+Single-record requests are not predicted one by one: they wait in a queue until
+`max_batch` rows are collected or the oldest has waited `max_wait_ms`, and the batch runs
+on a pool of `workers` threads (or processes with `--processes`, each loading the artifact
+itself) while the event loop keeps accepting requests. `--max-batch 1` predicts every
+request on its own, for comparison; `benchmarks/serve_load.py` measures both.
+
+Only the standard library, numpy and the prediction path are imported.
+"""
+
+import argparse
+import asyncio
+import collections
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+from predictor import AgePredictor, measurement_columns
+
+_worker_predictor = None
+
+
+def _load_worker(path):
+    global _worker_predictor
+    _worker_predictor = AgePredictor.load(path)
+
+
+def _predict_in_worker(sex, measurements):
+    return _worker_predictor.predict_arrays(sex, measurements)
+
+
+class ServerStats:
+    """Request latencies (arrival to response) and counters; percentiles over the last `window` requests."""
+
+    def __init__(self, window=100_000):
+        self.started = time.perf_counter()
+        self.latencies = collections.deque(maxlen=window)
+        self.finished = collections.deque(maxlen=window)
+        self.requests = 0
+        self.rows = 0
+        self.errors = 0
+        self.batches = 0
+
+    def record(self, arrived, n_rows=1):
+        now = time.perf_counter()
+        self.latencies.append(now - arrived)
+        self.finished.append(now)
+        self.requests += 1
+        self.rows += n_rows
+
+    def snapshot(self, recent=10.0):
+        now = time.perf_counter()
+        latencies = np.asarray(self.latencies)
+        recent_count = len(self.finished) - int(np.searchsorted(np.asarray(self.finished), now - recent))
+        uptime = now - self.started
+        return {
+            'requests': self.requests,
+            'rows': self.rows,
+            'errors': self.errors,
+            'batches': self.batches,
+            'mean_batch_rows': self.rows / self.batches if self.batches else 0.0,
+            'p50_ms': float(np.percentile(latencies, 50)) * 1e3 if len(latencies) else None,
+            'p99_ms': float(np.percentile(latencies, 99)) * 1e3 if len(latencies) else None,
+            'throughput_rps': self.requests / uptime if uptime > 0 else 0.0,
+            'recent_rps': recent_count / min(recent, uptime) if uptime > 0 else 0.0,
+            'uptime_s': uptime,
+        }
+
+
+def parse_records(payload, sex_categories=None):
+    """(sex, measurements, single) from a JSON record or list of records; ValueError if malformed,
+    a measurement is not a finite number (booleans and strings included) or, with
+    `sex_categories`, a Sex value is not one of them."""
+    single = isinstance(payload, dict)
+    records = [payload] if single else payload
+    if not isinstance(records, list) or not records or not all(isinstance(r, dict) for r in records):
+        raise ValueError('expected a record or a non-empty list of records')
+    try:
+        sex = np.array([r['Sex'] for r in records], dtype=object)
+        rows = [[r[c] for c in measurement_columns] for r in records]
+    except KeyError as e:
+        raise ValueError('missing field %s' % e)
+    if sex_categories is not None:
+        known = set(sex_categories)
+        for i, value in enumerate(sex):
+            if not isinstance(value, str) or value not in known:
+                raise ValueError('Sex of record %d must be one of %s, got %r' % (i, ', '.join(sex_categories), value))
+    for i, row in enumerate(rows):
+        for column, value in zip(measurement_columns, row):
+            # bool is an int subclass, but true/false is not a measurement
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError('%s of record %d is not a number' % (column, i))
+    measurements = np.array(rows, dtype=float)
+    finite = np.isfinite(measurements)
+    if not finite.all():
+        row, column = np.argwhere(~finite)[0]
+        raise ValueError('%s of record %d is not a finite number' % (measurement_columns[column], row))
+    return sex, measurements, single
+
+
+class PredictionServer:
+    def __init__(self, path, max_batch=256, max_wait_ms=2.0, workers=None, processes=False):
+        self.path = path
+        self.predictor = AgePredictor.load(path)
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        if processes:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_load_worker, initargs=(path,))
+            self.predict = _predict_in_worker
+        else:
+            self.pool = ThreadPoolExecutor(max_workers=self.workers)
+            self.predict = self.predictor.predict_arrays
+        self.stats = ServerStats()
+        self.queue = None
+        # The event loop only keeps weak references to tasks
+        self.batch_tasks = set()
+
+    async def start(self, host='127.0.0.1', port=8000):
+        self.queue = asyncio.Queue()
+        self.slots = asyncio.Semaphore(self.workers)
+        # First call loads/compiles whatever the model does lazily
+        sample = np.zeros((1, len(measurement_columns)))
+        await asyncio.get_running_loop().run_in_executor(self.pool, self.predict, np.array(['M'], dtype=object), sample)
+        self.batcher = asyncio.create_task(self._batch_loop())
+        self.server = await asyncio.start_server(self._handle, host, port)
+        return self.server
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = batch[0][3] + self.max_wait
+            rows = len(batch[0][1])
+            while rows < self.max_batch:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    # Past the deadline, still take what is already queued
+                    if self.queue.empty():
+                        break
+                    item = self.queue.get_nowait()
+                else:
+                    try:
+                        item = await asyncio.wait_for(self.queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                batch.append(item)
+                rows += len(item[1])
+            # Run at most `workers` batches at once, keep collecting the next one meanwhile
+            await self.slots.acquire()
+            task = loop.create_task(self._run_batch(batch))
+            self.batch_tasks.add(task)
+            task.add_done_callback(self.batch_tasks.discard)
+
+    async def _run_batch(self, batch):
+        try:
+            sex = np.concatenate([item[0] for item in batch])
+            measurements = np.concatenate([item[1] for item in batch])
+            self.stats.batches += 1
+            try:
+                ages = await asyncio.get_running_loop().run_in_executor(self.pool, self.predict, sex, measurements)
+            except Exception as e:
+                for item in batch:
+                    if not item[2].done():
+                        item[2].set_exception(e)
+                return
+            start = 0
+            for item in batch:
+                n = len(item[1])
+                if not item[2].done():
+                    item[2].set_result(ages[start:start + n])
+                start += n
+        finally:
+            self.slots.release()
+
+    async def predict_records(self, payload, arrived):
+        sex, measurements, single = parse_records(payload, self.predictor.sex_categories)
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((sex, measurements, future, arrived))
+        ages = await future
+        self.stats.record(arrived, len(ages))
+        return {'age': float(ages[0])} if single else {'ages': ages.tolist()}
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                arrived = time.perf_counter()
+                method, target, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+                status, response = await self._route(method, target, body, arrived)
+                data = json.dumps(response).encode()
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                writer.write(b'HTTP/1.1 %d %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\n%s\r\n' % (
+                    status, {200: b'OK', 400: b'Bad Request', 404: b'Not Found', 500: b'Internal Server Error'}[status],
+                    len(data), b'' if keep_alive else b'Connection: close\r\n') + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method, target, body, arrived):
+        if method == 'POST' and target == '/predict':
+            try:
+                return 200, await self.predict_records(json.loads(body), arrived)
+            except ValueError as e:   # also json.JSONDecodeError
+                self.stats.errors += 1
+                return 400, {'error': str(e)}
+            except Exception as e:
+                self.stats.errors += 1
+                return 500, {'error': '%s: %s' % (type(e).__name__, e)}
+        if method == 'GET' and target == '/metrics':
+            return 200, dict(self.stats.snapshot(), max_batch=self.max_batch, max_wait_ms=self.max_wait * 1e3,
+                             workers=self.workers, queued=self.queue.qsize())
+        if method == 'GET' and target == '/health':
+            return 200, {'status': 'ok', 'model': type(self.predictor.model).__name__}
+        return 404, {'error': 'no route %s %s' % (method, target)}
+
+
+async def serve(path, host='127.0.0.1', port=8000, **options):
+    server = PredictionServer(path, **options)
+    await server.start(host, port)
+    print('Serving %s (%s) on http://%s:%d, max_batch=%d max_wait=%.1fms workers=%d' % (
+        path, type(server.predictor.model).__name__, host, port, server.max_batch, server.max_wait * 1e3, server.workers),
+        flush=True)
+    async with server.server:
+        await server.server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Micro-batching prediction server for a saved AgePredictor')
+    parser.add_argument('model', help='artifact directory written by --save-model')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--max-batch', type=int, default=256, help='rows per micro-batch (1 disables batching)')
+    parser.add_argument('--max-wait-ms', type=float, default=2.0, help='longest a request waits for its batch to fill')
+    parser.add_argument('--workers', type=int, default=None, help='batches predicted concurrently (default: min(4, cores))')
+    parser.add_argument('--processes', action='store_true', help='predict in worker processes instead of threads')
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.model, args.host, args.port, max_batch=args.max_batch, max_wait_ms=args.max_wait_ms,
+                          workers=args.workers, processes=args.processes))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,274 @@
+"""Single-pass summary statistics over chunks, mergeable across processes.
+
+`describe_data` and the outlier fences each make their own pass over the frame
+(`describe()`, `isnull().sum()`, the Height == 0 probe, the 9.5-12.5 age proportion,
+`corr()`, quantiles). `StreamingStats` gathers all of them in one scan of chunks that need
+not fit in memory together:
+
+    stats = StreamingStats()
+    for chunk in iter_abalone_chunks('abalone.csv'):
+        stats.update(chunk)
+    stats.describe(); stats.corr(); stats.nulls; stats.zeros['Height']
+    stats.in_range('age', 9.5, 12.5)
+    lower, upper = stats.iqr_bounds(col_except_rings)
+
+or `scan('abalone.csv', n_jobs=4)`, which splits the file between worker processes and
+combines their results with `merge`. Means and variances are Welford/Chan updates,
+correlations come from a merged co-moment matrix, and quantiles from a `QuantileSketch`
+per column.
+"""
+
+import copy
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# 'age' ranges counted by default, the majority age range of describe_data
+default_ranges = (('age', 9.5, 12.5),)
+
+
+class QuantileSketch:
+    """Mergeable quantile summary (a compactor hierarchy, as in KLL/MRL sketches).
+
+    Level i holds values that each stand for 2**i input values. A level above `k` values is
+    sorted and every other value (from a random offset) moves up a level. While fewer than
+    `k` values have been seen nothing is compacted and quantiles are exact (numpy's linear
+    interpolation); after that the rank error is about log2(n / k) / k.
+    """
+
+    def __init__(self, k=8192, seed=0):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.rng = np.random.default_rng(seed)
+
+    @property
+    def count(self):
+        return sum(len(level) << i for i, level in enumerate(self.levels))
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float).ravel()
+        self.levels[0] = np.concatenate([self.levels[0], values[~np.isnan(values)]])
+        self._compact()
+        return self
+
+    def merge(self, other):
+        for i, level in enumerate(other.levels):
+            if i == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[i] = np.concatenate([self.levels[i], level])
+        self._compact()
+        return self
+
+    def _compact(self):
+        i = 0
+        while i < len(self.levels):
+            level = self.levels[i]
+            if len(level) > self.k:
+                level = np.sort(level)
+                # An odd value out stays at this level
+                keep, level = level[:len(level) % 2], level[len(level) % 2:]
+                if i + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[i + 1] = np.concatenate([self.levels[i + 1], level[self.rng.integers(2)::2]])
+                self.levels[i] = keep
+            i += 1
+
+    def quantile(self, q):
+        """Quantile(s) `q` in [0, 1]; nan when empty."""
+        values = np.concatenate(self.levels)
+        if not len(values):
+            return np.full(np.shape(q), np.nan)
+        weights = np.concatenate([np.full(len(level), 2.0 ** i) for i, level in enumerate(self.levels)])
+        order = np.argsort(values, kind='stable')
+        values, weights = values[order], weights[order]
+        # Rank of the middle of each value's weight, so unit weights give numpy's interpolation
+        ranks = np.cumsum(weights) - weights + (weights - 1) / 2
+        return np.interp(np.asarray(q) * (weights.sum() - 1), ranks, values)
+
+
+class StreamingStats:
+    """Counts, moments, extremes, nulls, zeros, correlations and quantiles of a chunked frame.
+
+    Numeric columns are taken from the first chunk. Per-column moments ignore nulls, like
+    `describe()`; correlations use the rows with no null numeric value.
+    """
+
+    def __init__(self, k=8192, ranges=default_ranges, seed=0):
+        self.k = k
+        self.ranges = [tuple(r) for r in ranges]
+        self.seed = seed
+        self.rows = 0
+        self.columns = None
+
+    def _start(self, chunk):
+        self.columns = list(chunk.select_dtypes(include='number').columns)
+        p = len(self.columns)
+        self.nulls = pd.Series(0, index=chunk.columns, dtype=np.int64)
+        self.zeros = pd.Series(0, index=self.columns, dtype=np.int64)
+        self.count = np.zeros(p, dtype=np.int64)
+        self.mean = np.zeros(p)
+        self.m2 = np.zeros(p)
+        self.min = np.full(p, np.inf)
+        self.max = np.full(p, -np.inf)
+        self.complete = 0
+        self.complete_mean = np.zeros(p)
+        self.comoment = np.zeros((p, p))
+        self.in_range_counts = np.zeros(len(self.ranges), dtype=np.int64)
+        self.sketches = [QuantileSketch(self.k, self.seed + j) for j in range(p)]
+
+    def update(self, chunk):
+        """Add a DataFrame chunk; returns self."""
+        if self.columns is None:
+            self._start(chunk)
+        self.rows += len(chunk)
+        self.nulls = self.nulls.add(chunk.isnull().sum(), fill_value=0).astype(np.int64)
+        X = chunk[self.columns].to_numpy(dtype=float)
+        missing = np.isnan(X)
+        self.zeros += (X == 0).sum(axis=0)
+
+        # Per-column moments of the non-null values (Chan et al. merge of the chunk's)
+        n = (~missing).sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            chunk_mean = np.where(n > 0, np.nansum(X, axis=0) / n, 0.0)
+        chunk_m2 = np.nansum((X - chunk_mean) ** 2, axis=0)
+        self.count, self.mean, self.m2 = _merge_moments(self.count, self.mean, self.m2, n, chunk_mean, chunk_m2)
+        if len(X):
+            self.min = np.fmin(self.min, np.nanmin(np.where(missing, np.inf, X), axis=0))
+            self.max = np.fmax(self.max, np.nanmax(np.where(missing, -np.inf, X), axis=0))
+
+        # Co-moments of the complete rows
+        rows = X[~missing.any(axis=1)]
+        if len(rows):
+            rows_mean = rows.mean(axis=0)
+            centered = rows - rows_mean
+            self._merge_comoment(len(rows), rows_mean, centered.T @ centered)
+
+        for j, (column, low, high) in enumerate(self.ranges):
+            values = chunk[column].to_numpy(dtype=float)
+            self.in_range_counts[j] += int(((values >= low) & (values <= high)).sum())
+        for j, sketch in enumerate(self.sketches):
+            sketch.update(X[:, j])
+        return self
+
+    def _merge_comoment(self, n, mean, comoment):
+        total = self.complete + n
+        delta = mean - self.complete_mean
+        self.comoment = self.comoment + comoment + np.outer(delta, delta) * self.complete * n / total
+        self.complete_mean = self.complete_mean + delta * n / total
+        self.complete = total
+
+    def merge(self, other):
+        """Add the statistics of `other` (e.g. another worker's part of a file); returns self."""
+        if other.columns is None:
+            return self
+        if self.columns is None:
+            self.__dict__.update(copy.deepcopy(other.__dict__))
+            return self
+        if other.columns != self.columns or other.ranges != self.ranges:
+            raise ValueError('cannot merge statistics of different columns or ranges')
+        self.rows += other.rows
+        self.nulls = self.nulls.add(other.nulls, fill_value=0).astype(np.int64)
+        self.zeros = self.zeros + other.zeros
+        self.count, self.mean, self.m2 = _merge_moments(self.count, self.mean, self.m2, other.count, other.mean, other.m2)
+        self.min = np.fmin(self.min, other.min)
+        self.max = np.fmax(self.max, other.max)
+        if other.complete:
+            self._merge_comoment(other.complete, other.complete_mean, other.comoment)
+        self.in_range_counts = self.in_range_counts + other.in_range_counts
+        for sketch, other_sketch in zip(self.sketches, other.sketches):
+            sketch.merge(other_sketch)
+        return self
+
+    # Results
+
+    def std(self, ddof=1):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return pd.Series(np.sqrt(self.m2 / (self.count - ddof)), index=self.columns)
+
+    def quantile(self, q):
+        """DataFrame of quantiles (rows) per numeric column."""
+        q = np.atleast_1d(q)
+        return pd.DataFrame({column: sketch.quantile(q) for column, sketch in zip(self.columns, self.sketches)}, index=q)
+
+    def describe(self):
+        """Same layout as `DataFrame.describe()` of the numeric columns."""
+        described = pd.DataFrame({'count': self.count.astype(float), 'mean': self.mean, 'std': self.std().to_numpy(),
+                                  'min': self.min}, index=self.columns)
+        quartiles = self.quantile([0.25, 0.5, 0.75])
+        for q, label in zip(quartiles.index, ['25%', '50%', '75%']):
+            described[label] = quartiles.loc[q]
+        described['max'] = self.max
+        return described.T
+
+    def corr(self):
+        """Pearson correlation matrix of the numeric columns."""
+        scale = np.sqrt(np.diag(self.comoment))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = self.comoment / np.outer(scale, scale)
+        return pd.DataFrame(corr, index=self.columns, columns=self.columns)
+
+    def in_range(self, column, low, high):
+        """Share of the rows with `low <= column <= high`, for one of `ranges`."""
+        return self.in_range_counts[self.ranges.index((column, low, high))] / self.count[self.columns.index(column)]
+
+    def iqr_bounds(self, columns, k=1.5):
+        """(lower, upper) IQR fences of `columns`, as `abalone_age_model.iqr_bounds`."""
+        quartiles = self.quantile([0.25, 0.75])[list(columns)].to_numpy()
+        iqr = quartiles[1] - quartiles[0]
+        return quartiles[0] - k * iqr, quartiles[1] + k * iqr
+
+
+def _merge_moments(n_a, mean_a, m2_a, n_b, mean_b, m2_b):
+    total = n_a + n_b
+    with np.errstate(invalid='ignore', divide='ignore'):
+        weight = np.where(total > 0, n_b / np.maximum(total, 1), 0.0)
+    delta = mean_b - mean_a
+    return total, mean_a + delta * weight, m2_a + m2_b + delta ** 2 * n_a * weight
+
+
+def _scan_part(path, part, k, ranges, seed):
+    from ingest import iter_abalone_range, iter_chunks
+
+    stats = StreamingStats(k, ranges, seed)
+    if path.endswith(('.parquet', '.pq')):
+        import pyarrow.parquet as pq
+        chunks = (batch.to_pandas() for batch in pq.ParquetFile(path).iter_batches(row_groups=part))
+    elif part is None:
+        chunks = iter_chunks(path)
+    else:
+        chunks = iter_abalone_range(path, *part)
+    for chunk in chunks:
+        stats.update(chunk)
+    return stats
+
+
+def scan(path, n_jobs=None, k=8192, ranges=default_ranges, seed=0):
+    """`StreamingStats` of an abalone CSV (or Parquet cache), scanned by `n_jobs` processes in parallel.
+
+    A CSV is split into byte ranges and a Parquet file into row groups; any other file is
+    scanned in this process.
+    """
+    from ingest import csv_byte_ranges
+
+    n_jobs = max(1, n_jobs or os.cpu_count())
+    if path.endswith(('.parquet', '.pq')):
+        import pyarrow.parquet as pq
+        groups = list(range(pq.ParquetFile(path).num_row_groups))
+        parts = [groups[i::n_jobs] for i in range(min(n_jobs, len(groups)))]
+    elif path.endswith(('.feather', '.arrow')):
+        parts = [None]
+    else:
+        parts = csv_byte_ranges(path, n_jobs)
+
+    if len(parts) <= 1:
+        results = [_scan_part(path, part, k, ranges, seed) for part in parts or [None]]
+    else:
+        with ProcessPoolExecutor(max_workers=len(parts)) as pool:
+            results = list(pool.map(_scan_part, [path] * len(parts), parts, [k] * len(parts), [ranges] * len(parts),
+                                    [seed + 1000 * i for i in range(len(parts))]))
+    stats = StreamingStats(k, ranges, seed)
+    for result in results:
+        stats.merge(result)
+    return stats
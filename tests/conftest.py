@@ -0,0 +1,47 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from predictor import measurement_columns  # noqa: E402
+
+
+def make_abalone(n_rows, seed=0):
+    """Abalone-like frame with roughly the real correlations and a few gross outliers."""
+    rng = np.random.default_rng(seed)
+    length = rng.uniform(0.075, 0.815, n_rows)
+    whole = length ** 3 * 2.5 + rng.normal(0, 0.05, n_rows)
+    frame = pd.DataFrame({
+        'Sex': rng.choice(['M', 'F', 'I'], n_rows),
+        'Length': length.round(3),
+        'Diameter': (length * 0.8 + rng.normal(0, 0.02, n_rows)).round(3),
+        'Height': (length * 0.27 + rng.normal(0, 0.02, n_rows)).round(3),
+        'Whole weight': whole.round(4),
+        'Shucked weight': (whole * 0.43 + rng.normal(0, 0.02, n_rows)).round(4),
+        'Viscera weight': (whole * 0.22 + rng.normal(0, 0.01, n_rows)).round(4),
+        'Shell weight': (whole * 0.29 + rng.normal(0, 0.02, n_rows)).round(4),
+        'Rings': np.clip((length * 15 + rng.normal(0, 2.5, n_rows)).round(), 1, 29).astype(int),
+    })
+    rows = rng.choice(n_rows, n_rows // 50, replace=False)
+    columns = rng.choice(len(measurement_columns), len(rows))
+    for row, column in zip(rows, columns):
+        frame.loc[row, measurement_columns[column]] *= 4
+    return frame
+
+
+@pytest.fixture(scope='session')
+def abalone():
+    return make_abalone(1500)
+
+
+@pytest.fixture(scope='session')
+def scaled(abalone):
+    """(X_train, y_train, X_test) of the scaled split, as the ANN stages get it."""
+    import abalone_age_model as aam
+    df = abalone.assign(age=abalone['Rings'] + 1.5).drop(columns='Rings')
+    split = aam.build_scaled_split(df)
+    return split['X_train'][:600], split['y_train'].to_numpy()[:600], split['X_test'][:200]
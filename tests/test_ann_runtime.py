@@ -0,0 +1,27 @@
+"""Smoke tests for the Keras export to the NumPy ANN runtime; skipped when TensorFlow is not installed."""
+
+import pytest
+
+tf = pytest.importorskip('tensorflow')
+
+import abalone_age_model as aam  # noqa: E402
+from ann_runtime import DenseNetwork, verify_against_keras  # noqa: E402
+from ann_tuning import FixedHyperParameters  # noqa: E402
+
+
+@pytest.mark.parametrize('config', [
+    None,
+    {'units': 64, 'activation': 'tanh', 'dropout_rate': 0.3, 'units2': 32, 'optimizer': 'rmsprop'},
+])
+def test_dense_network_matches_keras(scaled, config):
+    X_train, y_train, X_test = scaled
+    if config is None:
+        model = aam.build_ann(X_train.shape[1])
+    else:
+        model = aam.build_tuned_ann(FixedHyperParameters(config), X_train.shape[1])
+    model.fit(X_train, y_train, epochs=2, verbose=0)
+
+    network = DenseNetwork.from_keras(model)
+    assert verify_against_keras(network, model, X_test) < 1e-4
+    assert network.predict(X_test).shape == (len(X_test), 1)
+
@@ -0,0 +1,37 @@
+"""Smoke tests for the streaming tf.data training; skipped when TensorFlow is not installed."""
+
+import numpy as np
+import pytest
+
+tf = pytest.importorskip('tensorflow')
+
+import abalone_age_model as aam  # noqa: E402
+from ann_streaming import fit_preprocessing, train_streaming  # noqa: E402
+
+
+@pytest.fixture(scope='module')
+def csv_path(abalone, tmp_path_factory):
+    path = tmp_path_factory.mktemp('ann') / 'abalone.csv'
+    abalone.to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.mark.parametrize('jit_compile', [False, True])
+def test_train_streaming(csv_path, jit_compile):
+    predictor, history = train_streaming(csv_path, epochs=3, batch_size=64, max_batch_size=256, patience=None,
+                                         chunksize=500, jit_compile=jit_compile)
+    assert [row['epoch'] for row in history] == [1, 2, 3]
+    assert all(np.isfinite(row['loss']) and np.isfinite(row['val_mse']) for row in history)
+    assert history[0]['samples'] == history[-1]['samples'] > 0
+
+    ages = predictor.predict(aam.load_data(csv_path).head(10))
+    assert ages.shape == (10,) and np.isfinite(ages).all()
+
+
+def test_fit_preprocessing_matches_standard_scaler(csv_path):
+    df = aam.load_data(csv_path)
+    split = aam.build_scaled_split(df)
+    transform = fit_preprocessing(csv_path, chunksize=300)
+    # The streaming path parses the measurements as float32
+    np.testing.assert_allclose(transform.scalers[0][0], split['scaler'].mean_, rtol=1e-6)
+    np.testing.assert_allclose(transform.scalers[0][1], split['scaler'].scale_, rtol=1e-6)
@@ -0,0 +1,22 @@
+"""Smoke tests for the parallel ANN search; skipped when TensorFlow is not installed."""
+
+import pytest
+
+tf = pytest.importorskip('tensorflow')
+
+import abalone_age_model as aam  # noqa: E402
+import ann_tuning  # noqa: E402
+
+
+@pytest.mark.parametrize('n_jobs', [1, 2])
+def test_ann_search_runs_and_resumes(scaled, tmp_path, n_jobs):
+    X_train, y_train, _ = scaled
+    directory = str(tmp_path / 'ann_tuning')
+    records = ann_tuning.search(X_train, y_train, directory=directory, max_trials=2, epochs=2, n_jobs=n_jobs)
+    assert len(records) == 2 and records[0]['score'] <= records[1]['score']
+
+    model = aam.build_tuned_ann(ann_tuning.FixedHyperParameters(records[0]['config']), X_train.shape[1])
+    model.set_weights(ann_tuning.load_weights(directory, records[0]['key']))
+
+    # Nothing left to train on a rerun
+    assert ann_tuning.search(X_train, y_train, directory=directory, max_trials=2, epochs=2, n_jobs=n_jobs) == records
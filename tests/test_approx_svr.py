@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+from sklearn.base import clone
+from sklearn.metrics import r2_score
+from sklearn.model_selection import ParameterGrid
+from sklearn.svm import SVR
+
+import abalone_age_model as aam
+from approx_svr import ApproxSVR
+
+
+@pytest.mark.parametrize('gamma', ['scale', 'auto', 0.05])
+def test_gamma_follows_svr(scaled, gamma):
+    X_train, y_train, _ = scaled
+    svr = SVR(gamma=gamma).fit(X_train, y_train)
+    assert ApproxSVR(gamma=gamma)._gamma(X_train) == pytest.approx(svr._gamma)
+
+
+@pytest.mark.parametrize('kernel, method', [('rbf', 'nystroem'), ('rbf', 'rff'), ('poly', 'nystroem'), ('linear', 'nystroem')])
+def test_approx_svr_follows_the_exact_svr(scaled, kernel, method):
+    X_train, y_train, X_test = scaled
+    exact = SVR(kernel=kernel, C=10).fit(X_train, y_train).predict(X_test)
+    approx = ApproxSVR(kernel=kernel, C=10, method=method, n_components=len(X_train) if method == 'nystroem' else 2000,
+                       max_iter=50_000).fit(X_train, y_train).predict(X_test)
+    # Scored against the exact SVR's own predictions: how closely the approximation follows it
+    assert r2_score(exact, approx) > 0.99
+
+
+def test_rejects_unsupported_settings(scaled):
+    X_train, y_train, _ = scaled
+    with pytest.raises(ValueError, match='rbf'):
+        ApproxSVR(kernel='poly', method='rff').fit(X_train, y_train)
+    with pytest.raises(ValueError, match='nystroem'):
+        ApproxSVR(method='exact').fit(X_train, y_train)
+
+
+@pytest.mark.filterwarnings('ignore::sklearn.exceptions.ConvergenceWarning')
+def test_takes_every_svr_grid_point(scaled):
+    X_train, y_train, X_test = scaled
+    for params in ParameterGrid(aam.svr_params):
+        model = clone(ApproxSVR(n_components=50)).set_params(**params).fit(X_train[:200], y_train[:200])
+        assert model.predict(X_test).shape == (len(X_test),)
@@ -0,0 +1,9 @@
+import os
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_benchmark_scripts_do_not_shadow_repo_modules():
+    modules = {name for name in os.listdir(REPO_ROOT) if name.endswith('.py')}
+    scripts = set(os.listdir(os.path.join(REPO_ROOT, 'benchmarks')))
+    assert not modules & scripts
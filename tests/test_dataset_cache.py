@@ -0,0 +1,77 @@
+import os
+
+import numpy as np
+import pytest
+
+import abalone_age_model as aam
+from dataset_cache import DatasetCache, _dir_size, array_keys
+
+
+@pytest.fixture(scope='module')
+def csv_path(abalone, tmp_path_factory):
+    path = tmp_path_factory.mktemp('dataset_cache') / 'abalone.csv'
+    abalone.to_csv(path, index=False)
+    return str(path)
+
+
+def entries(cache, kind=''):
+    return sorted(name for name in os.listdir(cache.directory) if name.startswith(kind) and not name.startswith('.'))
+
+
+def test_cached_datasets_match_build_datasets(csv_path, tmp_path):
+    df = aam.load_data(csv_path)
+    expected = aam.build_datasets(df, aam.remove_outliers(df))
+    datasets = DatasetCache(str(tmp_path)).build_datasets(csv_path)
+    assert datasets.keys() == expected.keys()
+    for name, split in datasets.items():
+        for key in array_keys:
+            assert isinstance(split[key], np.memmap)
+            np.testing.assert_array_equal(split[key], np.asarray(expected[name][key]))
+        assert split['columns'] == expected[name]['columns']
+        np.testing.assert_array_equal(split['scaler'].mean_, expected[name]['scaler'].mean_)
+
+
+def test_only_the_changed_stages_are_rebuilt(csv_path, tmp_path, monkeypatch):
+    cache = DatasetCache(str(tmp_path))
+    cache.build_datasets(csv_path)
+    splits = entries(cache, 'split-')
+    assert len(splits) == 3 and len(entries(cache, 'frame-')) == 2
+
+    calls = []
+    for name in ('load_data', 'remove_outliers', 'build_scaled_split', 'build_pca_split'):
+        original = getattr(aam, name)
+        monkeypatch.setattr(aam, name, lambda *args, _name=name, _original=original, **kwargs:
+                            calls.append(_name) or _original(*args, **kwargs))
+
+    cache.build_datasets(csv_path)
+    assert calls == []
+
+    # A new PCA setting reads the cleaned frame back and only builds the PCA split
+    datasets = cache.build_datasets(csv_path, n_components=3)
+    assert calls == ['build_pca_split']
+    assert datasets['pca']['X_train'].shape[1] == 3 + len(aam.sex_categories)
+    assert set(splits) < set(entries(cache, 'split-'))
+
+
+def test_evict_keeps_the_cache_under_max_bytes(csv_path, tmp_path):
+    cache = DatasetCache(str(tmp_path))
+    cache.build_datasets(csv_path)
+    size = sum(_dir_size(os.path.join(cache.directory, name)) for name in entries(cache))
+    cache.max_bytes = size // 2
+    cache.evict()
+    assert sum(_dir_size(os.path.join(cache.directory, name)) for name in entries(cache)) <= size // 2
+
+
+@pytest.mark.parametrize('flags, ignored', [
+    (['--stream-stats', '--report', 'eda'], '--stream-stats, --report ignored'),
+    (['--cache', 'abalone.parquet'], '--cache ignored'),
+])
+def test_main_warns_about_flags_the_dataset_cache_skips(tmp_path, monkeypatch, flags, ignored):
+    class Stop(Exception):
+        pass
+
+    def build_datasets(*args, **kwargs):
+        raise Stop()
+    monkeypatch.setattr(DatasetCache, 'build_datasets', build_datasets)
+    with pytest.warns(UserWarning, match=ignored), pytest.raises(Stop):
+        aam.main(['--dataset-cache', str(tmp_path), '--results', str(tmp_path / 'results.sqlite')] + flags)
@@ -0,0 +1,76 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.stats import gaussian_kde
+
+import abalone_age_model as aam
+from eda_report import binned_kde, box_stats, eda_report, stratified_sample
+
+
+@pytest.fixture(scope='module')
+def frame(abalone):
+    return abalone.assign(age=abalone['Rings'] + 1.5).drop(columns='Rings')
+
+
+def test_stratified_sample_keeps_the_sex_shares(frame):
+    sample = stratified_sample(frame, 300)
+    assert abs(len(sample) - 300) <= 3
+    shares = frame['Sex'].value_counts(normalize=True)
+    np.testing.assert_allclose(sample['Sex'].value_counts(normalize=True)[shares.index], shares, atol=0.01)
+    assert stratified_sample(frame, len(frame)) is frame
+
+
+def test_box_stats_match_matplotlib(frame):
+    cbook = pytest.importorskip('matplotlib.cbook')
+    values = frame['Length'].to_numpy(dtype=float)
+    expected = cbook.boxplot_stats(values)[0]
+    stats = box_stats(values, values)
+    for key in ('q1', 'med', 'q3', 'whislo', 'whishi'):
+        assert stats[key] == pytest.approx(expected[key])
+    np.testing.assert_array_equal(np.sort(stats['fliers']), np.sort(expected['fliers']))
+
+
+def test_binned_kde_follows_the_exact_kde(frame):
+    values = frame['Whole weight'].to_numpy(dtype=float)
+    grid, density = binned_kde(values, np.linspace(values.min(), values.max(), 513))
+    exact = gaussian_kde(values, bw_method=values.std() * len(values) ** -0.2 / values.std(ddof=1))(grid)
+    np.testing.assert_allclose(density, exact, atol=0.02 * exact.max())
+
+
+def test_report_renders_once_and_reuses_unchanged_figures(frame, tmp_path, capsys):
+    pytest.importorskip('matplotlib')
+    pytest.importorskip('seaborn')
+    directory = str(tmp_path)
+    cleaned = aam.remove_outliers(frame)
+    paths = eda_report(frame, cleaned, directory, sample_rows=500, n_jobs=1)
+    assert len(paths) == 7 and all(os.path.getsize(path) > 0 for path in paths.values())
+    with open(os.path.join(directory, 'index.html')) as f:
+        index = f.read()
+    assert all(os.path.basename(path) in index for path in paths.values())
+
+    capsys.readouterr()
+    assert eda_report(frame, cleaned, directory, sample_rows=500, n_jobs=1) == paths
+    assert '7 cached' in capsys.readouterr().out
+
+    # Only the after-cleaning figure depends on the cleaned rows; its old file is removed
+    changed = eda_report(frame, cleaned[:-10], directory, sample_rows=500, n_jobs=1)
+    assert [name for name in paths if changed[name] != paths[name]] == ['distributions_after']
+    assert sorted(os.listdir(directory)) == sorted(['index.html'] + [os.path.basename(p) for p in changed.values()])
+
+
+def test_eda_plots_write_to_a_path_without_showing(frame, tmp_path, monkeypatch):
+    matplotlib = pytest.importorskip('matplotlib')
+    pytest.importorskip('seaborn')
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    monkeypatch.setattr(plt, 'show', lambda: pytest.fail('plt.show() called with a path'))
+    principal = pd.DataFrame(np.random.default_rng(0).normal(size=(100, 2)),
+                                 columns=['principal component 1', 'principal component 2'])
+    aam.plot_age_distribution(frame, str(tmp_path / 'age.png'), str(tmp_path / 'age_box.png'))
+    aam.plot_feature_distributions(frame, 'Features', str(tmp_path / 'features.png'))
+    aam.plot_explained_variance(np.array([0.7, 0.9, 1.0]), str(tmp_path / 'variance.png'))
+    aam.plot_pca_scatter(principal, str(tmp_path / 'scatter.png'))
+    assert sorted(os.listdir(str(tmp_path))) == ['age.png', 'age_box.png', 'features.png', 'scatter.png', 'variance.png']
+    assert not plt.get_fignums()
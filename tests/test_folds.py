@@ -0,0 +1,56 @@
+import os
+import pickle
+
+import numpy as np
+import pytest
+from sklearn.model_selection import KFold
+from sklearn.preprocessing import StandardScaler
+
+from folds import FoldCache
+from predictor import measurement_columns
+
+
+@pytest.fixture(scope='module')
+def training_set(abalone):
+    return abalone[measurement_columns].to_numpy(), abalone['Rings'].to_numpy(dtype=float)
+
+
+def test_folds_are_the_kfold_splits(training_set):
+    X, y = training_set
+    with FoldCache(X, y) as folds:
+        for f, (train, test) in enumerate(KFold(n_splits=5).split(X)):
+            X_train, y_train, X_test, y_test = folds.fold(f)
+            assert isinstance(X_train, np.memmap)
+            np.testing.assert_array_equal(X_train, X[train])
+            np.testing.assert_array_equal(y_test, y[test])
+            np.testing.assert_array_equal(folds.splits[f][0], train)
+
+            # A row budget keeps a prefix of one fixed shuffle of the training rows
+            X_rows, y_rows, _, _ = folds.fold(f, rows=100)
+            assert len(X_rows) == 100
+            np.testing.assert_array_equal(X_rows, folds.fold(f, rows=200)[0][:100])
+            assert {tuple(row) for row in X_rows} <= {tuple(row) for row in X[train]}
+
+
+def test_transform_is_fitted_per_fold(training_set):
+    X, y = training_set
+    with FoldCache(X, y, cv=3, transform=StandardScaler()) as folds, FoldCache(X, y, cv=3) as raw:
+        assert folds.fingerprint != raw.fingerprint
+        for f, (train, test) in enumerate(KFold(n_splits=3).split(X)):
+            scaler = StandardScaler().fit(X[train])
+            X_train, _, X_test, _ = folds.fold(f)
+            np.testing.assert_allclose(X_train, scaler.transform(X[train]))
+            np.testing.assert_allclose(X_test, scaler.transform(X[test]))
+
+
+def test_pickled_folds_attach_to_the_same_directory(training_set):
+    X, y = training_set
+    with FoldCache(X, y, transform=StandardScaler()) as folds:
+        attached = pickle.loads(pickle.dumps(folds))
+        assert attached.directory == folds.directory and not attached.owner
+        assert (attached.cv, attached.fingerprint) == (folds.cv, folds.fingerprint)
+        assert attached.transform == repr(StandardScaler())
+        np.testing.assert_array_equal(attached.fold(2)[0], folds.fold(2)[0])
+        attached.close()
+        assert os.path.isdir(folds.directory)
+    assert not os.path.exists(folds.directory)
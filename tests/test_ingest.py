@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import ingest
+from ingest import csv_byte_ranges, iter_abalone_range, load_abalone
+from predictor import measurement_columns
+
+
+@pytest.fixture(scope='module')
+def csv_path(abalone, tmp_path_factory):
+    frame = abalone.copy()
+    frame.loc[[3, 500, 1499], 'Height'] = 0
+    path = tmp_path_factory.mktemp('ingest') / 'abalone.csv'
+    frame.to_csv(path, index=False)
+    return str(path)
+
+
+def expected_frame(csv_path):
+    df = pd.read_csv(csv_path)
+    df[measurement_columns] = df[measurement_columns].astype(np.float32)
+    df['age'] = (df.pop('Rings') + 1.5).astype(np.float32)
+    return df
+
+
+@pytest.mark.parametrize('chunksize', [1_000_000, 256])
+def test_load_abalone_matches_read_csv(csv_path, chunksize):
+    df = load_abalone(csv_path, chunksize=chunksize)
+    expected = expected_frame(csv_path)
+    assert list(df.columns) == list(expected.columns)
+    assert isinstance(df['Sex'].dtype, pd.CategoricalDtype)
+    assert (df[measurement_columns].dtypes == np.float32).all()
+    np.testing.assert_array_equal(df['Sex'].astype(str), expected['Sex'])
+    np.testing.assert_array_equal(df[measurement_columns + ['age']], expected[measurement_columns + ['age']])
+    assert df.attrs['height_zero_rows'] == (expected['Height'] == 0).sum()
+
+
+def test_drop_zero_height(csv_path):
+    df = load_abalone(csv_path, chunksize=256, drop_zero_height=True)
+    expected = expected_frame(csv_path)
+    assert len(df) == (expected['Height'] != 0).sum()
+    assert (df['Height'] != 0).all()
+    assert df.attrs['height_zero_rows'] == len(expected) - len(df)
+
+
+@pytest.mark.parametrize('n_parts', [1, 3, 8])
+def test_byte_ranges_cover_every_row_once(csv_path, n_parts):
+    ranges = csv_byte_ranges(csv_path, n_parts)
+    chunks = [chunk for start, end in ranges for chunk in iter_abalone_range(csv_path, start, end, chunk_bytes=4096)]
+    df = pd.concat(chunks, ignore_index=True)
+    pd.testing.assert_frame_equal(df, load_abalone(csv_path), check_like=False)
+
+
+def test_cache_is_reused_only_for_the_same_options(csv_path, tmp_path, monkeypatch):
+    pytest.importorskip('pyarrow')
+    cache_path = str(tmp_path / 'abalone.parquet')
+    df = load_abalone(csv_path, cache_path=cache_path)
+
+    parsed = []
+    original = ingest.iter_abalone_chunks
+    monkeypatch.setattr(ingest, 'iter_abalone_chunks', lambda *args: parsed.append(args) or original(*args))
+    cached = load_abalone(csv_path, cache_path=cache_path)
+    assert parsed == []
+    pd.testing.assert_frame_equal(cached, df)
+    assert cached.attrs['height_zero_rows'] == df.attrs['height_zero_rows']
+
+    dropped = load_abalone(csv_path, cache_path=cache_path, drop_zero_height=True)
+    assert len(parsed) == 1 and len(dropped) == len(df) - df.attrs['height_zero_rows']
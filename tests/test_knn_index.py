@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+from sklearn.neighbors import KNeighborsRegressor
+
+from knn_index import KNNIndex
+
+
+@pytest.mark.parametrize('weights', ['uniform', 'distance'])
+@pytest.mark.parametrize('algorithm', ['kd_tree', 'ball_tree', 'brute'])
+def test_index_matches_kneighbors_regressor(scaled, weights, algorithm):
+    X_train, y_train, X_test = scaled
+    index = KNNIndex(n_neighbors=5, weights=weights, algorithm=algorithm, batch_size=64).fit(X_train, y_train)
+    expected = KNeighborsRegressor(n_neighbors=5, weights=weights).fit(X_train, y_train)
+    np.testing.assert_allclose(index.predict(X_test), expected.predict(X_test), rtol=1e-12)
+    # Training rows are exact matches, which get all the weight with weights='distance'
+    np.testing.assert_allclose(index.predict(X_train[:50]), expected.predict(X_train[:50]), rtol=1e-12)
+
+
+@pytest.mark.parametrize('weights', ['uniform', 'distance'])
+@pytest.mark.parametrize('n_added', [20, 200])
+def test_added_rows_match_a_refit(scaled, weights, n_added):
+    X_train, y_train, X_test = scaled
+    index = KNNIndex(n_neighbors=5, weights=weights, rebuild_fraction=0.1).fit(X_train[:400], y_train[:400])
+    index.add(X_train[400:400 + n_added], y_train[400:400 + n_added])
+    # 20 rows stay in the buffer tree, 200 rows rebuild the main tree
+    assert (index.buffer_tree_ is None) == (n_added == 200)
+    assert index.n_rows == 400 + n_added
+
+    expected = KNeighborsRegressor(n_neighbors=5, weights=weights).fit(X_train[:400 + n_added], y_train[:400 + n_added])
+    np.testing.assert_allclose(index.predict(X_test), expected.predict(X_test), rtol=1e-12)
+
+
+def test_saved_index_predicts_the_same(scaled, tmp_path):
+    X_train, y_train, X_test = scaled
+    index = KNNIndex(n_neighbors=7).fit(X_train[:500], y_train[:500]).add(X_train[500:520], y_train[500:520])
+    index.save(str(tmp_path / 'knn.pkl'))
+    loaded = KNNIndex.load(str(tmp_path / 'knn.pkl'))
+    np.testing.assert_array_equal(loaded.predict(X_test), index.predict(X_test))
+    assert loaded.predict(X_test[:0]).shape == (0,)
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+from sklearn.linear_model import Ridge
+from sklearn.model_selection import GridSearchCV
+from sklearn.preprocessing import StandardScaler
+
+from folds import FoldCache
+from linear_engine import ridge_cv_scores
+from predictor import measurement_columns
+
+
+@pytest.mark.parametrize('solver', ['auto', 'svd', 'cholesky', 'lsqr'])
+def test_ridge_cv_scores_match_grid_search(abalone, solver):
+    X = StandardScaler().fit_transform(abalone[measurement_columns])
+    y = abalone['Rings'].to_numpy(dtype=float)
+    alphas = [0.01, 0.1, 1, 10, 100]
+
+    with FoldCache(X, y) as folds:
+        scores = ridge_cv_scores(folds, alphas)
+
+    grid_search = GridSearchCV(Ridge(solver=solver, tol=1e-10), {'alpha': alphas}, scoring='r2', cv=5).fit(X, y)
+    np.testing.assert_allclose(scores, grid_search.cv_results_['mean_test_score'], rtol=1e-8)
+    assert alphas[int(np.argmax(scores))] == grid_search.best_params_['alpha']
+
+
+def test_ridge_cv_scores_rejects_transformed_folds(abalone):
+    X = abalone[measurement_columns].to_numpy()
+    y = abalone['Rings'].to_numpy(dtype=float)
+    with FoldCache(X, y, transform=StandardScaler()) as folds:
+        with pytest.raises(ValueError, match='untransformed'):
+            ridge_cv_scores(folds, [1.0])
+
+
+def test_ridge_tuning_warns_that_the_solver_grid_is_skipped(abalone):
+    import abalone_age_model as aam
+    X = StandardScaler().fit_transform(abalone[measurement_columns])
+    y = abalone['Rings'].to_numpy(dtype=float)
+    with pytest.warns(UserWarning, match='solver grid'):
+        best_params, _ = aam.hyperparameter_tuning(Ridge(), aam.ridge_params, X, y)
+    assert best_params['alpha'] in aam.ridge_params['alpha']
@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import abalone_age_model as aam
+from model_zoo import result_columns, run_zoo, zoo_registry
+
+
+@pytest.fixture(scope='module')
+def datasets(abalone):
+    frame = abalone.assign(age=abalone['Rings'] + 1.5).drop(columns='Rings')
+    return aam.build_datasets(frame, aam.remove_outliers(frame))
+
+
+def test_worker_pool_matches_in_process_run(datasets):
+    registry = zoo_registry(['Linear Regression', 'Ridge', 'DecisionTreeRegressor'], ['original', 'pca'])
+    serial, pooled = run_zoo(datasets, registry, n_jobs=1), run_zoo(datasets, registry, n_jobs=2)
+    assert list(pooled.columns) == result_columns
+    assert list(pooled['name']) == [aam.evaluation_name(family, dataset) for family, dataset in registry]
+    metrics = ['mse_train', 'mae_train', 'r2_train', 'mse_test', 'mae_test', 'r2_test']
+    pd.testing.assert_frame_equal(pooled[['name', 'params'] + metrics], serial[['name', 'params'] + metrics])
+
+
+def test_ann_model_evaluation(scaled):
+    pytest.importorskip('tensorflow')
+    X_train, y_train, X_test = scaled
+    metrics = aam.ann_model_evaluation(X_train, y_train, X_test, np.zeros(len(X_test)), 'ANN', verbose=False)
+    assert {'r2_train', 'mse_test', 'fit_time', 'predict_time', 'peak_memory'} <= set(metrics)
@@ -0,0 +1,25 @@
+import pandas as pd
+
+import abalone_age_model as aam
+
+
+def remove_outliers_loop(df):
+    # The notebook's original per-column loop
+    cleaned_df_train = df.copy()
+    for col in aam.col_except_rings:
+        outliers_mask = aam.detect_outliers_iqr(cleaned_df_train[col])
+        cleaned_df_train = cleaned_df_train[~outliers_mask]
+    cleaned_df_train.reset_index(drop=True, inplace=True)
+    return cleaned_df_train
+
+
+def test_sequential_matches_original_loop(abalone):
+    expected = remove_outliers_loop(abalone)
+    assert len(expected) < len(abalone)
+    pd.testing.assert_frame_equal(aam.remove_outliers(abalone, method='sequential'), expected)
+
+
+def test_sequential_matches_original_loop_with_nans(abalone):
+    df = abalone.copy()
+    df.loc[::97, 'Height'] = float('nan')
+    pd.testing.assert_frame_equal(aam.remove_outliers(df, method='sequential'), remove_outliers_loop(df))
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+from sklearn.decomposition import PCA
+from sklearn.preprocessing import StandardScaler
+
+from pca_stage import PCAStage
+from predictor import measurement_columns
+
+
+@pytest.fixture(scope='module')
+def X_scaled(abalone):
+    return StandardScaler().fit_transform(abalone[measurement_columns])
+
+
+@pytest.mark.parametrize('method, options', [
+    ('full', {}),
+    ('randomized', {'max_components': 5}),
+    ('incremental', {'batch_size': 128}),
+])
+def test_every_method_matches_sklearn_pca(X_scaled, method, options):
+    expected = PCA(n_components=5).fit(X_scaled)
+    full_curve = np.cumsum(PCA().fit(X_scaled).explained_variance_ratio_)
+    pca = PCAStage(n_components=5, method=method, **options).fit(X_scaled)
+    assert pca.n_components_ == 5
+    np.testing.assert_allclose(pca.mean_, expected.mean_, atol=1e-12)
+    np.testing.assert_allclose(pca.components_, expected.components_, atol=1e-8)
+    np.testing.assert_allclose(pca.explained_variance_, expected.explained_variance_, rtol=1e-8)
+    np.testing.assert_allclose(pca.transform(X_scaled), expected.transform(X_scaled), atol=1e-8)
+    # The randomized curve only covers the max_components leading directions
+    np.testing.assert_allclose(pca.cumulative_variance_, full_curve[:len(pca.cumulative_variance_)], rtol=1e-8)
+
+
+def test_partial_fit_over_chunks_equals_fit(X_scaled):
+    pca = PCAStage(n_components=3, method='incremental')
+    for chunk in np.array_split(X_scaled, 7):
+        pca.partial_fit(chunk)
+    expected = PCAStage(n_components=3).fit(X_scaled)
+    np.testing.assert_allclose(pca.transform(X_scaled), expected.transform(X_scaled), atol=1e-8)
+
+
+@pytest.mark.parametrize('method', ['full', 'incremental'])
+def test_variance_threshold_picks_the_fewest_components(X_scaled, method):
+    curve = PCAStage().fit(X_scaled).cumulative_variance_
+    for threshold in (0.5, curve[1], 0.999):
+        pca = PCAStage(variance_threshold=threshold, method=method).fit(X_scaled)
+        assert pca.n_components_ == int(np.argmax(curve >= threshold - 1e-12)) + 1
+
+
+def test_invalid_settings(X_scaled):
+    with pytest.raises(ValueError, match='method'):
+        PCAStage(method='sparse').fit(X_scaled)
+    with pytest.raises(ValueError, match='only 2 components'):
+        PCAStage(n_components=5, method='randomized', max_components=2).fit(X_scaled)
+    with pytest.raises(ValueError, match='incremental'):
+        PCAStage().partial_fit(X_scaled)
+
+
+def test_randomized_pca_split_computes_only_the_requested_directions(abalone):
+    import abalone_age_model as aam
+    frame = abalone.assign(age=abalone['Rings'] + 1.5).drop(columns='Rings')
+    split = aam.build_pca_split(frame, pca_method='randomized', pca_components=5)
+    assert len(split['pca'].cumulative_variance_) == 5
+    assert split['X_train'].shape[1] == aam.n_components + len(aam.sex_categories)
+    with pytest.raises(SystemExit):
+        aam.main(['--pca-components', '5'])
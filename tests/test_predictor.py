@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+from sklearn.linear_model import Ridge
+
+import abalone_age_model as aam
+from predictor import AgePredictor, measurement_columns, raw_columns
+
+
+@pytest.fixture(scope='module')
+def frame(abalone):
+    return abalone.assign(age=abalone['Rings'] + 1.5).drop(columns='Rings')
+
+
+@pytest.fixture(scope='module', params=['cleaned', 'pca'])
+def fitted(request, frame):
+    """(predictor, design matrix of every row as the training split was built)."""
+    if request.param == 'cleaned':
+        split = aam.build_scaled_split(frame)
+        X = split['scaler'].transform(aam.encode_sex(frame.drop(columns='age')))
+    else:
+        split = aam.build_pca_split(frame)
+        df_combined, _, _ = aam.build_pca_features(frame)
+        X = aam.encode_sex(df_combined).to_numpy(dtype=float)
+    model = Ridge().fit(split['X_train'], split['y_train'])
+    return AgePredictor.from_split(split, model), X
+
+
+def test_transform_replays_the_training_preprocessing(fitted, frame):
+    predictor, X = fitted
+    rows = frame.drop(columns='age')
+    np.testing.assert_allclose(predictor.transform(rows['Sex'].to_numpy(), rows[measurement_columns].to_numpy()), X,
+                               rtol=0, atol=1e-12)
+    np.testing.assert_allclose(predictor.predict(rows), predictor.model.predict(X), rtol=1e-12)
+
+
+def test_predict_accepts_arrays_records_and_empty_frames(fitted, frame):
+    predictor, _ = fitted
+    rows = frame.drop(columns='age')[:10]
+    expected = predictor.predict(rows)
+    np.testing.assert_array_equal(predictor.predict(rows[raw_columns].to_numpy(dtype=object)), expected)
+    np.testing.assert_array_equal(predictor.predict(rows.to_dict('records')), expected)
+    assert predictor.predict(rows[:0]).shape == (0,)
+
+
+@pytest.mark.parametrize('header', [True, False])
+def test_predict_stream_matches_predict(fitted, frame, tmp_path, header):
+    predictor, _ = fitted
+    rows = frame.drop(columns='age')[:250]
+    path = tmp_path / 'rows.csv'
+    rows[raw_columns].to_csv(path, index=False, header=header)
+    with open(path) as f:
+        chunks = list(predictor.predict_stream(f, chunk_size=100))
+    assert [len(chunk) for chunk in chunks] == [100, 100, 50]
+    np.testing.assert_allclose(np.concatenate(chunks), predictor.predict(rows), rtol=1e-12)
+    if header:
+        np.testing.assert_allclose(np.concatenate(list(predictor.predict_csv(str(path), chunk_size=100))),
+                                   predictor.predict(rows), rtol=1e-12)
+
+
+def test_saved_predictor_round_trips(fitted, frame, tmp_path):
+    predictor, _ = fitted
+    rows = frame.drop(columns='age')[:50]
+    predictor.save(str(tmp_path))
+    for mmap in (True, False):
+        np.testing.assert_array_equal(AgePredictor.load(str(tmp_path), mmap=mmap).predict(rows), predictor.predict(rows))
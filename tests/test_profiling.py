@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+import profiling
+from profiling import PeakRSS, Profiler
+
+pytestmark = pytest.mark.skipif(not profiling._reset_vm_hwm(), reason='the peak RSS cannot be reset here')
+
+
+def test_stage_peak_rss_is_the_growth_inside_the_stage():
+    profiler = Profiler(enabled=True, trace_memory=False)
+    with profiler.stage('allocate'):
+        array = np.ones(50_000_000)
+        del array
+    with profiler.stage('idle'):
+        pass
+    peaks = {record['stage']: record['peak_rss'] for record in profiler.records}
+    assert peaks['allocate'] > 300e6
+    assert peaks['idle'] < 50e6
+
+
+def test_nested_blocks_keep_the_enclosing_peak():
+    profiler = Profiler(enabled=True, trace_memory=False)
+    with profiler.stage('outer'):
+        array = np.ones(50_000_000)
+        del array
+        with profiler.stage('inner'), PeakRSS() as peak:
+            pass
+    peaks = {record['stage']: record['peak_rss'] for record in profiler.records}
+    assert peaks['outer'] > 300e6
+    assert peaks['outer;inner'] < 50e6
+    assert peak.bytes < 50e6
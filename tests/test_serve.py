@@ -0,0 +1,92 @@
+import asyncio
+import json
+
+import numpy as np
+import pytest
+from sklearn.linear_model import Ridge
+
+import abalone_age_model as aam
+from predictor import AgePredictor, measurement_columns
+from serve import PredictionServer, parse_records
+
+
+def record(sex='M', **values):
+    row = {'Sex': sex, 'Length': 0.455, 'Diameter': 0.365, 'Height': 0.095, 'Whole weight': 0.514,
+           'Shucked weight': 0.2245, 'Viscera weight': 0.101, 'Shell weight': 0.15}
+    row.update(values)
+    return row
+
+
+def test_parse_records():
+    sex, measurements, single = parse_records(record(), ['F', 'I', 'M'])
+    assert single and list(sex) == ['M'] and measurements.shape == (1, len(measurement_columns))
+    sex, measurements, single = parse_records([record('F'), record('I', Height=1)], ['F', 'I', 'M'])
+    assert not single and list(sex) == ['F', 'I'] and measurements[1, 2] == 1.0
+
+
+@pytest.mark.parametrize('payload, message', [
+    ([], 'non-empty list'),
+    ({'Sex': 'M'}, 'missing field'),
+    (record(Length=None), 'Length of record 0 is not a number'),
+    (record(Length='0.455'), 'Length of record 0 is not a number'),
+    ([record(), record(Height=True)], 'Height of record 1 is not a number'),
+    (record(Diameter=float('nan')), 'Diameter of record 0 is not a finite number'),
+    ([record(), record(), record('X')], "Sex of record 2 must be one of F, I, M, got 'X'"),
+    (record(1), 'Sex of record 0 must be one of'),
+])
+def test_parse_records_rejects(payload, message):
+    with pytest.raises(ValueError, match=message):
+        parse_records(payload, ['F', 'I', 'M'])
+
+
+@pytest.fixture(scope='module')
+def artifact(abalone, tmp_path_factory):
+    df = abalone.assign(age=abalone['Rings'] + 1.5).drop(columns='Rings')
+    split = aam.build_scaled_split(df)
+    path = str(tmp_path_factory.mktemp('artifact'))
+    AgePredictor.from_split(split, Ridge().fit(split['X_train'], split['y_train'])).save(path)
+    return path, df.drop(columns='age')[:20]
+
+
+async def post(port, payload):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    body = json.dumps(payload).encode()
+    writer.write(b'POST /predict HTTP/1.1\r\nContent-Length: %d\r\nConnection: close\r\n\r\n' % len(body) + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    response = await reader.read()
+    writer.close()
+    return status, json.loads(response.split(b'\r\n\r\n', 1)[1])
+
+
+def run_server(path, requests, **options):
+    async def main():
+        server = PredictionServer(path, **options)
+        listener = await server.start(port=0)
+        port = listener.sockets[0].getsockname()[1]
+        try:
+            return await asyncio.gather(*(post(port, payload) for payload in requests))
+        finally:
+            listener.close()
+            server.batcher.cancel()
+            server.pool.shutdown()
+    return asyncio.run(main())
+
+
+def test_batched_requests_match_the_predictor(artifact):
+    path, rows = artifact
+    records = rows.to_dict('records')
+    responses = run_server(path, records + [records], max_batch=8, max_wait_ms=20)
+    expected = AgePredictor.load(path).predict(rows)
+    assert all(status == 200 for status, _ in responses)
+    np.testing.assert_allclose([response['age'] for _, response in responses[:-1]], expected, rtol=1e-12)
+    np.testing.assert_allclose(responses[-1][1]['ages'], expected, rtol=1e-12)
+
+
+def test_invalid_records_get_a_400(artifact):
+    path, rows = artifact
+    good = rows.to_dict('records')[0]
+    responses = run_server(path, [dict(good, Sex='X'), dict(good, Length=True), good], max_batch=4)
+    assert [status for status, _ in responses] == [400, 400, 200]
+    assert 'Sex of record 0' in responses[0][1]['error']
+    assert 'Length of record 0' in responses[1][1]['error']
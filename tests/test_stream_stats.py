@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import abalone_age_model as aam
+from stream_stats import QuantileSketch, StreamingStats, scan
+
+
+@pytest.fixture(scope='module')
+def frame(abalone):
+    frame = abalone.assign(age=abalone['Rings'] + 1.5).drop(columns='Rings')
+    frame.loc[[7, 70, 700], 'Diameter'] = np.nan
+    return frame
+
+
+def chunked(frame, size):
+    stats = StreamingStats()
+    for start in range(0, len(frame), size):
+        stats.update(frame[start:start + size])
+    return stats
+
+
+def test_single_pass_matches_pandas(frame):
+    stats = chunked(frame, 256)
+    numeric = frame.select_dtypes(include='number')
+    pd.testing.assert_frame_equal(stats.describe(), numeric.describe(), rtol=1e-10)
+    pd.testing.assert_frame_equal(stats.corr(), numeric.dropna().corr(), rtol=1e-10)
+    pd.testing.assert_series_equal(stats.nulls, frame.isnull().sum(), check_names=False)
+    assert stats.zeros['Height'] == (frame['Height'] == 0).sum()
+    assert stats.in_range('age', 9.5, 12.5) == pytest.approx(frame['age'].between(9.5, 12.5).mean())
+    lower, upper = stats.iqr_bounds(aam.col_except_rings)
+    expected_lower, expected_upper = aam.iqr_bounds(frame[aam.col_except_rings])
+    np.testing.assert_allclose(lower, expected_lower, rtol=1e-12)
+    np.testing.assert_allclose(upper, expected_upper, rtol=1e-12)
+
+
+def test_merged_parts_equal_one_pass(frame):
+    merged = chunked(frame[:600], 100).merge(chunked(frame[600:], 300))
+    pd.testing.assert_frame_equal(merged.describe(), chunked(frame, 256).describe(), rtol=1e-10)
+    pd.testing.assert_frame_equal(merged.corr(), chunked(frame, 256).corr(), rtol=1e-10)
+    with pytest.raises(ValueError):
+        merged.merge(chunked(frame.drop(columns='Height'), 500))
+
+
+def test_sketch_rank_error_is_bounded():
+    values = np.random.default_rng(0).normal(size=50_000)
+    sketch = QuantileSketch(k=256)
+    for part in np.array_split(values, 37):
+        sketch.update(part)
+    assert sketch.count == len(values)
+    q = np.linspace(0.01, 0.99, 25)
+    ranks = np.searchsorted(np.sort(values), sketch.quantile(q)) / len(values)
+    assert np.abs(ranks - q).max() < np.log2(len(values) / 256) / 256 * 2
+
+
+def test_parallel_scan_matches_one_process(abalone, tmp_path):
+    path = str(tmp_path / 'abalone.csv')
+    abalone.to_csv(path, index=False)
+    serial, parallel = scan(path, n_jobs=1), scan(path, n_jobs=3)
+    assert parallel.rows == serial.rows == len(abalone)
+    pd.testing.assert_frame_equal(parallel.describe(), serial.describe(), rtol=1e-6)
+    pd.testing.assert_frame_equal(parallel.corr(), serial.corr(), rtol=1e-9)
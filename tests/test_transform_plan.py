@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from sklearn.preprocessing import StandardScaler
+
+import abalone_age_model as aam
+from predictor import AgePredictor, measurement_columns
+from transform_plan import TransformPlan
+
+
+@pytest.fixture(scope='module')
+def datasets(abalone):
+    frame = abalone.assign(age=abalone['Rings'] + 1.5).drop(columns='Rings')
+    return aam.build_datasets(frame, aam.remove_outliers(frame))
+
+
+@pytest.fixture(scope='module', params=['cleaned', 'pca', 'cleaned+input_scaler', 'pca+input_scaler'])
+def predictor(request, datasets):
+    dataset, _, input_scaler = request.param.partition('+')
+    split = datasets[dataset]
+    # The tuned ANN standardizes its input once more
+    scaler = StandardScaler().fit(split['X_train']) if input_scaler else None
+    return AgePredictor.from_split(split, None, input_scaler=scaler)
+
+
+@pytest.fixture(scope='module')
+def rows(abalone):
+    sex = abalone['Sex'].to_numpy(dtype=object).copy()
+    sex[[5, 50]] = 'X'   # unknown categories get all-zero one-hot columns
+    return sex, abalone[measurement_columns].to_numpy(dtype=float)
+
+
+@pytest.mark.parametrize('batch', [1, 7, None])
+def test_fused_plan_is_bit_for_bit_the_reference_chain(predictor, rows, batch):
+    sex, measurements = rows[0][:batch], rows[1][:batch]
+    plan = TransformPlan.from_predictor(predictor)
+    reference = predictor.transform_reference(sex, measurements)
+    assert plan.transform(sex, measurements).tobytes() == reference.tobytes()
+    assert plan.transform(sex.astype(str), measurements).tobytes() == reference.tobytes()
+    out = np.full((len(sex), plan.n_outputs), np.nan)
+    assert plan.transform(sex, measurements, out=out) is out
+    assert out.tobytes() == reference.tobytes()
+
+
+def test_float32_measurements_give_the_same_bits(predictor, rows):
+    sex, measurements = rows[0], rows[1].astype(np.float32)
+    reference = predictor.transform_reference(sex, measurements)
+    assert TransformPlan.from_predictor(predictor).transform(sex, measurements).tobytes() == reference.tobytes()
+
+
+def test_folded_plan_differs_by_rounding_only(predictor, rows):
+    sex, measurements = rows
+    folded = TransformPlan.from_predictor(predictor, fold=True).transform(sex, measurements)
+    np.testing.assert_allclose(folded, predictor.transform_reference(sex, measurements), rtol=1e-12, atol=1e-12)
+
+
+def test_out_buffer_shape_is_checked(predictor, rows):
+    plan = TransformPlan.from_predictor(predictor)
+    with pytest.raises(ValueError, match='out has shape'):
+        plan.transform(rows[0][:3], rows[1][:3], out=np.empty((3, plan.n_outputs + 1)))
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+from sklearn.tree import DecisionTreeRegressor
+
+import abalone_age_model as aam
+from artifact import load_artifact
+from predictor import AgePredictor, measurement_columns
+from tree_inference import TreeEnsembleModel
+
+
+@pytest.fixture(scope='module')
+def split(abalone):
+    X = abalone[measurement_columns].to_numpy()
+    y = abalone['Rings'].to_numpy(dtype=float)
+    return X[:1000], y[:1000], X[1000:]
+
+
+@pytest.mark.parametrize('model', [
+    DecisionTreeRegressor(random_state=42),
+    RandomForestRegressor(n_estimators=20, max_depth=10, random_state=42),
+    GradientBoostingRegressor(n_estimators=50, max_depth=3, random_state=42),
+])
+def test_flattened_trees_match_sklearn(split, model):
+    X_train, y_train, X_test = split
+    model.fit(X_train, y_train)
+    engine = TreeEnsembleModel.from_sklearn(model)
+    expected = model.predict(X_test)
+    for batch_size in (None, 1, 7):
+        np.testing.assert_allclose(engine.predict(X_test, batch_size=batch_size), expected, rtol=0, atol=1e-9)
+    np.testing.assert_allclose(engine.quantize().predict(X_test), expected, rtol=0, atol=1e-9)
+
+
+def test_memory_mapped_artifact_predicts_from_the_mapped_arrays(abalone, tmp_path):
+    df = abalone.assign(age=abalone['Rings'] + 1.5).drop(columns='Rings')
+    split = aam.build_scaled_split(df)
+    model = RandomForestRegressor(n_estimators=10, random_state=42).fit(split['X_train'], split['y_train'])
+    AgePredictor.from_split(split, model).save(str(tmp_path))
+
+    loaded = load_artifact(str(tmp_path), mmap=True)
+    for name, array in loaded.model.arrays().items():
+        assert isinstance(array, np.memmap) or isinstance(array.base, np.memmap), name
+    rows = df.drop(columns='age')
+    expected = model.predict(split['scaler'].transform(aam.encode_sex(rows)))
+    np.testing.assert_allclose(loaded.predict(rows), expected, rtol=0, atol=1e-9)
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+from sklearn.model_selection import GridSearchCV
+from sklearn.neighbors import KNeighborsRegressor
+
+import tuning
+from predictor import measurement_columns
+from tuning import TrialCache, successive_halving, warm_start_search
+
+
+@pytest.fixture(scope='module')
+def training_set(abalone):
+    rows = abalone[:400]
+    return rows[measurement_columns].to_numpy(), rows['Rings'].to_numpy(dtype=float)
+
+
+@pytest.mark.parametrize('estimator, grid', [
+    (RandomForestRegressor, {'n_estimators': [5, 10, 20], 'max_depth': [3, None]}),
+    (GradientBoostingRegressor, {'n_estimators': [5, 10, 20], 'learning_rate': [0.1, 0.2]}),
+])
+def test_warm_start_search_matches_grid_search(training_set, tmp_path, estimator, grid):
+    X, y = training_set
+    make_model = lambda **p: estimator(**p, random_state=42)
+    cache = TrialCache(str(tmp_path / 'trials.sqlite'))
+    best_params, best_score, report = warm_start_search(make_model, grid, X, y, cache=cache, n_jobs=1)
+
+    grid_search = GridSearchCV(estimator(random_state=42), grid, scoring='r2', cv=5).fit(X, y)
+    expected = {tuple(sorted(params.items())): score
+                for params, score in zip(grid_search.cv_results_['params'], grid_search.cv_results_['mean_test_score'])}
+    scores = {tuple(sorted(trial['params'].items())): trial['score'] for trial in report['trials']}
+    assert scores.keys() == expected.keys()
+    np.testing.assert_allclose([scores[key] for key in expected], list(expected.values()), rtol=1e-12)
+    assert best_params == grid_search.best_params_
+    assert best_score == pytest.approx(grid_search.best_score_, rel=1e-12)
+
+    # Second run is served from the cache
+    _, cached_score, cached_report = warm_start_search(make_model, grid, X, y, cache=cache, n_jobs=1)
+    assert cached_score == best_score
+    assert cached_report['grown_cost'] == 0
+    cache.close()
+
+
+def probe_costs(low, high):
+    # Fixed fit times for the cost probe, so the strategy does not depend on the machine
+    return lambda make_model, params, folds, resource, budgets, cache=None: [(low, 0.0), (high, 0.0)]
+
+
+def test_halving_over_n_estimators_picks_the_ensemble_size(training_set, monkeypatch):
+    X, y = training_set
+    monkeypatch.setattr(tuning, '_probe_costs', probe_costs(0.25, 1.0))
+    grid = {'n_estimators': [5, 10, 20, 40], 'learning_rate': [0.1, 0.5, 1.0], 'max_depth': [2, 4]}
+    best_params, best_score, report = successive_halving(
+        lambda **p: GradientBoostingRegressor(**p, random_state=42), grid, X, y, resource='n_estimators', n_jobs=1,
+        compare_exhaustive=True)
+    assert report['strategy'] == 'halving'
+    assert best_params['n_estimators'] < 40
+    assert best_params == report['exhaustive_best_params']
+    assert best_score == report['exhaustive_best_score']
+
+
+def test_halving_falls_back_to_the_full_grid_when_it_cannot_save(training_set, monkeypatch):
+    X, y = training_set
+    # A fit costs the same on any budget, as for KNN: the plan costs more than the full grid
+    monkeypatch.setattr(tuning, '_probe_costs', probe_costs(1.0, 1.0))
+    grid = {'n_neighbors': [3, 5, 9, 15], 'weights': ['uniform', 'distance']}
+    best_params, best_score, report = successive_halving(lambda **p: KNeighborsRegressor(**p), grid, X, y, n_jobs=1,
+                                                         compare_exhaustive=True)
+    assert report['strategy'] == 'exhaustive'
+    assert [rung['candidates'] for rung in report['rungs']] == [8]
+    assert best_params == report['exhaustive_best_params']
+    assert best_score == report['exhaustive_best_score']
@@ -0,0 +1,114 @@
+"""Fused preprocessing for `AgePredictor`: Sex + measurements to model input in one buffer.
+
+`AgePredictor.transform_reference` is the chain as written: a float copy of the
+measurements, one boolean mask per Sex category stacked into a one-hot array, `np.hstack`,
+then one new array per scaler (and the PCA projection). `TransformPlan` writes everything
+into a single (optionally caller-owned) output buffer instead: Sex is mapped to category
+codes once and the one-hot columns are a gather from a small table, the measurements (or
+their PCA projection) are copied next to them, and the scalers run in place on the whole
+buffer. The operations and their order are the chain's, so the result is bit-for-bit
+identical.
+
+`fold=True` goes further and folds the whole affine chain (scalers, PCA) into one matrix
+and each category's scaled one-hot columns into a table row, so a batch costs one matmul
+plus one gather. It differs from the chain by rounding only (about 1e-15 relative).
+
+    plan = TransformPlan.from_predictor(predictor)
+    out = np.empty((len(sex), plan.n_outputs))
+    plan.transform(sex, measurements, out=out)
+
+Only numpy is imported here.
+"""
+
+import numpy as np
+
+
+class TransformPlan:
+    def __init__(self, scalers, sex_categories, pca_mean=None, pca_components=None, fold=False):
+        self.scalers = [(np.asarray(mean, dtype=float), np.asarray(scale, dtype=float)) for mean, scale in scalers]
+        self.sex_categories = list(sex_categories)
+        self.pca_mean = None if pca_mean is None else np.asarray(pca_mean, dtype=float)
+        self.pca_components = None if pca_components is None else np.asarray(pca_components, dtype=float)
+        self.fold = fold
+
+        if self.pca_components is None:
+            n_measurements = len(self.scalers[0][0]) - len(self.sex_categories)
+        else:
+            n_measurements = self.pca_components.shape[1]
+        self.n_measurements = n_measurements
+        self.n_numeric = n_measurements if self.pca_components is None else len(self.pca_components)
+        self.n_outputs = self.n_numeric + len(self.sex_categories)
+
+        # One-hot row of each category code; the last code is an unknown Sex (all columns 0)
+        self.one_hot = np.vstack([np.eye(len(self.sex_categories)), np.zeros(len(self.sex_categories))])
+        self.category_codes = {category: i for i, category in enumerate(self.sex_categories)}
+        if fold:
+            # Output row of each category code with all-zero measurements
+            self.category_rows = self._reference(np.zeros((len(self.one_hot), n_measurements)), self.one_hot)
+            # The chain is affine in the measurements: out = measurements @ W + rows[category]
+            basis = self._reference(np.eye(n_measurements), np.zeros((n_measurements, len(self.sex_categories))))
+            self.weights = basis - self._reference(np.zeros((1, n_measurements)), np.zeros((1, len(self.sex_categories))))
+            self.weights[:, self.n_numeric:] = 0.0
+
+    @classmethod
+    def from_predictor(cls, predictor, fold=False):
+        return cls(predictor.scalers, predictor.sex_categories, predictor.pca_mean, predictor.pca_components, fold)
+
+    def _reference(self, measurements, one_hot):
+        # The unfused chain, as AgePredictor.transform_reference runs it
+        scalers = self.scalers
+        if self.pca_components is None:
+            X = np.hstack([measurements, one_hot])
+        else:
+            mean, scale = scalers[0]
+            X = (measurements - mean) / scale
+            X = (X - self.pca_mean) @ self.pca_components.T
+            X = np.hstack([X, one_hot])
+            scalers = scalers[1:]
+        for mean, scale in scalers:
+            X = (X - mean) / scale
+        return X
+
+    def codes(self, sex):
+        """Category index per row; unknown values map to the all-zero row."""
+        sex = np.asarray(sex)
+        unknown = len(self.sex_categories)
+        if sex.dtype == object:
+            # One dict lookup per row beats comparing an object array once per category
+            return np.array([self.category_codes.get(s, unknown) for s in sex.tolist()], dtype=np.intp)
+        codes = np.full(sex.shape, unknown, dtype=np.intp)
+        for i, category in enumerate(self.sex_categories):
+            codes[sex == category] = i
+        return codes
+
+    def transform(self, sex, measurements, out=None):
+        """Model input for `sex` (n,) and `measurements` (n, 7), written to `out` (n, n_outputs) if given."""
+        measurements = np.asarray(measurements)
+        if measurements.dtype.kind not in 'fiu':
+            measurements = measurements.astype(float)
+        if out is None:
+            out = np.empty((len(measurements), self.n_outputs))
+        elif out.shape != (len(measurements), self.n_outputs):
+            raise ValueError('out has shape %s, expected %s' % (out.shape, (len(measurements), self.n_outputs)))
+        codes = self.codes(sex)
+
+        if self.fold:
+            np.matmul(measurements, self.weights, out=out)
+            out += self.category_rows[codes]
+            return out
+
+        out[:, self.n_numeric:] = self.one_hot[codes]
+        scalers = self.scalers
+        if self.pca_components is None:
+            out[:, :self.n_numeric] = measurements
+        else:
+            mean, scale = scalers[0]
+            X = np.subtract(measurements, mean, dtype=float)
+            np.divide(X, scale, out=X)
+            np.subtract(X, self.pca_mean, out=X)
+            out[:, :self.n_numeric] = X @ self.pca_components.T
+            scalers = scalers[1:]
+        for mean, scale in scalers:
+            np.subtract(out, mean, out=out)
+            np.divide(out, scale, out=out)
+        return out
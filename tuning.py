@@ -0,0 +1,320 @@
+"""Successive-halving hyperparameter search with a per-cell result cache.
+
+Instead of fitting every grid candidate on the full data for every fold (GridSearchCV),
+`successive_halving` evaluates all candidates on a small budget, keeps the best 1/`factor`
+and multiplies the budget by `factor` until the survivors run on the full budget. The
+budget is either training rows per fold ('n_samples') or, for ensembles, the number of
+estimators ('n_estimators'; the last rung grows the survivors through every size in the
+grid). When the plan would not be cheaper than the full grid, the full grid is searched.
+
+Every (estimator, params, fold, budget) cell is stored in a SQLite `TrialCache` together
+with its fit time, so re-running a search or extending a grid only fits cells that were
+never computed. Folds come from a `folds.FoldCache` (KFold(cv) without shuffling, the
+same splits GridSearchCV uses for a regressor, so full-budget scores are directly
+comparable); pass one in to share it between searches, otherwise each search builds its own:
+
+    with FoldCache(X_train, y_train) as folds:
+        best_params, best_score, report = successive_halving(lambda **p: SVR(**p), svr_params, X_train, y_train,
+                                                             cache=TrialCache('trials.sqlite'), folds=folds,
+                                                             compare_exhaustive=True)
+    report['cost_saved']
+"""
+
+import hashlib
+import json
+import math
+import sqlite3
+import time
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.metrics import r2_score
+from sklearn.model_selection import ParameterGrid
+
+from folds import FoldCache
+
+
+class TrialCache:
+    """SQLite table of CV cells: key -> (score, fit_time)."""
+
+    def __init__(self, path='trials.sqlite'):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('CREATE TABLE IF NOT EXISTS cells (key TEXT PRIMARY KEY, estimator TEXT, params TEXT, '
+                          'fold INTEGER, resource INTEGER, score REAL, fit_time REAL)')
+        self.conn.commit()
+
+    def get_many(self, keys):
+        found = {}
+        for i in range(0, len(keys), 500):
+            batch = keys[i:i + 500]
+            rows = self.conn.execute('SELECT key, score, fit_time FROM cells WHERE key IN (%s)' % ','.join('?' * len(batch)), batch)
+            found.update((key, (score, fit_time)) for key, score, fit_time in rows)
+        return found
+
+    def put_many(self, rows):
+        with self.conn:
+            self.conn.executemany('INSERT OR REPLACE INTO cells VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+
+    def close(self):
+        self.conn.close()
+
+
+def _cell_key(estimator, fit_params, fold, n_folds, resource, budget, fingerprint):
+    return hashlib.sha1(json.dumps([estimator, fit_params, fold, n_folds, resource, budget, fingerprint],
+                                   sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _fit_cell(make_model, params, folds, f, rows=None):
+    start = time.perf_counter()
+    X_train, y_train, X_test, y_test = folds.fold(f, rows)
+    model = make_model(**params)
+    model.fit(X_train, y_train)
+    score = r2_score(y_test, model.predict(X_test))
+    return score, time.perf_counter() - start
+
+
+def evaluate_cells(make_model, candidates, folds, resource, budget, cache=None, n_jobs=-1):
+    """Mean CV R2 per candidate at one budget on a `FoldCache`; cached cells are not refitted.
+
+    Returns (mean scores, summed cost of all cells, cost of the cells fitted now).
+    """
+    estimator = type(make_model()).__name__
+    rows = budget if resource == 'n_samples' else None
+    cells = []
+    for c, params in enumerate(candidates):
+        fit_params = dict(params, n_estimators=budget) if resource == 'n_estimators' else params
+        for f in range(folds.cv):
+            key = _cell_key(estimator, fit_params, f, folds.cv, resource, budget, folds.fingerprint)
+            cells.append((key, c, f, fit_params))
+
+    cached = cache.get_many([cell[0] for cell in cells]) if cache is not None else {}
+    missing = [cell for cell in cells if cell[0] not in cached]
+    computed = Parallel(n_jobs=n_jobs)(delayed(_fit_cell)(make_model, fit_params, folds, f, rows)
+                                       for _, _, f, fit_params in missing)
+    results = dict(cached)
+    results.update((cell[0], result) for cell, result in zip(missing, computed))
+    if cache is not None and missing:
+        cache.put_many([(key, estimator, json.dumps(fit_params, sort_keys=True, default=str), f, budget, score, fit_time)
+                        for (key, _, f, fit_params), (score, fit_time) in zip(missing, computed)])
+
+    scores = np.zeros((len(candidates), folds.cv))
+    for key, c, f, _ in cells:
+        scores[c, f] = results[key][0]
+    total_cost = sum(results[cell[0]][1] for cell in cells)
+    new_cost = sum(fit_time for _, fit_time in computed)
+    return scores.mean(axis=1), total_cost, new_cost
+
+
+def _probe_costs(make_model, params, folds, resource, budgets, cache=None):
+    """Fit time of one candidate on the first fold at each of `budgets` (read from `cache` when there)."""
+    estimator = type(make_model()).__name__
+    costs = []
+    for budget in budgets:
+        fit_params = dict(params, n_estimators=budget) if resource == 'n_estimators' else params
+        key = _cell_key(estimator, fit_params, 0, folds.cv, resource, budget, folds.fingerprint)
+        cached = cache.get_many([key]) if cache is not None else {}
+        if key in cached:
+            costs.append((cached[key][1], 0.0))
+        else:
+            _, fit_time = _fit_cell(make_model, fit_params, folds, 0, budget if resource == 'n_samples' else None)
+            costs.append((fit_time, fit_time))
+    return costs
+
+
+def successive_halving(make_model, param_grid, X, y, cv=5, factor=3, resource='n_samples', min_resources=None,
+                       cache=None, n_jobs=-1, random_state=42, compare_exhaustive=False, folds=None):
+    """Successive-halving search over `param_grid`; returns (best_params, best_score, report).
+
+    `best_score` is the mean CV R2 of the winner on the full budget. For 'n_estimators' the
+    survivors of the last rung are grown through every size in the grid, so the winner's
+    n_estimators is whichever size scored best, not always the largest; budgets are snapped
+    to those sizes.
+
+    Before the first rung one candidate is timed on one fold at the smallest and the full
+    budget. When the halving plan is not expected to cost less than fitting every
+    candidate on the full budget (cheap fits such as KNN, whose cost hardly depends on the
+    budget, or grids too small to cut), the search falls back to the exhaustive grid;
+    `report['strategy']` says which one ran.
+
+    The report lists each rung and every (candidate, budget) score, the summed fit cost of
+    the search (probe included) and, with `compare_exhaustive`, the cost and best score of
+    the full grid (reusing every cached cell; for 'n_estimators' via `warm_start_search`).
+    `folds` (a `FoldCache` of X, y) replaces `cv`/`random_state`.
+    """
+    if folds is None:
+        with FoldCache(X, y, cv, random_state=random_state) as folds:
+            return successive_halving(make_model, param_grid, X, y, cv, factor, resource, min_resources, cache,
+                                      n_jobs, random_state, compare_exhaustive, folds)
+    cv = folds.cv
+
+    full_grid = param_grid
+    param_grid = dict(param_grid)
+    if resource == 'n_samples':
+        max_resources = min(folds.n_train(f) for f in range(cv))
+        # Below ~1/9 of the rows the ranking of e.g. min_samples_leaf settings is mostly noise
+        min_resources = min_resources or max(2 * cv, max_resources // factor ** 2)
+    elif resource == 'n_estimators':
+        sizes = sorted(set(param_grid.pop('n_estimators', [100])))
+        max_resources = sizes[-1]
+        min_resources = min_resources or sizes[0]
+    else:
+        raise ValueError("resource must be 'n_samples' or 'n_estimators', got %r" % resource)
+
+    candidates = list(ParameterGrid(param_grid))
+    # Enough rungs to get from all candidates to one, the last rung always uses the full budget
+    n_rungs = max(1, min(math.ceil(math.log(len(candidates), factor)) + 1 if len(candidates) > 1 else 1,
+                         int(math.log(max_resources / min_resources, factor)) + 1))
+    budgets = [int(max_resources / factor ** (n_rungs - 1 - i)) for i in range(n_rungs)]
+    if resource == 'n_estimators':
+        # Snap to the grid's sizes, so every cell is also one of the exhaustive grid's cells
+        # (and shared with warm_start_search through the cache)
+        budgets = sorted({min(sizes, key=lambda size: (abs(size - budget), size)) for budget in budgets})
+
+    start = time.perf_counter()
+    halving_cost = fitted_cost = 0.0
+    strategy = 'exhaustive'
+    if len(budgets) > 1:
+        (low, low_new), (high, high_new) = _probe_costs(make_model, candidates[0], folds, resource,
+                                                        [budgets[0], budgets[-1]], cache)
+        halving_cost = fitted_cost = low_new + high_new
+        # Cost of the plan per fold, interpolating the fit time linearly in the budget
+        planned, n = 0.0, len(candidates)
+        for budget in budgets:
+            planned += n * (low + (high - low) * (budget - budgets[0]) / (budgets[-1] - budgets[0]))
+            n = max(1, math.ceil(n / factor))
+        if planned < len(candidates) * high:
+            strategy = 'halving'
+    if strategy == 'exhaustive':
+        budgets = budgets[-1:]
+
+    rungs, trials = [], []
+    survivors = candidates
+    for i, budget in enumerate(budgets):
+        last = i == len(budgets) - 1
+        if last and resource == 'n_estimators':
+            # Every size in the grid is scored on the way to the largest, at the cost of the largest
+            rung_trials, cost, new_cost = _grow_candidates(make_model, survivors, sizes, folds, cache, n_jobs)
+        else:
+            scores, cost, new_cost = evaluate_cells(make_model, survivors, folds, resource, budget, cache, n_jobs)
+            rung_trials = [{'params': dict(params), 'budget': budget, 'score': float(score)}
+                           for params, score in zip(survivors, scores)]
+        halving_cost += cost
+        fitted_cost += new_cost
+        trials.extend(rung_trials)
+        ranked = sorted(range(len(rung_trials)), key=lambda j: -rung_trials[j]['score'])
+        rungs.append({'budget': budget, 'candidates': len(survivors), 'best_score': rung_trials[ranked[0]]['score']})
+        if not last:
+            survivors = [survivors[j] for j in ranked[:max(1, math.ceil(len(survivors) / factor))]]
+
+    best = rung_trials[ranked[0]]
+    best_params, best_score = dict(best['params']), best['score']
+    report = {'strategy': strategy, 'rungs': rungs, 'trials': trials, 'n_candidates': len(candidates),
+              'wall_time': time.perf_counter() - start, 'halving_cost': halving_cost, 'fitted_cost': fitted_cost}
+
+    if compare_exhaustive:
+        if resource == 'n_estimators':
+            # The full grid includes every n_estimators value, not just the largest
+            exhaustive_params, exhaustive_score, exhaustive = warm_start_search(
+                make_model, dict(full_grid, n_estimators=sizes), X, y, cache=cache, n_jobs=n_jobs, folds=folds)
+            exhaustive_cost = exhaustive['exhaustive_cost']
+        else:
+            scores, exhaustive_cost, _ = evaluate_cells(make_model, candidates, folds, resource, max_resources, cache, n_jobs)
+            best = int(np.argmax(scores))
+            exhaustive_params, exhaustive_score = candidates[best], float(scores[best])
+        report.update(exhaustive_cost=exhaustive_cost, exhaustive_best_score=exhaustive_score,
+                      exhaustive_best_params=exhaustive_params, cost_saved=exhaustive_cost - halving_cost,
+                      score_gap=exhaustive_score - best_score)
+    return best_params, best_score, report
+
+
+def _grow_cell(make_model, params, checkpoints, folds, f):
+    """[(score, fit_time)] of one ensemble grown through the n_estimators `checkpoints`.
+
+    Gradient boosting is fit once to the largest size and every checkpoint is scored from
+    `staged_predict`; its fit time is prorated by stage. Forests are grown with warm_start,
+    so each checkpoint only fits the new trees; fit times are cumulative, what a fit from
+    scratch at that size would cost.
+    """
+    X_train, y_train, X_test, y_test = folds.fold(f)
+    model = make_model(**params)
+    results = []
+    if hasattr(model, 'staged_predict'):
+        start = time.perf_counter()
+        model.set_params(n_estimators=checkpoints[-1]).fit(X_train, y_train)
+        fit_time = time.perf_counter() - start
+        wanted = set(checkpoints)
+        for n, y_pred in enumerate(model.staged_predict(X_test), 1):
+            if n in wanted:
+                results.append((r2_score(y_test, y_pred), fit_time * n / checkpoints[-1]))
+        return results
+
+    model.set_params(warm_start=True)
+    elapsed = 0.0
+    for n in checkpoints:
+        start = time.perf_counter()
+        model.set_params(n_estimators=n).fit(X_train, y_train)
+        score = r2_score(y_test, model.predict(X_test))
+        elapsed += time.perf_counter() - start
+        results.append((score, elapsed))
+    return results
+
+
+def _grow_candidates(make_model, candidates, checkpoints, folds, cache=None, n_jobs=-1):
+    """Trials of every candidate at every n_estimators in `checkpoints`, one grown ensemble per
+    (candidate, fold); returns (trials, cost of the grown cells, cost of the cells grown now)."""
+    estimator = type(make_model()).__name__
+    keys = {(g, f): [_cell_key(estimator, dict(params, n_estimators=n), f, folds.cv, 'n_estimators', n,
+                               folds.fingerprint)
+                     for n in checkpoints]
+            for g, params in enumerate(candidates) for f in range(folds.cv)}
+
+    cached = cache.get_many([key for cell in keys.values() for key in cell]) if cache is not None else {}
+    missing = [(g, f) for (g, f), cell in keys.items() if not all(key in cached for key in cell)]
+    grown = Parallel(n_jobs=n_jobs)(delayed(_grow_cell)(make_model, candidates[g], checkpoints, folds, f)
+                                    for g, f in missing)
+    results = dict(cached)
+    rows = []
+    for (g, f), cell in zip(missing, grown):
+        for n, key, (score, fit_time) in zip(checkpoints, keys[g, f], cell):
+            results[key] = (score, fit_time)
+            rows.append((key, estimator, json.dumps(dict(candidates[g], n_estimators=n), sort_keys=True, default=str),
+                         f, n, score, fit_time))
+    if cache is not None and rows:
+        cache.put_many(rows)
+
+    trials = []
+    for g, params in enumerate(candidates):
+        for i, n in enumerate(checkpoints):
+            cells = [results[keys[g, f][i]] for f in range(folds.cv)]
+            trials.append({'params': dict(params, n_estimators=n), 'budget': n,
+                           'score': float(np.mean([score for score, _ in cells])),
+                           'fit_time': float(np.mean([fit_time for _, fit_time in cells]))})
+    cost = sum(results[cell[-1]][1] for cell in keys.values())
+    return trials, cost, sum(cell[-1][1] for cell in grown)
+
+
+def warm_start_search(make_model, param_grid, X, y, cv=5, cache=None, n_jobs=-1, folds=None):
+    """Exhaustive search over a grid with an `n_estimators` list, growing one ensemble per
+    combination of the other parameters instead of refitting each size from scratch.
+
+    The trees of a forest or boosting model with a fixed random_state do not depend on the
+    final n_estimators, so the prefix scores equal those of separate fits and the result is
+    the same as GridSearchCV on the same KFold(cv) splits. Returns
+    (best_params, best_score, report) like `successive_halving`; cells are shared with the
+    halving search's 'n_estimators' cells in `cache`.
+    """
+    if folds is None:
+        with FoldCache(X, y, cv) as folds:
+            return warm_start_search(make_model, param_grid, X, y, cv, cache, n_jobs, folds)
+    cv = folds.cv
+
+    param_grid = dict(param_grid)
+    checkpoints = sorted(param_grid.pop('n_estimators'))
+    start = time.perf_counter()
+    trials, _, grown_cost = _grow_candidates(make_model, list(ParameterGrid(param_grid)), checkpoints, folds,
+                                             cache, n_jobs)
+    best = max(trials, key=lambda trial: trial['score'])
+    report = {'trials': trials, 'n_candidates': len(trials), 'wall_time': time.perf_counter() - start,
+              'exhaustive_cost': sum(trial['fit_time'] for trial in trials) * cv, 'grown_cost': grown_cost}
+    return best['params'], best['score'], report